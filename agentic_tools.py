@@ -13,25 +13,174 @@ Provides comprehensive capabilities similar to Windsurf/Claude:
 import os
 import re
 import json
+import stat
+import logging
+import time
+import threading
 import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 from rich.console import Console
+from rich.live import Live
 from rich.prompt import Confirm
 from rich.panel import Panel
 from rich.table import Table
 import difflib
 
+from fileio import (
+    count_file_lines,
+    count_lines_parallel,
+    iter_code_files,
+    summarize_by_language,
+    format_language_summary,
+    read_file_range,
+    atomic_write,
+    EditTransaction,
+)
+from models.tool_calling import NoToolCallError, function_tool, is_unsupported_error
+
 console = Console()
+logger = logging.getLogger("blonde")
+
+# Independent read-only plan steps run concurrently on this many threads
+PLAN_WORKERS = 4
+
+# Structured planning is given up after this many failures in a row, even transient ones
+MAX_STRUCTURED_FAILURES = 3
+
+STEP_STATUS = {
+    "pending": "⏳ Pending",
+    "running": "🔄 Running",
+    "done": "✅ Done",
+    "failed": "❌ Failed",
+}
+
+
+def normalize_steps(steps: List[Dict[str, Any]], read_only: Set[str] = frozenset()) -> List[Dict[str, Any]]:
+    """
+    Give every plan step a unique integer id and a clean depends_on list.
+    
+    Dependencies may only point at earlier steps, so a plan can never
+    contain a cycle. A step without depends_on waits for the previous step,
+    except read-only steps, which wait for nothing.
+    """
+    steps = [dict(step) for step in steps if isinstance(step, dict)]
+    ids = [step.get("step") for step in steps]
+    if not all(isinstance(i, int) for i in ids) or len(set(ids)) != len(ids):
+        for position, step in enumerate(steps, 1):
+            step["step"] = position
+            step.pop("depends_on", None)
+    
+    seen: List[int] = []
+    for step in steps:
+        step.setdefault("action", "")
+        step.setdefault("tool", "manual")
+        step.setdefault("params", {})
+        declared = step.get("depends_on")
+        if declared is None:
+            declared = [] if step["tool"] in read_only or not seen else [seen[-1]]
+        elif not isinstance(declared, list):
+            declared = [declared]
+        step["depends_on"] = [d for d in declared if isinstance(d, int) and d in seen]
+        seen.append(step["step"])
+    return steps
+
+
+def step_dependencies(steps: List[Dict[str, Any]], read_only: Set[str]) -> Dict[int, Set[int]]:
+    """
+    Effective dependencies used by the scheduler.
+    
+    On top of the declared ones, plan order is kept for side effects: a
+    step that may change state waits for every earlier step, and a
+    read-only step waits for the last state-changing step before it.
+    """
+    deps: Dict[int, Set[int]] = {}
+    earlier: List[int] = []
+    last_write: Optional[int] = None
+    for step in steps:
+        step_id = step["step"]
+        deps[step_id] = set(step.get("depends_on", []))
+        if step["tool"] in read_only:
+            if last_write is not None:
+                deps[step_id].add(last_write)
+        else:
+            deps[step_id].update(earlier)
+            last_write = step_id
+        earlier.append(step_id)
+    return deps
+
+
+def plan_tool(tool_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """The submit_plan tool definition; the step schema mirrors the JSON-array plan format"""
+    tool_field: Dict[str, Any] = {"type": "string"}
+    if tool_names:
+        tool_field["enum"] = sorted(set(tool_names) | {"manual"})
+    step_schema = {
+        "type": "object",
+        "properties": {
+            "step": {"type": "integer"},
+            "action": {"type": "string"},
+            "tool": tool_field,
+            "params": {"type": "object"},
+            "depends_on": {"type": "array", "items": {"type": "integer"}},
+            "reason": {"type": "string"},
+        },
+        "required": ["step", "action", "tool", "params", "depends_on"],
+    }
+    return function_tool(
+        "submit_plan",
+        "Submit the execution plan as an ordered list of steps",
+        {
+            "type": "object",
+            "properties": {"steps": {"type": "array", "items": step_schema, "minItems": 1}},
+            "required": ["steps"],
+        },
+    )
 
 
 class TaskPlanner:
     """Decomposes complex tasks into executable steps"""
     
-    def __init__(self, llm_adapter):
+    def __init__(self, llm_adapter, tool_names: Optional[List[str]] = None):
         self.llm = llm_adapter
+        self.tool_names = tool_names
         self.current_plan = []
         self.completed_steps = []
+        self.step_status: Dict[int, str] = {}
+        # Adapters with chat_tools return plans as parsed JSON; cleared once the model turns out not to support it
+        self.structured = callable(getattr(llm_adapter, "chat_tools", None))
+        self.structured_failures = 0
+    
+    def _plan_structured(self, user_request: str) -> Optional[List[Dict[str, Any]]]:
+        """Plan via a submit_plan tool call; None if the adapter could not produce one"""
+        prompt = f"""
+You are a task planner. Break down this request into specific, executable steps and submit them with submit_plan.
+
+User Request: {user_request}
+
+For each step give the action, the tool to use, its params (read_file accepts start_line/max_lines to page
+through large files) and depends_on: the earlier step numbers whose results it needs ([] if none).
+Independent steps (e.g. reading several files) should not depend on each other so they can run in parallel.
+"""
+        try:
+            calls = self.llm.chat_tools(prompt, [plan_tool(self.tool_names)])
+            if not calls:
+                raise NoToolCallError("Model did not call submit_plan")
+            steps = calls[0].arguments.get("steps")
+            if not isinstance(steps, list) or not steps:
+                raise ValueError("submit_plan returned no steps")
+            self.structured_failures = 0
+            return steps
+        except Exception as e:
+            self.structured_failures += 1
+            if is_unsupported_error(e) or self.structured_failures >= MAX_STRUCTURED_FAILURES:
+                logger.warning(f"Structured planning disabled ({type(e).__name__}: {e}); using text plans")
+                self.structured = False
+            else:
+                logger.warning(f"Structured planning failed ({type(e).__name__}: {e}); using a text plan")
+            return None
     
     def decompose_task(self, user_request: str) -> List[Dict[str, Any]]:
         """
@@ -51,24 +200,39 @@ User Request: {user_request}
 For each step, identify:
 1. What needs to be done
 2. Which tool to use (read_file, write_file, edit_file, run_command, etc.)
-3. What parameters are needed
+3. What parameters are needed (read_file accepts start_line/max_lines to page through large files)
+4. Which earlier steps it needs results from ("depends_on", a list of step numbers; [] if none)
 
 Return a JSON array of steps like:
 [
-  {{"step": 1, "action": "Read file", "tool": "read_file", "params": {{"path": "file.py"}}, "reason": "Need to see current code"}},
-  {{"step": 2, "action": "Edit code", "tool": "edit_file", "params": {{"path": "file.py", "changes": "..."}}, "reason": "Fix the bug"}}
+  {{"step": 1, "action": "Read file", "tool": "read_file", "params": {{"path": "file.py"}}, "depends_on": [], "reason": "Need to see current code"}},
+  {{"step": 2, "action": "Read tests", "tool": "read_file", "params": {{"path": "test_file.py"}}, "depends_on": [], "reason": "Check expected behavior"}},
+  {{"step": 3, "action": "Edit code", "tool": "edit_file", "params": {{"path": "file.py", "changes": "..."}}, "depends_on": [1, 2], "reason": "Fix the bug"}}
 ]
 
+Independent steps (e.g. reading several files) should not depend on each other so they can run in parallel.
 Be specific and actionable. Only return the JSON array.
 """
         
         try:
-            response = self.llm.chat(planning_prompt)
+            steps = self._plan_structured(user_request) if self.structured else None
+            if steps:
+                steps = normalize_steps(steps, EnhancedToolRegistry.READ_ONLY_TOOLS)
+                self.current_plan = steps
+                self.step_status = {step["step"]: "pending" for step in steps}
+                return steps
+            
+            if getattr(self.llm, "supports_grammar", False) is True:
+                response = self.llm.chat(planning_prompt, grammar="json_plan")
+            else:
+                response = self.llm.chat(planning_prompt)
             # Extract JSON from response
             json_match = re.search(r'\[.*\]', response, re.DOTALL)
             if json_match:
-                steps = json.loads(json_match.group())
+                steps = normalize_steps(json.loads(json_match.group()),
+                                        EnhancedToolRegistry.READ_ONLY_TOOLS)
                 self.current_plan = steps
+                self.step_status = {step["step"]: "pending" for step in steps}
                 return steps
             else:
                 # Fallback: create a simple plan
@@ -89,36 +253,158 @@ Be specific and actionable. Only return the JSON array.
                 "reason": "Fallback"
             }]
     
-    def display_plan(self):
-        """Display the current execution plan"""
-        if not self.current_plan:
-            console.print("[yellow]No plan created yet[/yellow]")
-            return
-        
+    def set_status(self, step_id: int, status: str):
+        """Record a step's progress (one of STEP_STATUS)"""
+        self.step_status[step_id] = status
+        if status == "done" and step_id not in self.completed_steps:
+            self.completed_steps.append(step_id)
+    
+    def render_plan(self) -> Table:
+        """The plan as a table with each step's dependencies and current status"""
         table = Table(title="📋 Execution Plan", show_header=True, header_style="bold cyan")
         table.add_column("#", style="cyan", width=4)
         table.add_column("Action", style="white")
         table.add_column("Tool", style="green")
+        table.add_column("After", style="dim")
         table.add_column("Status", style="yellow")
         
         for step in self.current_plan:
-            status = "✅ Done" if step["step"] in self.completed_steps else "⏳ Pending"
+            status = self.step_status.get(step["step"])
+            if status is None:
+                status = "done" if step["step"] in self.completed_steps else "pending"
             table.add_row(
                 str(step["step"]),
                 step["action"],
                 step["tool"],
-                status
+                ", ".join(str(d) for d in step.get("depends_on", [])),
+                STEP_STATUS.get(status, status)
             )
+        return table
+    
+    def display_plan(self):
+        """Display the current execution plan"""
+        if not self.current_plan:
+            console.print("[yellow]No plan created yet[/yellow]")
+            return
         
-        console.print(table)
+        console.print(self.render_plan())
+
+
+class ToolResultCache:
+    """
+    Results of read-only tools, reused while the state they read is unchanged.
+    
+    Each entry stores a fingerprint taken just before the tool ran: the
+    target's (mtime, size, inode) for read_file/list_dir/count_lines, and
+    the git index and HEAD mtimes for git_status/git_diff. A lookup only
+    hits if the fingerprint still matches. Git results also expire after
+    GIT_TTL, since editing a tracked file does not touch the index.
+    Tree-wide searches are never cached: validating them costs as much as
+    running them.
+    """
+    
+    TOOLS = {"read_file", "list_dir", "count_lines", "git_status", "git_diff"}
+    GIT_TOOLS = {"git_status", "git_diff"}
+    GIT_TTL = 60.0
+    MAX_ENTRIES = 256
+    
+    def __init__(self, git_dir: str = ".git"):
+        self.git_dir = git_dir
+        self._entries: "OrderedDict[str, Tuple[tuple, str, float, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _key(tool_name: str, kwargs: Dict[str, Any]) -> str:
+        return tool_name + json.dumps(kwargs, sort_keys=True, default=str)
+    
+    @staticmethod
+    def _stat(path: str) -> Optional[os.stat_result]:
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+    
+    def fingerprint(self, tool_name: str, kwargs: Dict[str, Any]) -> Optional[tuple]:
+        """State the tool's result depends on, or None if it cannot be cached"""
+        if tool_name in self.GIT_TOOLS:
+            index = self._stat(os.path.join(self.git_dir, "index"))
+            head = self._stat(os.path.join(self.git_dir, "HEAD"))
+            if index is None or head is None:
+                return None
+            fp = (index.st_mtime_ns, index.st_size, head.st_mtime_ns)
+            if kwargs.get("file"):
+                st = self._stat(kwargs["file"])
+                fp += (st.st_mtime_ns, st.st_size) if st else (None,)
+            return fp
+        if tool_name not in self.TOOLS:
+            return None
+        st = self._stat(kwargs.get("path", "."))
+        if st is None or (tool_name == "count_lines" and stat.S_ISDIR(st.st_mode)):
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def get(self, tool_name: str, kwargs: Dict[str, Any], fp: Optional[tuple]) -> Optional[str]:
+        if fp is None:
+            return None
+        key = self._key(tool_name, kwargs)
+        with self._lock:
+            entry = self._entries.get(key)
+            fresh = entry is not None and entry[0] == fp and (
+                tool_name not in self.GIT_TOOLS or time.monotonic() - entry[2] < self.GIT_TTL)
+            if not fresh:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, tool_name: str, kwargs: Dict[str, Any], fp: Optional[tuple], result: str):
+        if fp is None or result.startswith("❌"):
+            return
+        path = kwargs.get("path") if tool_name not in self.GIT_TOOLS else None
+        with self._lock:
+            key = self._key(tool_name, kwargs)
+            self._entries[key] = (fp, result, time.monotonic(), os.path.abspath(path) if path else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, paths: Optional[List[str]] = None):
+        """
+        Forget results a write may have changed.
+        
+        With paths, drops entries for those paths, their parent directories
+        and every git result; with None (unknown side effects), drops everything.
+        """
+        with self._lock:
+            if paths is None:
+                self._entries.clear()
+                return
+            targets = set()
+            for path in paths:
+                target = os.path.abspath(path)
+                targets.update((target, os.path.dirname(target)))
+            for key in [k for k, entry in self._entries.items() if entry[3] is None or entry[3] in targets]:
+                del self._entries[key]
 
 
 class EnhancedToolRegistry:
     """Extended tool registry with code editing and advanced capabilities"""
     
+    # Tools whose file writes are staged in the active transaction
+    EDIT_TOOLS = {"write_file", "edit_file", "replace_in_file", "insert_at_line", "remove_lines"}
+    
+    # Tools with no side effects; plan steps using them may run concurrently
+    READ_ONLY_TOOLS = {"read_file", "list_dir", "search_files", "search_in_files",
+                       "count_lines", "git_status", "git_diff"}
+    
     def __init__(self, require_confirmation: bool = True):
         self.require_confirmation = require_confirmation
         self.tools = {}
+        self.transaction: Optional[EditTransaction] = None
+        self.cache = ToolResultCache()
         self.register_all_tools()
     
     def register_all_tools(self):
@@ -169,25 +455,93 @@ class EnhancedToolRegistry:
                 return "❌ Cancelled by user"
         
         try:
+            # Anything other than a staged edit must see edits made so far on disk
+            if self.transaction and tool_name not in self.EDIT_TOOLS:
+                self.transaction.flush()
+            
+            # Fingerprint before running, so a change made mid-read is not cached as current
+            fp = self.cache.fingerprint(tool_name, kwargs)
+            cached = self.cache.get(tool_name, kwargs, fp)
+            if cached is not None:
+                console.print("[dim]♻️ Reused cached result[/dim]")
+                return cached
+            
             result = self.tools[tool_name](**kwargs)
+            if tool_name in self.READ_ONLY_TOOLS:
+                self.cache.put(tool_name, kwargs, fp, result)
+            else:
+                self.cache.invalidate(self._touched_paths(tool_name, kwargs))
             console.print(f"[green]✅ Tool executed successfully[/green]")
             return result
         except Exception as e:
+            self.cache.invalidate()
             error_msg = f"❌ Tool error: {str(e)}"
             console.print(f"[red]{error_msg}[/red]")
             return error_msg
     
+    def _touched_paths(self, tool_name: str, kwargs: Dict[str, Any]) -> Optional[List[str]]:
+        """Paths a state-changing tool writes, or None if it could touch anything"""
+        if tool_name in self.EDIT_TOOLS or tool_name in ("delete_file", "create_dir"):
+            return [kwargs["path"]] if "path" in kwargs else None
+        if tool_name == "rename_file":
+            return [kwargs.get("old_path", ""), kwargs.get("new_path", "")]
+        return None
+    
+    # ============= Edit Transactions =============
+    
+    def begin_transaction(self) -> EditTransaction:
+        """Start batching edits; they are written on commit or before the next non-edit tool"""
+        if self.transaction is None:
+            self.transaction = EditTransaction()
+        return self.transaction
+    
+    def commit_transaction(self) -> Optional[EditTransaction]:
+        """Write pending edits and end the transaction (it can still be rolled back)"""
+        txn, self.transaction = self.transaction, None
+        if txn:
+            txn.commit()
+        return txn
+    
+    def rollback_transaction(self) -> List[str]:
+        """Discard pending edits and restore every file the transaction touched"""
+        txn, self.transaction = self.transaction, None
+        self.cache.invalidate()
+        return txn.rollback() if txn else []
+    
+    def _exists(self, path: str) -> bool:
+        if self.transaction:
+            return self.transaction.exists(path)
+        return Path(path).exists()
+    
+    def _read_text(self, path: str) -> str:
+        if self.transaction:
+            return self.transaction.read(path)
+        return Path(path).read_text(encoding="utf-8")
+    
+    def _write_text(self, path: str, content: str):
+        if self.transaction:
+            self.transaction.stage(path, content)
+        else:
+            atomic_write(path, content)
+    
     # ============= File Operations =============
     
-    def read_file(self, path: str) -> str:
-        """Read a file"""
+    def read_file(self, path: str, start_line: int = None, max_lines: int = None,
+                  offset: int = None, max_bytes: int = None) -> str:
+        """Read a file, or one page of it (by line or byte range)"""
         file_path = Path(path)
         if not file_path.exists():
             return f"❌ File not found: {path}"
         
         try:
-            content = file_path.read_text()
-            return f"📄 {path} ({len(content)} chars):\n\n{content}"
+            page = read_file_range(
+                str(file_path),
+                start_line=int(start_line) if start_line is not None else None,
+                max_lines=int(max_lines) if max_lines is not None else None,
+                offset=int(offset) if offset is not None else None,
+                max_bytes=int(max_bytes) if max_bytes is not None else None,
+            )
+            return f"📄 {path} ({len(page.text)} chars):\n\n{page.text}{page.marker()}"
         except Exception as e:
             return f"❌ Read error: {e}"
     
@@ -196,8 +550,7 @@ class EnhancedToolRegistry:
         file_path = Path(path)
         
         try:
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            file_path.write_text(content)
+            self._write_text(str(file_path), content)
             return f"✅ Written {len(content)} chars to {path}"
         except Exception as e:
             return f"❌ Write error: {e}"
@@ -206,11 +559,11 @@ class EnhancedToolRegistry:
         """Edit file by replacing text"""
         file_path = Path(path)
         
-        if not file_path.exists():
+        if not self._exists(path):
             return f"❌ File not found: {path}"
         
         try:
-            content = file_path.read_text()
+            content = self._read_text(path)
             
             if old_text not in content:
                 return f"❌ Text not found in file:\n{old_text}"
@@ -231,7 +584,7 @@ class EnhancedToolRegistry:
                     else:
                         console.print(f"[dim]{line}[/dim]")
             
-            file_path.write_text(new_content)
+            self._write_text(path, new_content)
             return f"✅ File edited: {path}"
         except Exception as e:
             return f"❌ Edit error: {e}"
@@ -244,6 +597,8 @@ class EnhancedToolRegistry:
             return f"❌ File not found: {path}"
         
         try:
+            if self.transaction:
+                self.transaction.record_original(path)
             file_path.unlink()
             return f"✅ Deleted: {path}"
         except Exception as e:
@@ -258,6 +613,10 @@ class EnhancedToolRegistry:
             return f"❌ File not found: {old_path}"
         
         try:
+            if self.transaction:
+                # Rollback restores the source and removes (or restores) the destination
+                self.transaction.record_original(old_path)
+                self.transaction.record_original(new_path)
             old.rename(new)
             return f"✅ Renamed: {old_path} → {new_path}"
         except Exception as e:
@@ -306,11 +665,11 @@ class EnhancedToolRegistry:
         """Replace text in file with pattern"""
         file_path = Path(path)
         
-        if not file_path.exists():
+        if not self._exists(path):
             return f"❌ File not found: {path}"
         
         try:
-            content = file_path.read_text()
+            content = self._read_text(path)
             
             if regex:
                 new_content = re.sub(pattern, replacement, content)
@@ -320,7 +679,7 @@ class EnhancedToolRegistry:
             if content == new_content:
                 return f"⚠️ No changes made (pattern not found)"
             
-            file_path.write_text(new_content)
+            self._write_text(path, new_content)
             return f"✅ Replaced in {path}"
         except Exception as e:
             return f"❌ Error: {e}"
@@ -329,13 +688,13 @@ class EnhancedToolRegistry:
         """Insert text at specific line"""
         file_path = Path(path)
         
-        if not file_path.exists():
+        if not self._exists(path):
             return f"❌ File not found: {path}"
         
         try:
-            lines = file_path.read_text().split('\n')
-            lines.insert(line_number - 1, text)
-            file_path.write_text('\n'.join(lines))
+            lines = self._read_text(path).split('\n')
+            lines.insert(int(line_number) - 1, text)
+            self._write_text(path, '\n'.join(lines))
             return f"✅ Inserted at line {line_number}"
         except Exception as e:
             return f"❌ Error: {e}"
@@ -344,13 +703,13 @@ class EnhancedToolRegistry:
         """Remove lines from file"""
         file_path = Path(path)
         
-        if not file_path.exists():
+        if not self._exists(path):
             return f"❌ File not found: {path}"
         
         try:
-            lines = file_path.read_text().split('\n')
-            del lines[start_line-1:end_line]
-            file_path.write_text('\n'.join(lines))
+            lines = self._read_text(path).split('\n')
+            del lines[int(start_line)-1:int(end_line)]
+            self._write_text(path, '\n'.join(lines))
             return f"✅ Removed lines {start_line}-{end_line}"
         except Exception as e:
             return f"❌ Error: {e}"
@@ -415,20 +774,19 @@ class EnhancedToolRegistry:
             return f"❌ Path not found: {path}"
         
         if file_path.is_file():
-            lines = len(file_path.read_text().split('\n'))
-            return f"📊 {lines} lines in {path}"
+            stats = count_file_lines(str(file_path))
+            if stats.error:
+                return f"❌ Read error: {stats.error}"
+            return (f"📊 {stats.lines} lines in {path} "
+                    f"(code {stats.code}, comment {stats.comment}, blank {stats.blank})")
         
         # Directory
-        total = 0
-        files = 0
-        for item in file_path.rglob('*.py'):
-            try:
-                total += len(item.read_text().split('\n'))
-                files += 1
-            except:
-                pass
-        
-        return f"📊 {total} lines across {files} Python files in {path}"
+        results = [r for r in count_lines_parallel(iter_code_files(str(file_path), {'.py'}))
+                   if not r.error]
+        total = sum(r.lines for r in results)
+        summary = f"📊 {total} lines across {len(results)} Python files in {path}"
+        breakdown = format_language_summary(summarize_by_language(results))
+        return f"{summary}\n{breakdown}" if breakdown else summary
     
     def search_in_files(self, pattern: str, path: str = ".", file_pattern: str = "*") -> str:
         """Search for text in files"""
@@ -461,6 +819,7 @@ class AgenticExecutor:
         self.llm = llm_adapter
         self.tools = tool_registry
         self.planner = planner
+        self.last_transaction: Optional[EditTransaction] = None
     
     def execute_task(self, user_request: str, auto_confirm: bool = False) -> str:
         """
@@ -483,52 +842,130 @@ class AgenticExecutor:
             if not Confirm.ask("\nExecute this plan?", default=True):
                 return "❌ Cancelled by user"
         
-        # Step 2: Execute
+        # Step 2: Execute (file edits are batched and written atomically)
         console.print("\n[yellow]⚙️ Executing plan...[/yellow]")
         results = []
-        
-        for step in steps:
-            console.print(f"\n[cyan]Step {step['step']}: {step['action']}[/cyan]")
-            
-            tool_name = step.get("tool")
-            params = step.get("params", {})
-            
-            if tool_name == "manual":
-                # Ask LLM to handle it
-                response = self.llm.chat(step["action"])
-                results.append(response)
-            elif tool_name in self.tools.tools:
-                # Execute tool
-                result = self.tools.call_tool(tool_name, **params)
-                results.append(result)
-                
-                # Mark as completed
-                self.planner.completed_steps.append(step["step"])
-            else:
-                results.append(f"⚠️ Unknown tool: {tool_name}")
+        hits_before = self.tools.cache.hits
+        self.tools.begin_transaction()
+        try:
+            self._run_steps(steps, results)
+        except BaseException:
+            restored = self.tools.rollback_transaction()
+            if restored:
+                console.print(f"[yellow]↩️ Rolled back edits to {len(restored)} file(s)[/yellow]")
+            raise
+        failed = [r for r in results if r.startswith(("❌", "⚠️"))]
+        txn = self.tools.transaction
+        if failed and txn and txn.touched_files and (
+                auto_confirm or not Confirm.ask(f"\n{len(failed)} step(s) failed. Keep this plan's file edits?",
+                                                default=False)):
+            restored = self.tools.rollback_transaction()
+            console.print(f"[yellow]↩️ Rolled back edits to {len(restored)} file(s)[/yellow]")
+        self.last_transaction = self.tools.commit_transaction()
+        if self.last_transaction and self.last_transaction.touched_files:
+            console.print("[dim]Use /rollback to undo this plan's file edits[/dim]")
         
         # Step 3: Summarize
-        console.print("\n[green]✅ Task completed![/green]")
+        if failed:
+            console.print(f"\n[yellow]⚠️ Task finished with {len(failed)} failed step(s)[/yellow]")
+        else:
+            console.print("\n[green]✅ Task completed![/green]")
         summary = "\n\n".join([f"Step {i+1}: {r}" for i, r in enumerate(results)])
+        reused = self.tools.cache.hits - hits_before
+        if reused:
+            note = f"♻️ Reused {reused} cached tool result(s) ({self.tools.cache.hits} this session)"
+            console.print(f"[dim]{note}[/dim]")
+            summary += f"\n\n{note}"
         
         return summary
     
-    def parse_tool_calls_from_response(self, response: str) -> List[Tuple[str, Dict]]:
-        """
-        Parse tool calls from LLM response.
-        Format: <tool:tool_name param1="value1" param2="value2"/>
+    def rollback_last_plan(self) -> List[str]:
+        """Restore every file edited by the most recent plan; returns restored paths"""
+        if not self.last_transaction:
+            return []
+        restored = self.last_transaction.rollback()
+        self.last_transaction = None
+        self.tools.cache.invalidate()
+        return restored
+    
+    def _run_steps(self, steps: List[Dict[str, Any]], results: List[str]):
         """
-        pattern = r'<tool:(\w+)\s+([^/>]+)/>'
-        matches = re.findall(pattern, response)
+        Execute plan steps as a dependency graph, appending results in plan order.
         
-        tool_calls = []
-        for tool_name, params_str in matches:
-            # Parse parameters
-            param_pattern = r'(\w+)="([^"]*)"'
-            params = dict(re.findall(param_pattern, params_str))
-            tool_calls.append((tool_name, params))
+        Ready read-only steps run together on a thread pool while the plan
+        table updates live; anything that may change state (edits, commands,
+        model calls, confirmations) runs alone on this thread.
+        """
+        read_only = self.tools.READ_ONLY_TOOLS
+        steps = normalize_steps(steps, read_only)
+        deps = step_dependencies(steps, read_only)
+        self.planner.current_plan = steps
+        self.planner.step_status = {step["step"]: "pending" for step in steps}
+        
+        done: Set[int] = set()
+        by_step: Dict[int, str] = {}
+        pending = list(steps)
+        with ThreadPoolExecutor(max_workers=PLAN_WORKERS) as pool:
+            while pending:
+                # Dependencies only point backwards, so the first pending step is always ready
+                ready = [step for step in pending if deps[step["step"]] <= done]
+                if ready[0]["tool"] in read_only:
+                    wave = [step for step in ready if step["tool"] in read_only]
+                else:
+                    wave = ready[:1]
+                
+                if len(wave) == 1:
+                    by_step[wave[0]["step"]] = self._run_step(wave[0])
+                else:
+                    self._run_parallel(wave, pool, by_step)
+                
+                for step in wave:
+                    done.add(step["step"])
+                    pending.remove(step)
         
-        return tool_calls
+        results.extend(by_step[step["step"]] for step in steps)
+        self.planner.display_plan()
+    
+    def _run_parallel(self, wave: List[Dict[str, Any]], pool: ThreadPoolExecutor, by_step: Dict[int, str]):
+        """Run independent read-only steps concurrently, updating the plan table as each finishes"""
+        # Workers must see edits staged so far; flush once here instead of racing in each call
+        if self.tools.transaction:
+            self.tools.transaction.flush()
+        console.print(f"\n[cyan]Steps {', '.join(str(s['step']) for s in wave)} in parallel[/cyan]")
+        for step in wave:
+            self.planner.set_status(step["step"], "running")
+        
+        with Live(self.planner.render_plan(), console=console, auto_refresh=False, transient=True) as live:
+            futures = {pool.submit(self._call_step_tool, step): step for step in wave}
+            for future in as_completed(futures):
+                step = futures[future]
+                result = future.result()
+                by_step[step["step"]] = result
+                self.planner.set_status(step["step"], "failed" if result.startswith("❌") else "done")
+                live.update(self.planner.render_plan(), refresh=True)
+    
+    def _call_step_tool(self, step: Dict[str, Any]) -> str:
+        return self.tools.call_tool(step["tool"], **step.get("params", {}))
+    
+    def _run_step(self, step: Dict[str, Any]) -> str:
+        """Execute one plan step on this thread"""
+        console.print(f"\n[cyan]Step {step['step']}: {step['action']}[/cyan]")
+        
+        tool_name = step.get("tool")
+        self.planner.set_status(step["step"], "running")
+        
+        if tool_name == "manual":
+            # Ask LLM to handle it
+            result = self.llm.chat(step["action"])
+        elif tool_name in self.tools.tools:
+            # Execute tool
+            result = self._call_step_tool(step)
+        else:
+            self.planner.set_status(step["step"], "failed")
+            return f"⚠️ Unknown tool: {tool_name}"
+        
+        self.planner.set_status(step["step"], "failed" if result.startswith("❌") else "done")
+        return result
 
 
 # Standalone testing
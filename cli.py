@@ -7,10 +7,10 @@ import time
 import requests
 import typer
 import yaml
-import json
 import re
 import ast
 import logging
+import textwrap
 from pathlib import Path
 from rich.console import Console
 from rich.panel import Panel
@@ -24,11 +24,22 @@ from rich.progress import Progress
 from rich.status import Status
 from rich.live import Live
 from difflib import unified_diff
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from tenacity import retry, stop_after_attempt, wait_fixed
 from dotenv import load_dotenv
-import magic
 from git import Repo
 from utils import save_api_key, load_api_key
+from patching import apply_patch, PatchError, NO_CHANGES
+from repo_index import select_repo_context, extract_python
+from language import detect_language as _detect_language
+from ts_extract import extract_tree_sitter, supports_extension
+from docgen import document_repo, SummaryCache
+from stream_render import StreamRenderer
+from fences import tokenize, code_blocks
+from history import HistoryStore
+from memory import ConversationBuffer
+from code_chunks import split_into_chunks, split_text_chunks, build_outline, fix_chunks, stitch_chunks, chunk_workers, common_indent
 
 # Import memory and tools for context-aware and agentic capabilities
 try:
@@ -62,7 +73,7 @@ logging.basicConfig(filename=str(Path.home() / ".blonde/debug.log"), level=loggi
 logger = logging.getLogger("blonde")
 
 try:
-    from model_selector import select_model
+    from model_selector import select_model, start_warmup, BackgroundAdapter
     MODEL_SELECTOR_AVAILABLE = True
     logger.info("Model selector loaded successfully")
 except ImportError as e:
@@ -102,10 +113,19 @@ HELP_TEXT = """
 """
 
 
-HISTORY_FILE = Path.home() / ".blonde_history_default.json"
+HISTORY_FILE = Path.home() / ".blonde_history_default.jsonl"
 EXCLUDED_DIRS = {"__pycache__", ".git", "venv", "node_modules", ".idea", ".mypy_cache"}
 INCLUDED_EXTS = {"py", "js", "ts", "java", "c", "cpp", "json", "yml", "yaml", "toml", "md"}
+SCAN_WORKERS = min(8, (os.cpu_count() or 1) + 4)
 repo_map_cache = {}
+# Chat turns loaded into the REPL at start (older turns stay on disk)
+HISTORY_TAIL = 200
+# Saved turns replayed into the conversation buffer when chat starts without saved state
+CHAT_REPLAY_TURNS = 40
+ERROR_REPLY = "Sorry, there was an error. Try again."
+# Source size above which _fix_file splits a file into chunks, for adapters
+# that do not report their context window (n_ctx)
+FIX_CHUNK_CHARS = 12_000
 CONFIG_FILE = Path.home() / ".blonde" / "config.json"
 CONFIG_FILE.parent.mkdir(exist_ok=True)
 
@@ -123,39 +143,16 @@ def set_key(model: str, key: str):
 
 
 def detect_language(file_path: str) -> str:
-    """Detects programming language from file content or extension.
+    """Detects programming language from file name, shebang or content.
     Args:
         file_path: Path to the file.
     Returns:
-        Language string (e.g., 'python', 'javascript').
-    Why it works: Uses file extension and content analysis via python-magic.
-    Pitfalls: Non-standard extensions may return 'unknown'; ensure python-magic is installed.
-    Learning: Explore tree-sitter for precise language parsing.
+        Language string (e.g., 'python', 'javascript', 'unknown').
+    Why it works: Extension/shebang tables and regex heuristics answer almost every file;
+        content-based results are cached per path and mtime (see language.py).
+    Pitfalls: libmagic is only loaded as a last resort, so it is optional at runtime.
     """
-    ext_lang_map = {
-        "py": "python", "js": "javascript", "ts": "typescript",
-        "java": "java", "c": "c", "cpp": "cpp"
-    }
-    ext = file_path.split(".")[-1].lower()
-    if ext in ext_lang_map:
-        return ext_lang_map[ext]
-    
-    try:
-        with open(file_path, "rb") as f:
-            content = f.read(1024)
-        mime = magic.from_buffer(content, mime=True)
-        if "python" in mime:
-            return "python"
-        elif "javascript" in mime or "ecmascript" in mime:
-            return "javascript"
-        elif "java" in mime:
-            return "java"
-        elif "c++" in mime or "c" in mime:
-            return "cpp" if ext == "cpp" else "c"
-        return ext_lang_map.get(ext, "unknown")
-    except Exception as e:
-        logger.debug(f"Language detection failed for {file_path}: {e}")
-        return ext_lang_map.get(ext, "unknown")
+    return _detect_language(file_path)
 
 def scan_repo(path: str) -> dict:
     """Walk through a repo, extract functions, classes, imports, and call graphs.
@@ -163,82 +160,69 @@ def scan_repo(path: str) -> dict:
         path: Directory path to scan.
     Returns:
         Dict mapping file paths to metadata.
-    Why it works: Uses AST for Python files, skips irrelevant dirs.
-    Pitfalls: Large repos may be slow; non-Python files have limited parsing.
-    Learning: Add tree-sitter for multi-language parsing.
+    Why it works: One AST pass per Python file (repo_index.extract_python) also records
+        symbol line spans and resolved call edges for repo_index.SymbolTable; JS/TS/Java/C/C++
+        go through reused tree-sitter parsers (ts_extract). Files are parsed on a thread pool.
+    Pitfalls: Without tree-sitter-languages installed, non-Python files stay "unparsed_<ext>".
     """
-    repo_map = {}
-    class CallGraphVisitor(ast.NodeVisitor):
-        def __init__(self):
-            self.calls = []
-        def visit_Call(self, node):
-            if isinstance(node.func, ast.Name):
-                self.calls.append(node.func.id)
-            elif isinstance(node.func, ast.Attribute):
-                self.calls.append(node.func.attr)
-            self.generic_visit(node)
-
+    files_to_scan = []
     for root, dirs, files in os.walk(path):
         dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
         for file in files:
             ext = file.split(".")[-1]
-            if ext not in INCLUDED_EXTS:
-                continue
-            file_path = os.path.join(root, file)
-            relative_path = os.path.relpath(file_path, path)
-            repo_map[relative_path] = {
-                "functions": [], "classes": [], "imports": [], "calls": []
-            }
-            try:
-                if ext == "py":
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        content = f.read()
-                    tree = ast.parse(content)
-                    visitor = CallGraphVisitor()
-                    visitor.visit(tree)
-                    for node in ast.walk(tree):
-                        if isinstance(node, ast.FunctionDef):
-                            repo_map[relative_path]["functions"].append(node.name)
-                        elif isinstance(node, ast.ClassDef):
-                            repo_map[relative_path]["classes"].append(node.name)
-                        elif isinstance(node, (ast.Import, ast.ImportFrom)):
-                            for alias in node.names:
-                                repo_map[relative_path]["imports"].append(alias.name)
-                    repo_map[relative_path]["calls"] = visitor.calls
-                else:
-                    repo_map[relative_path]["functions"].append(f"unparsed_{ext}")
-            except Exception as e:
-                repo_map[relative_path]["error"] = str(e)
-                logger.debug(f"Scan error for {file_path}: {e}")
-    return repo_map
+            if ext in INCLUDED_EXTS:
+                file_path = os.path.join(root, file)
+                files_to_scan.append((file_path, os.path.relpath(file_path, path), ext))
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+        entries = pool.map(lambda args: _scan_file(*args), files_to_scan)
+        return {relative_path: entry for (_, relative_path, _), entry in zip(files_to_scan, entries)}
+
+def _scan_file(file_path: str, relative_path: str, ext: str) -> dict:
+    """Extract scan_repo metadata for one file (runs on scan_repo's worker threads).
+    Args:
+        file_path: Path to read.
+        relative_path: Path relative to the scanned root (used for module names).
+        ext: File extension without the dot.
+    Returns:
+        Metadata dict; parse failures are recorded under "error".
+    """
+    entry = {"functions": [], "classes": [], "imports": [], "calls": [], "modules": [],
+             "symbols": [], "edges": []}
+    try:
+        if ext == "py":
+            with open(file_path, "r", encoding="utf-8") as f:
+                entry.update(extract_python(f.read(), relative_path))
+        elif supports_extension(ext):
+            with open(file_path, "rb") as f:
+                entry.update(extract_tree_sitter(f.read(), relative_path))
+        else:
+            entry["functions"].append(f"unparsed_{ext}")
+    except Exception as e:
+        entry["error"] = str(e)
+        logger.debug(f"Scan error for {file_path}: {e}")
+    return entry
 
 def render_code_blocks(text: str) -> None:
     """Renders Markdown text with code blocks using syntax highlighting.
     Args:
         text: Markdown text to render.
-    Why it works: Splits text into code and non-code segments, uses Syntax for highlighting.
+    Why it works: fences.tokenize splits text into code and non-code segments in one pass;
+        code is highlighted with Syntax.
     Pitfalls: Malformed Markdown may cause errors; handle gracefully.
-    Learning: Explore Rich’s Live for real-time rendering.
     """
-    text = text.strip()
-    if "```" not in text:
-        console.print(Markdown(text, style="white"))
-        return
-    segments = text.split("```")
-    for i, segment in enumerate(segments):
-        if i % 2 == 1:
+    for segment in tokenize(text.strip()):
+        if segment.kind == "code":
+            code = segment.text.strip()
+            if not code:
+                continue
             try:
-                lang, *code_lines = segment.split("\n", 1)
-                code = code_lines[0].strip() if code_lines else ""
-                if code:
-                    console.print(Syntax(code, lang.strip() or "python", theme="monokai", line_numbers=False))
+                console.print(Syntax(code, segment.lang or "python", theme="monokai", line_numbers=False))
             except Exception as e:
                 logger.debug(f"Render code error: {e}")
                 console.print(f"[red]Error rendering code: {e}[/red]")
-                console.print(segment.strip(), style="white")
-        else:
-            if segment.strip():
-                console.print(Markdown(segment.strip(), style="white"))
+                console.print(code, style="white")
+        elif segment.text.strip():
+            console.print(Markdown(segment.text.strip(), style="white"))
 
 def extract_code(text: str) -> str:
     """Extracts code from markdown-style ``` blocks.
@@ -246,14 +230,12 @@ def extract_code(text: str) -> str:
         text: Input text with potential code blocks.
     Returns:
         Extracted code or original text.
-    Why it works: Uses regex to extract code reliably.
-    Pitfalls: Malformed Markdown may return partial code.
-    Learning: Study re module for advanced pattern matching.
+    Why it works: Shares the single-pass fences tokenizer with render_code_blocks.
+    Pitfalls: Only the first block is returned; use fences.code_blocks for multi-file answers.
     """
-    if "```" in text:
-        matches = re.findall(r"```(?:\w+)?\n([\s\S]*?)```", text)
-        if matches:
-            return matches[0].strip()
+    blocks = code_blocks(text)
+    if blocks:
+        return blocks[0].text.strip()
     return text.strip()
 
 # =====================
@@ -360,11 +342,12 @@ def load_adapter(model_name="openrouter", offline: bool = False, debug: bool = F
 # bot = load_adapter()
 
 
-def get_response(prompt: str, debug: bool = False) -> str:
+def get_response(prompt: str, debug: bool = False, grammar: str | None = None) -> str:
     """Fetches response from the active adapter with spinner.
     Args:
         prompt: User input.
         debug: Enable debug.
+        grammar: Output grammar for adapters that support constrained decoding (see _ask_model).
     Returns:
         Response string.
     Why it works: Spinner shows progress; retries handle transients.
@@ -372,55 +355,76 @@ def get_response(prompt: str, debug: bool = False) -> str:
     Learning: Explore Rich Status for custom spinners.
     """
     with Status("Blonde is thinking...", spinner="dots") as status:
-        if debug:
-            logger.debug(f"Prompt: {prompt[:500]}")
-        try:
+        return _ask_model(prompt, debug, grammar)
+
+def _ask_model(prompt: str, debug: bool = False, grammar: str | None = None) -> str:
+    """Fetches response from the active adapter without a spinner.
+    Args:
+        prompt: User input.
+        debug: Enable debug.
+        grammar: Built-in grammar name (models.grammars) constraining the output;
+            ignored by adapters without supports_grammar, which rely on the prompt.
+    Returns:
+        Response string (ERROR_REPLY on failure).
+    Why it works: Safe to call from worker threads, where Rich allows only one live display.
+    """
+    if debug:
+        logger.debug(f"Prompt: {prompt[:500]}")
+    try:
+        if grammar and getattr(bot, "supports_grammar", False) is True:
+            response = bot.chat(prompt, grammar=grammar)
+        else:
             response = bot.chat(prompt)
-            if isinstance(response, str):
-                return response.strip()
-            elif isinstance(response, dict):
-                content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
-                if not content:
-                    raise ValueError("Empty content")
-                return content.strip()
-            else:
-                raise ValueError(f"Unexpected type: {type(response)}")
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 429:
-                retry_after = e.response.headers.get("Retry-After", 10)
-                logger.warning(f"Rate limit, waiting {retry_after}s")
-                console.print(f"[yellow]Rate limit hit, waiting {retry_after}s...[/yellow]")
-                time.sleep(int(retry_after))
-                raise
+        if isinstance(response, str):
+            return response.strip()
+        elif isinstance(response, dict):
+            content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+            if not content:
+                raise ValueError("Empty content")
+            return content.strip()
+        else:
+            raise ValueError(f"Unexpected type: {type(response)}")
+    except requests.exceptions.HTTPError as e:
+        if e.response.status_code == 429:
+            retry_after = e.response.headers.get("Retry-After", 10)
+            logger.warning(f"Rate limit, waiting {retry_after}s")
+            console.print(f"[yellow]Rate limit hit, waiting {retry_after}s...[/yellow]")
+            time.sleep(int(retry_after))
             raise
-        except Exception as e:
-            logger.error(f"API Error: {e}")
-            console.print(f"[red]API Error: {e}[/red]")
-            return "Sorry, there was an error. Try again."
+        raise
+    except Exception as e:
+        logger.error(f"API Error: {e}")
+        console.print(f"[red]API Error: {e}[/red]")
+        return ERROR_REPLY
+
+def history_store() -> HistoryStore:
+    """Opens the append-only history for the active model.
+    Returns:
+        HistoryStore backed by HISTORY_FILE (JSONL).
+    Why it works: Turns are appended as they happen, so nothing is lost on a crash.
+    Pitfalls: A pre-JSONL history (.json) next to it is migrated on first open.
+    """
+    return HistoryStore(HISTORY_FILE, legacy_path=HISTORY_FILE.with_suffix(".json"))
 
 def save_history(history: list) -> None:
-    """Saves chat history to JSON file.
+    """Replaces the stored chat history.
     Args:
         history: List of (sender, message) tuples.
-    Why it works: Persists chat for session continuity.
-    Pitfalls: File permissions may cause errors.
-    Learning: Study JSON serialization.
+    Why it works: Atomic rewrite; chat itself appends per turn and never needs this.
+    Pitfalls: Overwrites turns not in the list.
     """
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(history, f)
+    history_store().replace([tuple(turn) for turn in history])
 
-def load_history() -> list:
-    """Loads chat history from JSON file.
+def load_history(limit: int = HISTORY_TAIL) -> list:
+    """Loads the most recent chat turns.
+    Args:
+        limit: Number of newest turns to return.
     Returns:
-        List of (sender, message) tuples.
-    Why it works: Restores previous chats for context.
-    Pitfalls: Corrupted JSON may cause errors.
-    Learning: Explore pathlib for file handling.
+        List of (sender, message) tuples, oldest first.
+    Why it works: Reads backwards from the end of the JSONL file, so start-up cost
+        does not grow with the history.
     """
-    if HISTORY_FILE.exists():
-        with open(HISTORY_FILE, "r") as f:
-            return json.load(f)
-    return []
+    return history_store().tail(limit)
 
 def stream_response(text: str, delay: float = 0.01) -> str:
     """Streams text with markdown rendering like ChatGPT.
@@ -429,47 +433,19 @@ def stream_response(text: str, delay: float = 0.01) -> str:
         delay: Delay between chunks (characters).
     Returns:
         Full text buffer.
-    Why it works: Uses Rich Live to update markdown rendering in real-time.
+    Why it works: StreamRenderer prints each finished block once and keeps only the
+        open block in a throttled Live region, so cost stays linear in response length.
     Pitfalls: Very fast on small texts; adjust delay as needed.
-    Learning: Rich's Live allows dynamic content updates without flickering.
     """
-    buffer = ""
-    
     # Split into chunks for smoother streaming (2-3 chars at a time)
     chunk_size = 3
-    chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
-    
-    with Live("", console=console, refresh_per_second=20) as live:
-        for chunk in chunks:
-            buffer += chunk
-            
-            # Render current buffer as markdown with cursor
-            try:
-                # Add a blinking cursor effect
-                display_text = buffer + "▊"
-                
-                # Try to render as markdown
-                if "```" in buffer and buffer.count("```") % 2 == 0:
-                    # Complete code block - render it properly
-                    live.update(Markdown(buffer))
-                else:
-                    # Still typing - show as text with cursor
-                    live.update(Text(display_text, style="white"))
-                    
-            except Exception as e:
-                # Fallback to plain text
-                live.update(Text(buffer + "▊", style="white"))
-            
+    with StreamRenderer(console) as renderer:
+        for i in range(0, len(text), chunk_size):
+            renderer.feed(text[i:i + chunk_size])
             time.sleep(delay)
-        
-        # Final render without cursor - use the full render_code_blocks function
-        live.update("")
-    
-    # Now render the complete markdown properly
-    render_code_blocks(buffer)
     console.print()  # Add spacing
-    
-    return buffer
+
+    return renderer.buffer
 
 def suggest_terminal_command(user_input: str) -> str | None:
     """Suggests terminal commands based on user input.
@@ -506,7 +482,7 @@ def main(
     global bot, HISTORY_FILE
     bot = load_adapter(model_name=model, debug=debug)
     model_name_lower = bot.__class__.__name__.replace("Adapter", "").lower()
-    HISTORY_FILE = Path.home() / f".blonde_history_{model_name_lower}.json"
+    HISTORY_FILE = Path.home() / f".blonde_history_{model_name_lower}.jsonl"
 
 @app.command()
 def chat(
@@ -543,11 +519,22 @@ def chat(
         else:
             console.print(f"[dim]Will download: {model}[/dim]")
     
-    # Load the adapter
-    bot = load_adapter(model_name="openrouter", offline=offline, debug=debug, gguf_model=model, cached_path=cached_model_path)
+    # A cached local model is prefetched during the logo and loaded in the background
+    # while memory comes up; anything else (including downloads) loads in the foreground
+    background_load = bool(cached_model_path) and MODEL_SELECTOR_AVAILABLE
+    warmup = start_warmup(os.path.basename(cached_model_path), cached_model_path) if background_load else None
+    if not background_load:
+        bot = load_adapter(model_name="openrouter", offline=offline, debug=debug, gguf_model=model, cached_path=cached_model_path)
     
     # Show logo and welcome
     animate_logo()
+    if background_load:
+        # Started after the logo, which clears the screen, so the adapter's messages stay visible
+        bot = BackgroundAdapter(
+            lambda: load_adapter(model_name="openrouter", offline=offline, debug=debug, gguf_model=model,
+                                 cached_path=cached_model_path),
+            warmup=warmup,
+        )
     
     # Initialize memory manager if enabled (AFTER logo so it's visible)
     memory_manager = None
@@ -558,6 +545,13 @@ def chat(
         except Exception as e:
             logger.warning(f"Failed to initialize memory: {e}")
             console.print("[yellow]⚠ Memory disabled - install chromadb to enable[/yellow]")
+
+    # Everything below holds on to the adapter, so resolve the background load first
+    if background_load:
+        proxy = bot
+        with console.status("[dim]Loading model...[/dim]"):
+            bot = proxy.wait()
+        console.print(f"[dim]✓ {proxy.status()}[/dim]")
     
     # Initialize tool registry if agentic mode enabled (AFTER logo so it's visible)
     tool_registry = None
@@ -567,7 +561,7 @@ def chat(
     if agentic and AGENTIC_AVAILABLE:
         try:
             enhanced_tools = EnhancedToolRegistry(require_confirmation=True)
-            task_planner = TaskPlanner(bot)
+            task_planner = TaskPlanner(bot, tool_names=list(enhanced_tools.tools))
             agentic_executor = AgenticExecutor(bot, enhanced_tools, task_planner)
             console.print("[dim]✓ Enhanced agentic mode enabled - I can autonomously complete tasks![/dim]")
         except Exception as e:
@@ -594,16 +588,42 @@ def chat(
     
     console.print(Panel(Text(" | ".join(welcome_parts), justify="center"), border_style="cyan"))
 
-    chat_history = load_history()
+    store = history_store()
+    archived = store.maybe_compact()
+    if archived:
+        console.print(f"[dim]Archived {archived} older turns to {store.archive_path} (still included in /save)[/dim]")
+    chat_history = deque(store.tail(HISTORY_TAIL), maxlen=HISTORY_TAIL)
+
+    # Recent turns verbatim + a running summary of older ones, so prompts stay bounded
+    conversation = ConversationBuffer(
+        summarize=lambda prompt: _ask_model(prompt, debug),
+        background=chunk_workers(bot) > 1,
+        state_file=HISTORY_FILE.with_name(HISTORY_FILE.stem + ".conversation.json"),
+        is_error=lambda reply: not reply.strip() or reply == ERROR_REPLY,
+    )
+    # Resume the saved summary and unfolded turns; replay history only when there is no saved state
+    if not chat_history:
+        conversation.clear()
+    elif not conversation.restore():
+        for sender, message in list(chat_history)[-CHAT_REPLAY_TURNS:]:
+            conversation.add(sender, message)
+
+    def record_turn(sender: str, message: str) -> None:
+        chat_history.append((sender, message))
+        try:
+            store.append(sender, message)
+        except OSError as e:
+            logger.warning(f"Could not save history: {e}")
 
     while True:
         user_input = Prompt.ask("[bold green]You[/bold green]")
         
         # Handle exit commands
         if user_input.lower() in ("exit", "quit"):
-            save_history(chat_history)
+            conversation.close()
             if memory_manager:
                 console.print("[dim]💾 Saving memories...[/dim]")
+                memory_manager.flush()
             console.print("[bold red]Goodbye! 👋[/bold red]")
             break
             
@@ -614,13 +634,16 @@ def chat(
             enhanced_help += " • [bold]/tools[/bold] → list available tools\n"
             enhanced_help += " • [bold]/plan[/bold] → show current execution plan\n"
             enhanced_help += " • [bold]/agent <task>[/bold] → execute task autonomously\n"
+            enhanced_help += " • [bold]/rollback[/bold] → undo file edits from the last /agent plan\n"
             enhanced_help += " • [bold]/context[/bold] → show conversation context\n"
             console.print(Panel(Text(enhanced_help, justify="left"), border_style="cyan"))
             continue
             
         # Handle /clear command
         if user_input.lower() == "/clear":
-            chat_history = []
+            chat_history.clear()
+            store.clear()
+            conversation.clear()
             if memory_manager:
                 memory_manager.clear_session()
             console.print("[bold yellow]💨 Chat and memory cleared.[/yellow]")
@@ -629,10 +652,8 @@ def chat(
         # Handle /save command
         if user_input.lower() == "/save":
             out_file = "blonde_chat.md"
-            with open(out_file, "w") as f:
-                for sender, msg in chat_history:
-                    f.write(f"**{sender}:** {msg}\n\n")
-            console.print(f"[bold green]💾 Chat exported to {out_file}[/bold green]")
+            turns = store.export_markdown(out_file)
+            console.print(f"[bold green]💾 Chat exported to {out_file} ({turns} messages)[/bold green]")
             continue
         
         # NEW: Handle /memory command
@@ -676,11 +697,24 @@ def chat(
             console.print(f"\n[bold cyan]🤖 Executing task autonomously...[/bold cyan]\n")
             result = agentic_executor.execute_task(task, auto_confirm=False)
             console.print(f"\n[green]Result:[/green]\n{result}")
-            chat_history.append(("Agent", result))
+            record_turn("Agent", result)
+            conversation.add("You", task)
+            conversation.add("Agent", result)
             if memory_manager:
                 memory_manager.add_conversation(task, result)
             continue
         
+        # Handle /rollback command (undo last agent plan's file edits)
+        if user_input.lower() == "/rollback" and agentic_executor:
+            restored = agentic_executor.rollback_last_plan()
+            if restored:
+                console.print(f"[green]↩️ Restored {len(restored)} file(s):[/green]")
+                for restored_path in restored:
+                    console.print(f"  • {restored_path}")
+            else:
+                console.print("[yellow]Nothing to roll back.[/yellow]")
+            continue
+        
         # NEW: Handle /context command
         if user_input.lower() == "/context" and memory_manager:
             context = memory_manager.get_context_for_prompt(user_input, max_context_length=500)
@@ -696,15 +730,14 @@ def chat(
             continue
 
         # Add to chat history
-        chat_history.append(("You", user_input))
+        record_turn("You", user_input)
         
-        # Build context-aware prompt
-        prompt = user_input
+        # Build context-aware prompt: long-term memory + rolling conversation
+        context = ""
         if memory_manager:
             # Retrieve relevant context from long-term memory
             context = memory_manager.get_context_for_prompt(user_input, max_context_length=2000)
-            if context:
-                prompt = f"Context from previous conversations:\n{context}\n\nCurrent query: {user_input}"
+        prompt = conversation.build_prompt(user_input, extra_context=context)
         
         console.print("[magenta]Blonde:[/magenta]")
         try:
@@ -716,7 +749,9 @@ def chat(
                 response = get_response(prompt, debug)
                 render_code_blocks(response)
             
-            chat_history.append(("Blonde", response))
+            record_turn("Blonde", response)
+            conversation.add("You", user_input)
+            conversation.add("Blonde", response)
             
             # Store in memory if enabled
             if memory_manager:
@@ -854,7 +889,7 @@ def create(
 
     repo_path = os.path.dirname(file) if os.path.dirname(file) else "."
     repo_map = scan_repo(repo_path) if os.path.isdir(repo_path) else {}
-    context = str(repo_map)[:2000]
+    context = select_repo_context(repo_map, file, query=description)
     lang = detect_language(file)
     
     # Build enhanced prompt with memory context
@@ -870,10 +905,12 @@ def create(
     Use language: {lang}.
     Repo context: {context}
     Description: {enhanced_description}
+    If the description requires additional files, output each one as its own fenced code block
+    preceded by a line "File: <relative path>"; the main file comes first.
     Output code:
     """
     response = get_response(prompt, debug)
-    cleaned = extract_code(response)
+    cleaned, extra_files = _split_generated_files(response, file)
     
     # Iterative refinement
     if iterative:
@@ -887,7 +924,7 @@ def create(
             refine_prompt = f"""
             Refine this code based on feedback: {feedback}
             Current code: {cleaned}
-            Output ONLY the refined source code (language: {lang}).
+            Output ONLY the refined source code (language: {lang}) in a single fenced code block.
             """
             cleaned = extract_code(get_response(refine_prompt, debug))
 
@@ -908,7 +945,17 @@ def create(
         console.print(Panel(f"[cyan]Suggested related files:\n{suggestions}[/cyan]", 
                           title="Agentic Suggestions", border_style="cyan"))
         if Prompt.ask("Create suggested files?", choices=["y", "n"], default="n") == "y":
-            console.print("[yellow]Agentic file creation will be added in future version[/yellow]")
+            related_prompt = f"""
+            Write the related files you suggested for {file}:
+            {suggestions}
+
+            Main file ({lang}):
+            {cleaned}
+
+            Output each file as a fenced code block preceded by a line "File: <relative path>".
+            """
+            related = [seg for seg in code_blocks(get_response(related_prompt, debug)) if seg.filename]
+            extra_files.extend(seg for seg in related if seg.filename not in {f.filename for f in extra_files})
 
     if os.path.exists(file):
         if Prompt.ask(f"[yellow]{file} exists. Overwrite?[/yellow]", choices=["y", "n"], default="n") == "n":
@@ -920,6 +967,8 @@ def create(
         with open(file, "w", encoding="utf-8") as f:
             f.write(cleaned)
         console.print(f"[green]✓ File created: {file}[/green]")
+        if extra_files:
+            _write_generated_files(extra_files, repo_path)
         
         # Store in memory
         if memory_manager:
@@ -955,7 +1004,8 @@ def fix(
     debug: bool = typer.Option(False, help="Enable debug logging"),
     offline: bool = typer.Option(False, help="Use offline GGUF model"),
     model: str = typer.Option(None, help="Model name (e.g., TheBloke/CodeLlama-7B-GGUF/codellama-7b.Q4_K_M.gguf)"),
-    memory: bool = typer.Option(True, help="Enable context memory for better fixes")
+    memory: bool = typer.Option(True, help="Enable context memory for better fixes"),
+    patch: bool = typer.Option(True, "--patch/--full", help="Ask the model for search/replace hunks instead of the whole file")
 ):
     """Fix bugs with context awareness from past fixes.
     
@@ -996,7 +1046,7 @@ def fix(
             for relative_path in repo_map_cache[path]:
                 file_path = os.path.join(path, relative_path)
                 try:
-                    diff = _fix_file(file_path, repo_map_cache[path], export, preview, iterative, suggest, debug, memory_manager)
+                    diff = _fix_file(file_path, repo_map_cache[path], export, preview, iterative, suggest, debug, memory_manager, patch=patch)
                     if diff:
                         diffs.append(diff)
                 except Exception as e:
@@ -1009,7 +1059,7 @@ def fix(
                     progress.update(task, advance=1)
     else:
         try:
-            diff = _fix_file(path, repo_map_cache.get(os.path.dirname(path)), export, preview, iterative, suggest, debug, memory_manager)
+            diff = _fix_file(path, repo_map_cache.get(os.path.dirname(path)), export, preview, iterative, suggest, debug, memory_manager, patch=patch)
             if diff:
                 diffs.append(diff)
         except Exception as e:
@@ -1071,7 +1121,66 @@ def fix(
         else:
             console.print("[yellow]Not a git repo; skipping commit.[/yellow]")
 
-def _fix_file(file: str, repo_map: dict | None, export: str | None, preview: bool, iterative: bool, suggest: bool, debug: bool, memory_manager=None) -> tuple | None:
+def _split_generated_files(response: str, file: str) -> tuple:
+    """Separates the main file from extra files in a multi-block create response.
+    Args:
+        response: Model response, possibly with several fenced blocks.
+        file: Path of the file being created.
+    Returns:
+        (main file code, list of fences.Segment for other labelled blocks).
+    Why it works: The block labelled with the target path wins; otherwise the first unlabelled one.
+    Pitfalls: Unlabelled extra blocks are ignored since there is no path to write them to.
+    """
+    blocks = code_blocks(response)
+    if not blocks:
+        return response.strip(), []
+    target = os.path.normpath(file)
+
+    def is_target(seg) -> bool:
+        name = os.path.normpath(seg.filename)
+        return name == target or target.endswith(os.sep + name) or name == os.path.basename(target)
+
+    main = next((seg for seg in blocks if seg.filename and is_target(seg)), None)
+    main = main or next((seg for seg in blocks if not seg.filename), blocks[0])
+    extras = {}
+    for seg in blocks:
+        if seg is not main and seg.filename:
+            extras[os.path.normpath(seg.filename)] = seg  # a later block for the same path wins
+    return main.text.strip(), list(extras.values())
+
+def _write_generated_files(files: list, base_dir: str) -> list:
+    """Previews and writes extra files from a multi-file answer, with confirmation.
+    Args:
+        files: fences.Segment code blocks with a filename.
+        base_dir: Directory relative paths are resolved against (the created file's directory).
+    Returns:
+        Paths actually written.
+    Pitfalls: Paths escaping base_dir are skipped rather than written.
+    """
+    base = os.path.abspath(base_dir)
+    written = []
+    console.print(f"\n[bold yellow]The answer also contains {len(files)} related file(s):[/bold yellow]")
+    for seg in files:
+        rel = os.path.normpath(seg.filename)
+        if os.path.isabs(rel) or rel.startswith(".."):
+            console.print(f"[red]Skipping {seg.filename}: outside {base_dir}[/red]")
+            continue
+        if base_dir != "." and rel.startswith(os.path.normpath(base_dir) + os.sep):
+            rel = os.path.relpath(rel, base_dir)  # model repeated the directory prefix
+        path = os.path.join(base, rel)
+        console.print(Panel(Syntax(seg.text.strip(), seg.lang or detect_language(path), theme="monokai",
+                                   line_numbers=True), title=os.path.relpath(path), border_style="cyan"))
+        question = f"[yellow]{path} exists. Overwrite?[/yellow]" if os.path.exists(path) else f"Create {os.path.relpath(path)}?"
+        if Prompt.ask(question, choices=["y", "n"], default="n" if os.path.exists(path) else "y") == "n":
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(seg.text.strip() + "\n")
+        console.print(f"[green]✓ File created: {path}[/green]")
+        written.append(path)
+    return written
+
+def _fix_file(file: str, repo_map: dict | None, export: str | None, preview: bool, iterative: bool, suggest: bool, debug: bool, memory_manager=None, patch: bool = True) -> tuple | None:
     """Internal helper to fix one file with repo context and memory.
     Args:
         file: Path to file.
@@ -1082,9 +1191,11 @@ def _fix_file(file: str, repo_map: dict | None, export: str | None, preview: boo
         suggest: Show structured suggestions.
         debug: Enable debug logging.
         memory_manager: Optional memory manager for context-aware fixes.
+        patch: Request search/replace hunks instead of the full corrected file.
     Returns:
         Tuple (file, (original, cleaned, diff_text, suggestion)) or None.
     Why it works: Uses memory to learn from past fixes and apply patterns.
+    Pitfalls: Patch mode falls back to full-file regeneration if hunks don't apply.
     """
     try:
         with open(file, "r", encoding="utf-8") as f:
@@ -1095,7 +1206,7 @@ def _fix_file(file: str, repo_map: dict | None, export: str | None, preview: boo
         return None
 
     lang = detect_language(file)
-    context = str(repo_map)[:2000] if repo_map else ""
+    context = select_repo_context(repo_map, file)
     
     # Add memory context for better fixes
     memory_context = ""
@@ -1118,17 +1229,23 @@ def _fix_file(file: str, repo_map: dict | None, export: str | None, preview: boo
         suggestion = get_response(prompt, debug)
         console.print(Panel(Markdown(suggestion), title="Suggested Fixes", border_style="yellow"))
 
-    prompt = f"""
+    cleaned = None
+    if len(original) > _fix_char_budget(bot):
+        cleaned = _fix_file_in_chunks(file, original, lang, context + memory_context, debug, patch)
+    elif patch:
+        cleaned = _fix_file_with_patch(file, original, lang, context + memory_context, debug)
+    if cleaned is None:
+        prompt = f"""
     You are a professional code fixer.
     Repository map (for context): {context}{memory_context}
     Given the following file, output ONLY the corrected source code.
     Use language: {lang}.
-    Do not include explanations, notes, or markdown fences.
+    Return the whole file in a single fenced code block, with no explanations or notes.
     Preserve formatting.
     File ({file}):
     {original}
     """
-    cleaned = extract_code(get_response(prompt, debug))
+        cleaned = extract_code(get_response(prompt, debug, grammar="code"))
 
     # Validate cleaned code
     if "error processing your request" in cleaned.lower():
@@ -1158,7 +1275,7 @@ def _fix_file(file: str, repo_map: dict | None, export: str | None, preview: boo
             Current version: {cleaned}
             Output ONLY the refined source code (language: {lang}).
             """
-            cleaned = extract_code(get_response(prompt, debug))
+            cleaned = extract_code(get_response(prompt, debug, grammar="code"))
             if "error processing your request" in cleaned.lower():
                 console.print(f"[red]Failed to refine {file}: Invalid response from API[/red]")
                 return None
@@ -1228,6 +1345,116 @@ def _fix_file(file: str, repo_map: dict | None, export: str | None, preview: boo
     return (file, (original, cleaned, diff_text, suggestion))
 
 
+def _fix_file_with_patch(file: str, original: str, lang: str, context: str, debug: bool, spinner: bool = True) -> str | None:
+    """Asks the model for search/replace hunks and applies them to the original.
+    Args:
+        file: Path to file (for the prompt).
+        original: Current file contents.
+        lang: Detected language.
+        context: Repo and memory context for the prompt.
+        debug: Enable debug logging.
+        spinner: Show the thinking spinner (disable when called from worker threads).
+    Returns:
+        Patched source, or None if the response could not be applied.
+    Why it works: Output tokens scale with the size of the fix, not the file.
+    Pitfalls: Hunks that match nowhere (or in several places) are rejected, not guessed.
+    """
+    prompt = f"""
+    You are a professional code fixer.
+    Repository map (for context): {context}
+    Fix the bugs in the file below. Do NOT output the whole file.
+    Output ONLY search/replace blocks in exactly this format, one per change:
+<<<<<<< SEARCH
+exact lines copied from the file
+=======
+corrected lines
+>>>>>>> REPLACE
+    Copy enough unchanged lines into SEARCH for it to match exactly one place.
+    Use language: {lang}. If nothing needs fixing, output only {NO_CHANGES}.
+    File ({file}):
+    {original}
+    """
+    if spinner:
+        response = get_response(prompt, debug, grammar="search_replace")
+    else:
+        response = _ask_model(prompt, debug, grammar="search_replace")
+    if "error processing your request" in response.lower() or response == ERROR_REPLY:
+        return None
+    try:
+        return apply_patch(original, response)
+    except PatchError as e:
+        logger.warning(f"Patch for {file} did not apply, regenerating full file: {e}")
+        console.print(f"[yellow]Patch did not apply cleanly to {file}; falling back to full rewrite[/yellow]")
+        return None
+
+
+def _fix_char_budget(adapter) -> int:
+    """Largest source (in chars) sent to the model in one fix prompt.
+    Args:
+        adapter: Active model adapter.
+    Returns:
+        Character budget derived from the adapter's context window (n_ctx);
+        FIX_CHUNK_CHARS for adapters that do not report one.
+    Pitfalls: ~3 chars/token is a rough estimate; half the window is kept for output.
+    """
+    n_ctx = getattr(adapter, "n_ctx", None)
+    if isinstance(n_ctx, int) and n_ctx > 0:
+        return max(1000, n_ctx * 3 // 2)
+    return FIX_CHUNK_CHARS
+
+def _fix_file_in_chunks(file: str, original: str, lang: str, context: str, debug: bool, patch: bool) -> str | None:
+    """Fixes a file too large for one prompt by fixing AST-aligned chunks in parallel.
+    Args:
+        file: Path to file.
+        original: Current file contents.
+        lang: Detected language.
+        context: Repo and memory context shared by every chunk.
+        debug: Enable debug logging.
+        patch: Ask for search/replace hunks per chunk.
+    Returns:
+        Stitched source (validated by the caller), or None if chunking failed.
+    Why it works: Each chunk carries the file outline, so cross-references stay visible.
+    Pitfalls: A single function larger than the budget is still sent whole.
+    """
+    budget = _fix_char_budget(bot)
+    try:
+        chunks = split_into_chunks(original, budget) if lang == "python" else split_text_chunks(original, budget)
+        outline = build_outline(original) if lang == "python" else ""
+    except SyntaxError:
+        chunks, outline = split_text_chunks(original, budget), ""
+    if not chunks:
+        return None
+    console.print(f"[cyan]{file} exceeds the model context; fixing {len(chunks)} chunks[/cyan]")
+    shared_context = f"{context}\nOutline of the whole file:\n{outline}" if outline else context
+
+    def fix_one(chunk):
+        # Methods of a split class are indented; send them dedented and restore after
+        indent = common_indent(chunk.text)
+        section = textwrap.dedent(chunk.text)
+        fixed = None
+        if patch:
+            fixed = _fix_file_with_patch(f"{file}, {chunk.label}", section, lang, shared_context, debug, spinner=False)
+        if fixed is None:
+            prompt = f"""
+    You are a professional code fixer.
+    Repository map (for context): {shared_context}
+    Below is ONE section ({chunk.label}) of the file {file}. Output ONLY the corrected section, in a single fenced code block.
+    Use language: {lang}. Do not include explanations or the rest of the file.
+    Section:
+    {section}
+    """
+            response = _ask_model(prompt, debug, grammar="code")
+            if response == ERROR_REPLY or "error processing your request" in response.lower():
+                logger.warning(f"Keeping original {chunk.label} of {file}: model error")
+                return None
+            fixed = extract_code(response)
+        return textwrap.indent(fixed, indent) if indent else fixed
+
+    with Status(f"Fixing {len(chunks)} chunks...", spinner="dots"):
+        fixed = fix_chunks(chunks, fix_one, chunk_workers(bot))
+    return stitch_chunks(chunks, fixed)
+
+
 @app.command()
 def doc(
     path: str,
@@ -1242,6 +1469,8 @@ def doc(
     """Generate context-aware documentation with memory.
     
     Enhanced features:
+    - Large repos: files are summarized concurrently, then per package, then overall;
+      summaries are cached by content hash so reruns only touch changed files
     - Memory: Learns documentation patterns
     - Styles: Choose between concise, detailed, or tutorial formats
     - Context: Uses past documentation for consistency
@@ -1274,46 +1503,23 @@ def doc(
 
     if os.path.isdir(path):
         repo_map = scan_repo(path)
-        with Progress() as progress:
-            task = progress.add_task("[cyan]Scanning files...", total=len(repo_map))
-            context = ["Repository structure:"]
-            for rel_path, info in repo_map.items():
-                context.append(f"- {rel_path}: {info.get('functions', [])}, {info.get('classes', [])}, {info.get('imports', [])}")
-                try:
-                    with open(os.path.join(path, rel_path), "r", encoding="utf-8") as f:
-                        context.append(f"\n### {rel_path}\n```\n{f.read()}\n```")
-                except Exception as e:
-                    context.append(f"Error reading {rel_path}: {e}")
-                    logger.debug(f"Doc error for {rel_path}: {e}")
-                progress.update(task, advance=1)
-
-        # Build style-specific instructions
-        style_instructions = {
-            "concise": "Provide brief, one-line summaries for each component.",
-            "detailed": "Provide comprehensive explanations with examples and usage patterns.",
-            "tutorial": "Provide step-by-step explanations suitable for learning, with code examples."
-        }
-        style_guide = style_instructions.get(style, style_instructions["detailed"])
-        
-        # Get memory context for consistent documentation
+        cache = SummaryCache()
+        # Past documentation keeps the overview's style consistent between runs
         mem_context = ""
         if memory_manager:
-            mem_ctx = memory_manager.get_context_for_prompt("documentation patterns", max_context_length=500)
-            if mem_ctx:
-                mem_context = f"\n\nConsistent documentation style from past docs:\n{mem_ctx}"
-        
-        prompt = f"""
-        You are a code documentation expert. Given the repository structure and file contents below, provide a Markdown summary of the codebase.
-        Documentation style: {style_guide}
-        For each file, list:
-        - Purpose
-        - Key functions/classes
-        - Dependencies (imports)
-        - One-line summary
-        Group by module/folder if applicable. Output only the Markdown summary.{mem_context}
-        {chr(10).join(context)}
-        """
-        response = get_response(prompt, debug)
+            mem_context = memory_manager.get_context_for_prompt("documentation patterns", max_context_length=500) or ""
+        with Progress() as progress:
+            task = progress.add_task("[cyan]Summarizing files...", total=len(repo_map))
+            repo_doc = document_repo(
+                path, list(repo_map), summarize=lambda prompt: _ask_model(prompt, debug), style=style,
+                cache=cache, max_workers=chunk_workers(bot),
+                on_file_done=lambda _: progress.update(task, advance=1),
+                is_error=lambda reply: not reply.strip() or reply == ERROR_REPLY,
+                style_context=mem_context,
+            )
+        cache.save()
+        console.print(f"[dim]{repo_doc.model_calls} model calls, {repo_doc.cached} summaries reused from cache[/dim]")
+        response = repo_doc.render()
     else:
         with open(path, "r", encoding="utf-8") as f:
             code = f.read()
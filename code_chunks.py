@@ -0,0 +1,218 @@
+"""
+AST-aware chunking for fixing files larger than the model context
+
+Splits a source file into contiguous chunks along top-level function and
+class boundaries (oversized classes are split further into methods), fixes
+the chunks independently and in parallel, then stitches them back in order.
+Every chunk is sent together with a compact file outline (imports and
+signatures) so the model still sees the shape of the whole file.
+
+Usage:
+    chunks = split_into_chunks(source, max_chars=8000)
+    outline = build_outline(source)
+    fixed = fix_chunks(chunks, lambda chunk: my_fixer(chunk.text, outline))
+    new_source = stitch_chunks(chunks, fixed)
+"""
+
+import ast
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger("blonde")
+
+# Default parallelism for chunk fixing (adapters may force serial execution)
+DEFAULT_CHUNK_WORKERS = 4
+
+
+@dataclass
+class Chunk:
+    """A contiguous slice of a file, 1-based inclusive line numbers"""
+    index: int
+    start_line: int
+    end_line: int
+    text: str
+    names: Tuple[str, ...] = ()
+
+    @property
+    def label(self) -> str:
+        names = ", ".join(self.names) if self.names else "module code"
+        return f"lines {self.start_line}-{self.end_line} ({names})"
+
+
+def _node_start(node: ast.AST) -> int:
+    """First line of a node, including its decorators"""
+    decorators = getattr(node, "decorator_list", None) or []
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+
+def _segments(nodes: List[ast.stmt], first: int, last: int) -> List[Tuple[int, int, Tuple[str, ...], ast.stmt]]:
+    """
+    Cut lines first..last into one segment per node.
+
+    Each segment runs from its node's start to the line before the next
+    node, so comments and blank lines travel with the following definition
+    and the segments cover every line exactly once.
+    """
+    segments = []
+    for i, node in enumerate(nodes):
+        start = first if i == 0 else _node_start(node)
+        end = _node_start(nodes[i + 1]) - 1 if i + 1 < len(nodes) else last
+        name = getattr(node, "name", None)
+        segments.append((start, end, (name,) if name else (), node))
+    return segments
+
+
+def _size(lines: List[str], start: int, end: int) -> int:
+    return sum(len(line) for line in lines[start - 1:end])
+
+
+def _split_segment(lines: List[str], seg, max_chars: int):
+    """Split an oversized class into header + per-method segments"""
+    start, end, names, node = seg
+    if not isinstance(node, ast.ClassDef) or len(node.body) < 2:
+        return [seg]
+    members = node.body
+    if isinstance(members[0], ast.Expr) and isinstance(getattr(members[0], "value", None), ast.Constant):
+        members = members[1:]  # docstring stays with the class header
+    header_end = _node_start(members[0]) - 1
+    parts = [(start, header_end, names, node)]
+    for sub_start, sub_end, sub_names, sub_node in _segments(members, header_end + 1, end):
+        qualified = tuple(f"{names[0]}.{n}" for n in sub_names) if names else sub_names
+        parts.append((sub_start, sub_end, qualified, sub_node))
+    return parts
+
+
+def split_into_chunks(source: str, max_chars: int) -> List[Chunk]:
+    """
+    Split Python source into chunks of at most ~max_chars along AST boundaries.
+
+    Adjacent small definitions are grouped together; a single definition
+    larger than max_chars becomes its own (oversized) chunk.
+
+    Raises:
+        SyntaxError: If the source does not parse
+    """
+    lines = source.splitlines(keepends=True)
+    if not lines:
+        return []
+    tree = ast.parse(source)
+    if not tree.body:
+        return [Chunk(0, 1, len(lines), source)]
+
+    segments = []
+    for seg in _segments(tree.body, 1, len(lines)):
+        if _size(lines, seg[0], seg[1]) > max_chars:
+            segments.extend(_split_segment(lines, seg, max_chars))
+        else:
+            segments.append(seg)
+
+    chunks: List[Chunk] = []
+    group_start, group_end, group_names = None, None, ()
+    for start, end, names, _ in segments:
+        if group_start is not None and _size(lines, group_start, end) > max_chars:
+            chunks.append(Chunk(len(chunks), group_start, group_end,
+                                "".join(lines[group_start - 1:group_end]), group_names))
+            group_start, group_names = None, ()
+        if group_start is None:
+            group_start = start
+        group_end = end
+        group_names += names
+    chunks.append(Chunk(len(chunks), group_start, group_end,
+                        "".join(lines[group_start - 1:group_end]), group_names))
+    return chunks
+
+
+def split_text_chunks(source: str, max_chars: int) -> List[Chunk]:
+    """Line-based fallback for non-Python files: cut at blank lines near the budget"""
+    lines = source.splitlines(keepends=True)
+    chunks: List[Chunk] = []
+    start, size, last_blank = 1, 0, None
+    for i, line in enumerate(lines, 1):
+        size += len(line)
+        if not line.strip():
+            last_blank = i
+        if size > max_chars and i > start:
+            cut = last_blank if last_blank and last_blank >= start else i
+            chunks.append(Chunk(len(chunks), start, cut, "".join(lines[start - 1:cut])))
+            start, last_blank = cut + 1, None
+            size = _size(lines, start, i)
+    if start <= len(lines):
+        chunks.append(Chunk(len(chunks), start, len(lines), "".join(lines[start - 1:])))
+    return chunks
+
+
+def build_outline(source: str, max_chars: int = 2000) -> str:
+    """
+    Compact outline of a Python file: imports plus function/class signatures.
+
+    Sent with every chunk so the model knows what the rest of the file defines.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return ""
+
+    def signature(fn) -> str:
+        prefix = "async def" if isinstance(fn, ast.AsyncFunctionDef) else "def"
+        return f"{prefix} {fn.name}({ast.unparse(fn.args)})"
+
+    out = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            out.append(ast.unparse(node))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            out.append(signature(node))
+        elif isinstance(node, ast.ClassDef):
+            out.append(f"class {node.name}:")
+            for member in node.body:
+                if isinstance(member, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    out.append(f"    {signature(member)}")
+    outline = "\n".join(out)
+    if len(outline) > max_chars:
+        outline = outline[:max_chars] + "\n# ... (outline truncated)"
+    return outline
+
+
+def common_indent(text: str) -> str:
+    """Leading whitespace shared by all non-blank lines (what textwrap.dedent removes)"""
+    prefixes = [line[:len(line) - len(line.lstrip())] for line in text.splitlines() if line.strip()]
+    return os.path.commonprefix(prefixes) if prefixes else ""
+
+
+def fix_chunks(chunks: List[Chunk], fix_fn: Callable[[Chunk], Optional[str]],
+               max_workers: int = DEFAULT_CHUNK_WORKERS) -> List[Optional[str]]:
+    """
+    Run fix_fn over chunks concurrently, preserving order.
+
+    fix_fn returns the replacement text for a chunk, or None to keep it as is.
+    """
+    if max_workers <= 1 or len(chunks) <= 1:
+        return [fix_fn(chunk) for chunk in chunks]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        return list(pool.map(fix_fn, chunks))
+
+
+def stitch_chunks(chunks: List[Chunk], fixed: List[Optional[str]]) -> str:
+    """Reassemble chunks in order, substituting fixed text where provided"""
+    parts = []
+    for chunk, text in zip(chunks, fixed):
+        if text is None:
+            parts.append(chunk.text)
+            continue
+        if chunk.text.endswith("\n") and not text.endswith("\n"):
+            text += "\n"
+        parts.append(text)
+    return "".join(parts)
+
+
+def chunk_workers(adapter) -> int:
+    """Parallelism to use for an adapter (1 if it cannot serve concurrent requests)"""
+    if not getattr(adapter, "supports_concurrency", True):
+        return 1
+    limit = getattr(adapter, "max_concurrency", None)
+    if isinstance(limit, int) and limit > 0:
+        return min(DEFAULT_CHUNK_WORKERS, limit)
+    return DEFAULT_CHUNK_WORKERS
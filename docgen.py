@@ -0,0 +1,250 @@
+"""
+Map-reduce documentation for large repositories in BlondE-CLI
+
+Instead of one prompt holding every file, documentation is built bottom-up:
+
+1. Map:    each file is read from disk by a worker and summarized on its own
+2. Reduce: file summaries are combined into one summary per package (directory)
+3. Reduce: package summaries are combined into a repository overview
+
+Summaries are cached on disk by content hash (file text + style + prompt
+version), so re-documenting a repo only calls the model for files that
+changed, and for the packages that contain them.
+
+Usage:
+    cache = SummaryCache()
+    doc = document_repo("src", list(repo_map), summarize=ask_model, style="concise", cache=cache)
+    cache.save()
+    print(doc.render())
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fileio import atomic_write
+from code_chunks import build_outline
+
+logger = logging.getLogger("blonde")
+
+DOC_CACHE_FILE = Path.home() / ".blonde" / "doc_cache.json"
+
+# Bump when prompts change so stale summaries are not reused
+PROMPT_VERSION = 1
+
+# Largest file excerpt sent in one per-file prompt; longer files are sent as
+# outline + head
+MAX_FILE_CHARS = 12_000
+
+# Largest batch of child summaries combined in one reduce prompt; larger
+# packages are reduced in batches, then the batch summaries are reduced again
+MAX_REDUCE_CHARS = 12_000
+
+DEFAULT_DOC_WORKERS = 4
+
+STYLE_GUIDES = {
+    "concise": "Keep it to one or two sentences.",
+    "detailed": "Be thorough: purpose, key functions/classes, and how they are used.",
+    "tutorial": "Explain for a newcomer, describing how the pieces fit together.",
+}
+
+
+class SummaryCache:
+    """JSON file mapping content hashes to summaries"""
+
+    def __init__(self, path: Path = DOC_CACHE_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        try:
+            self._entries: Dict[str, str] = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self.hits += 1
+            return value
+
+    def put(self, key: str, summary: str) -> None:
+        with self._lock:
+            self._entries[key] = summary
+            self._dirty = True
+
+    def save(self) -> None:
+        """Write the cache if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                atomic_write(str(self.path), json.dumps(self._entries))
+                self._dirty = False
+            except OSError as e:
+                logger.warning(f"Could not save doc cache {self.path}: {e}")
+
+
+@dataclass
+class RepoDoc:
+    """Result of document_repo"""
+    overview: str
+    packages: Dict[str, str] = field(default_factory=dict)
+    files: Dict[str, str] = field(default_factory=dict)
+    model_calls: int = 0
+    cached: int = 0
+
+    def render(self) -> str:
+        """Markdown: overview, then each package with its files"""
+        out = ["# Repository Overview", "", self.overview.strip(), ""]
+        for package in sorted(self.packages):
+            out.append(f"## {package or '(root)'}")
+            out.append("")
+            out.append(self.packages[package].strip())
+            out.append("")
+            for path in sorted(p for p in self.files if package_of(p) == package):
+                out.append(f"- `{path}`: {self.files[path].strip()}")
+            out.append("")
+        return "\n".join(out).rstrip() + "\n"
+
+
+def package_of(relative_path: str) -> str:
+    """Directory a file belongs to, as a forward-slash path ('' for the root)"""
+    return os.path.dirname(relative_path).replace(os.sep, "/")
+
+
+def content_key(kind: str, text: str, style: str) -> str:
+    digest = hashlib.sha256(f"{PROMPT_VERSION}\0{kind}\0{style}\0".encode("utf-8"))
+    digest.update(text.encode("utf-8", errors="replace"))
+    return digest.hexdigest()
+
+
+def file_excerpt(relative_path: str, text: str, max_chars: int = MAX_FILE_CHARS) -> str:
+    """The part of a file sent to the model: all of it, or outline + head if too long"""
+    if len(text) <= max_chars:
+        return text
+    outline = build_outline(text, max_chars=max_chars // 3) if relative_path.endswith(".py") else ""
+    head = text[:max_chars - len(outline)]
+    prefix = f"# Outline of the whole file:\n{outline}\n\n" if outline else ""
+    return f"{prefix}# First {len(head)} of {len(text)} characters:\n{head}"
+
+
+def file_prompt(relative_path: str, excerpt: str, style: str) -> str:
+    return (
+        f"Summarize the file `{relative_path}` for repository documentation. "
+        f"State its purpose, key functions/classes and notable dependencies. "
+        f"{STYLE_GUIDES.get(style, STYLE_GUIDES['detailed'])} Output only Markdown prose, no headings.\n\n"
+        f"```\n{excerpt}\n```"
+    )
+
+
+def reduce_prompt(name: str, summaries: List[str], style: str, level: str, style_context: str = "") -> str:
+    joined = "\n".join(summaries)
+    consistency = f"Keep consistent with the style of past documentation:\n{style_context}\n\n" if style_context else ""
+    return (
+        f"Below are summaries of the parts of the {level} `{name or '(root)'}`. "
+        f"Write a summary of the {level} as a whole: what it is for and how its parts relate. "
+        f"{STYLE_GUIDES.get(style, STYLE_GUIDES['detailed'])} Output only Markdown prose, no headings.\n\n"
+        f"{consistency}{joined}"
+    )
+
+
+def document_repo(root: str, paths: List[str], summarize: Callable[[str], str], style: str = "detailed",
+                  cache: Optional[SummaryCache] = None, max_workers: int = DEFAULT_DOC_WORKERS,
+                  on_file_done: Optional[Callable[[str], None]] = None,
+                  is_error: Callable[[str], bool] = lambda reply: not reply.strip(),
+                  style_context: str = "") -> RepoDoc:
+    """
+    Document a repository with per-file, per-package and repo-level summaries.
+
+    Args:
+        root: Repository root the paths are relative to
+        paths: Repo-relative files to document (e.g. scan_repo keys)
+        summarize: Prompt -> reply; called concurrently from worker threads
+        style: One of STYLE_GUIDES
+        cache: Summary cache (nothing is cached if None)
+        max_workers: Concurrent model calls (1 for adapters that cannot overlap)
+        on_file_done: Called on the calling thread as each file finishes
+        is_error: Predicate for replies that must not be cached
+        style_context: Past documentation (e.g. from memory) the overview should stay
+            consistent with; only the overview sees it, so file and package summaries
+            stay cached when it changes
+
+    Returns:
+        RepoDoc with every summary and how many model calls were needed
+    """
+    doc = RepoDoc(overview="")
+    calls_lock = threading.Lock()
+
+    def cached_call(key: str, prompt_fn: Callable[[], str]) -> str:
+        if cache is not None:
+            hit = cache.get(key)
+            if hit is not None:
+                return hit
+        reply = summarize(prompt_fn())
+        with calls_lock:
+            doc.model_calls += 1
+        if cache is not None and not is_error(reply):
+            cache.put(key, reply)
+        return reply
+
+    def summarize_file(relative_path: str) -> str:
+        # Read inside the worker so only in-flight files are held in memory
+        try:
+            with open(os.path.join(root, relative_path), "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError as e:
+            logger.debug(f"Doc read error for {relative_path}: {e}")
+            return f"(could not read: {e})"
+        if not text.strip():
+            return "(empty file)"
+        return cached_call(content_key("file", f"{relative_path}\0{text}", style),
+                           lambda: file_prompt(relative_path, file_excerpt(relative_path, text), style))
+
+    def reduce(name: str, summaries: List[str], level: str, context: str = "") -> str:
+        # Batch oversized inputs, summarize each batch, then reduce the batch summaries
+        while sum(len(s) for s in summaries) > MAX_REDUCE_CHARS and len(summaries) > 1:
+            batches, current = [], []
+            for summary in summaries:
+                if current and sum(len(s) for s in current) + len(summary) > MAX_REDUCE_CHARS:
+                    batches.append(current)
+                    current = []
+                current.append(summary)
+            batches.append(current)
+            if len(batches) == 1:
+                break
+            summaries = [reduce(name, batch, level) for batch in batches]
+        return cached_call(content_key(level, f"{name}\0{context}\0" + "\n".join(summaries), style),
+                           lambda: reduce_prompt(name, summaries, style, level, context))
+
+    workers = max(1, max_workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(summarize_file, p): p for p in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            doc.files[path] = future.result()
+            if on_file_done:
+                on_file_done(path)
+
+        by_package: Dict[str, List[str]] = {}
+        for path in sorted(doc.files):
+            by_package.setdefault(package_of(path), []).append(f"- {path}: {doc.files[path]}")
+        package_futures = {pool.submit(reduce, pkg, items, "package"): pkg for pkg, items in by_package.items()}
+        for future in as_completed(package_futures):
+            doc.packages[package_futures[future]] = future.result()
+
+    if len(doc.packages) == 1 and not style_context:
+        doc.overview = next(iter(doc.packages.values()))
+    elif doc.packages:
+        doc.overview = reduce(os.path.basename(os.path.abspath(root)),
+                              [f"- {pkg or '(root)'}: {doc.packages[pkg]}" for pkg in sorted(doc.packages)],
+                              "repository", style_context)
+    doc.cached = cache.hits if cache is not None else 0
+    return doc
@@ -0,0 +1,128 @@
+"""
+Single-pass tokenizer for fenced code blocks in model responses
+
+Splits a response into typed segments in one linear scan:
+
+    Segment(kind="text", ...)                       prose between blocks
+    Segment(kind="code", lang="python", filename="app.py", ...)
+
+Code segments carry their language, character span and, when the model
+labelled the block, a target filename, taken from the info string
+(```python title="app.py"``` / ```app.py```) or from a label line right
+before the fence ("**app.py**", "File: src/app.py", "### `app.py`").
+
+extract_code, render_code_blocks, the stream renderer and multi-file
+`create` all share this tokenizer, so a response is parsed once.
+
+Usage:
+    for seg in tokenize(response):
+        if seg.kind == "code":
+            print(seg.lang, seg.filename, seg.text)
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+FENCE_RE = re.compile(r"^[ \t]*(`{3,}|~{3,})[ \t]*([^\n`]*?)[ \t]*$")
+
+_TITLE_RE = re.compile(r"""(?:title|file|filename|path)\s*=\s*["']?([^"'\s]+)""")
+_PATH_RE = r"[\w./\\-]*\w\.[A-Za-z0-9_+-]+"
+_LABEL_RE = re.compile(
+    r"^[ \t]*(?:#{1,6}[ \t]*|[-*][ \t]+)?(?:\*\*|__)?(?:File(?:name)?|Path)?:?[ \t]*"
+    rf"`?({_PATH_RE})`?(?:\*\*|__)?[ \t]*:?[ \t]*$",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class Segment:
+    """A run of prose or one fenced code block; start/end are offsets into the response"""
+    kind: str
+    text: str
+    start: int
+    end: int
+    lang: str = ""
+    filename: Optional[str] = None
+    closed: bool = True
+
+
+def match_fence(line: str) -> Optional[Tuple[str, str]]:
+    """(marker, info string) if the line is a fence, else None"""
+    match = FENCE_RE.match(line.rstrip("\r\n"))
+    return (match.group(1), match.group(2)) if match else None
+
+
+def closes_fence(line: str, marker: str) -> bool:
+    """True if line closes a block opened with marker (same char, at least as long, no info)"""
+    fence = match_fence(line)
+    return bool(fence) and not fence[1] and fence[0][0] == marker[0] and len(fence[0]) >= len(marker)
+
+
+def parse_info(info: str) -> Tuple[str, Optional[str]]:
+    """Split a fence info string into (language, filename)"""
+    title = _TITLE_RE.search(info)
+    words = info.split()
+    first = words[0] if words else ""
+    filename = title.group(1) if title else None
+    if ":" in first and not filename:
+        # ```python:src/app.py
+        first, _, filename = first.partition(":")
+    elif re.fullmatch(_PATH_RE, first) and not filename:
+        # ```src/app.py -- the language is implied by the extension
+        filename, first = first, ""
+    return first.strip("{}.").lower(), filename or None
+
+
+def _label_before(text: str) -> Optional[str]:
+    """Filename from the last non-blank line of the prose preceding a fence"""
+    for line in reversed(text.rsplit("\n", 3)[-3:]):
+        if line.strip():
+            match = _LABEL_RE.match(line)
+            return match.group(1) if match else None
+    return None
+
+
+def tokenize(text: str) -> List[Segment]:
+    """
+    Split text into text and code segments in a single pass.
+
+    An unclosed fence runs to the end of the text and is marked closed=False.
+    Segment texts exclude the fence lines themselves.
+    """
+    segments: List[Segment] = []
+    pos = 0
+    text_start = 0
+    block = None  # (marker, lang, filename, content start offset, fence start offset)
+    for line in text.splitlines(keepends=True):
+        line_end = pos + len(line)
+        if block is None:
+            fence = match_fence(line)
+            if fence:
+                prose = text[text_start:pos]
+                if prose:
+                    segments.append(Segment("text", prose, text_start, pos))
+                lang, filename = parse_info(fence[1])
+                block = (fence[0], lang, filename or _label_before(prose), line_end, pos)
+        elif closes_fence(line, block[0]):
+            marker, lang, filename, content_start, fence_start = block
+            segments.append(Segment("code", text[content_start:pos], fence_start, line_end, lang, filename))
+            block = None
+            text_start = line_end
+        pos = line_end
+
+    if block is not None:
+        marker, lang, filename, content_start, fence_start = block
+        code = text[content_start:]
+        closed = code.rstrip().endswith(marker)  # "x = 1```" closes on the last code line
+        if closed:
+            code = code.rstrip()[:-len(marker)]
+        segments.append(Segment("code", code, fence_start, len(text), lang, filename, closed=closed))
+    elif text_start < len(text):
+        segments.append(Segment("text", text[text_start:], text_start, len(text)))
+    return segments
+
+
+def code_blocks(text: str) -> List[Segment]:
+    """Only the code segments of text"""
+    return [seg for seg in tokenize(text) if seg.kind == "code"]
@@ -0,0 +1,552 @@
+"""
+File I/O helpers shared by the BlondE-CLI tool registries
+
+Provides:
+1. Streaming line counting (constant memory, parallel across files)
+2. Per-language totals with blank and comment line counts
+3. Ranged reads by line or byte offset, backed by a cached line index
+4. Atomic (temp file + fsync + rename) writes and batched edit transactions
+
+Usage:
+    stats = count_file_lines("big.log")
+    results = count_lines_parallel(iter_code_files("src", {".py", ".js"}))
+    totals = summarize_by_language(results)
+    page = read_file_range("big.log", start_line=5000, max_lines=200)
+    print(page.text + page.marker())
+
+    txn = EditTransaction()
+    txn.stage("app.py", txn.read("app.py").replace("foo", "bar"))
+    txn.commit()      # one atomic write per touched file
+    txn.rollback()    # restore every file the transaction touched
+"""
+
+import os
+import mmap
+import logging
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from language import UNKNOWN, language_from_name
+
+logger = logging.getLogger("blonde")
+
+# Read size for streaming scans; large enough to amortize syscalls,
+# small enough that memory stays flat regardless of file size.
+CHUNK_SIZE = 1024 * 1024
+
+# Longest prefix of a single line we keep around while looking for its end.
+# Only the start of a line matters for blank/comment classification.
+MAX_LINE_PREFIX = 4096
+
+# Files at least this large are memory-mapped instead of read into memory
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# Every Nth line start is recorded in the line index; lookups skip at most
+# N-1 newlines from the nearest checkpoint, keeping the index small.
+LINE_INDEX_STRIDE = 256
+
+# Number of per-file line indexes kept in memory
+LINE_INDEX_CACHE_SIZE = 32
+
+# Default page size for ranged reads when the caller gives no limit
+DEFAULT_READ_BYTES = 256 * 1024
+
+# Single-line comment markers per language (see language.LANGUAGE_BY_EXT; block comments are not tracked)
+COMMENT_PREFIXES = {
+    **dict.fromkeys(("python", "ruby", "bash", "zsh", "fish", "perl", "r", "elixir", "julia", "nim",
+                     "yaml", "toml", "make", "cmake", "docker", "terraform"), (b"#",)),
+    **dict.fromkeys(("javascript", "typescript", "java", "kotlin", "scala", "groovy", "c", "cpp", "csharp",
+                     "go", "rust", "swift", "objectivec", "dart", "zig", "fsharp", "protobuf", "scss",
+                     "less"), (b"//",)),
+    **dict.fromkeys(("sql", "lua", "haskell"), (b"--",)),
+    "php": (b"//", b"#"),
+}
+
+
+@dataclass
+class LineStats:
+    """Line counts for a single file"""
+    path: str
+    language: str
+    lines: int = 0
+    blank: int = 0
+    comment: int = 0
+    error: Optional[str] = None
+
+    @property
+    def code(self) -> int:
+        return self.lines - self.blank - self.comment
+
+
+def count_newlines(path: str, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Count lines by scanning the file in fixed-size binary chunks.
+
+    A trailing line without a newline counts as a line, matching
+    ``len(f.readlines())``.
+    """
+    count = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            count += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        count += 1
+    return count
+
+
+def count_file_lines(path: str, chunk_size: int = CHUNK_SIZE) -> LineStats:
+    """
+    Count total, blank and comment lines of one file without loading it.
+
+    Files without comment markers (logs, data, unknown languages) are only
+    counted with count_newlines(); their blank and comment counts stay 0.
+
+    Args:
+        path: File to scan
+        chunk_size: Bytes read per iteration
+
+    Returns:
+        LineStats for the file (``error`` is set if it could not be read)
+    """
+    language = language_from_name(str(path)) or UNKNOWN
+    stats = LineStats(path=str(path), language=language)
+    prefixes = COMMENT_PREFIXES.get(language, ())
+    if not prefixes:
+        try:
+            stats.lines = count_newlines(path, chunk_size)
+        except OSError as e:
+            stats.error = str(e)
+            logger.debug(f"Line count failed for {path}: {e}")
+        return stats
+
+    def classify(line: bytes):
+        stats.lines += 1
+        stripped = line.strip()
+        if not stripped:
+            stats.blank += 1
+        elif stripped.startswith(prefixes):
+            stats.comment += 1
+
+    try:
+        carry = b""
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                lines = (carry + chunk).split(b"\n")
+                carry = lines.pop()
+                for line in lines:
+                    classify(line)
+                if len(carry) > MAX_LINE_PREFIX:
+                    # Pathologically long line: keep just enough to classify it
+                    carry = carry.lstrip()[:MAX_LINE_PREFIX]
+        if carry:
+            classify(carry)
+    except OSError as e:
+        stats.error = str(e)
+        logger.debug(f"Line count failed for {path}: {e}")
+    return stats
+
+
+def iter_code_files(root: str, extensions: Optional[Set[str]] = None) -> Iterable[str]:
+    """Yield files under root, optionally filtered by suffix (e.g. {'.py'})"""
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if extensions is None or Path(name).suffix in extensions:
+                yield os.path.join(dirpath, name)
+
+
+def count_lines_parallel(paths: Iterable[str], max_workers: Optional[int] = None) -> List[LineStats]:
+    """
+    Count lines for many files concurrently.
+
+    Args:
+        paths: Files to scan
+        max_workers: Thread pool size (defaults to a small multiple of CPUs)
+
+    Returns:
+        LineStats per file, in input order
+    """
+    paths = list(paths)
+    if not paths:
+        return []
+    workers = max_workers or min(32, (os.cpu_count() or 4) * 2)
+    if len(paths) == 1 or workers == 1:
+        return [count_file_lines(p) for p in paths]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(count_file_lines, paths))
+
+
+def summarize_by_language(results: Iterable[LineStats]) -> Dict[str, Dict[str, int]]:
+    """Aggregate per-file stats into per-language totals (unreadable files skipped)"""
+    totals: Dict[str, Dict[str, int]] = {}
+    for stats in results:
+        if stats.error:
+            continue
+        entry = totals.setdefault(
+            stats.language, {"files": 0, "lines": 0, "blank": 0, "comment": 0, "code": 0}
+        )
+        entry["files"] += 1
+        entry["lines"] += stats.lines
+        entry["blank"] += stats.blank
+        entry["comment"] += stats.comment
+        entry["code"] += stats.code
+    return dict(sorted(totals.items(), key=lambda item: item[1]["lines"], reverse=True))
+
+
+def format_language_summary(totals: Dict[str, Dict[str, int]]) -> str:
+    """Render per-language totals as plain text lines for tool output"""
+    rows = []
+    for language, t in totals.items():
+        rows.append(
+            f"  {language}: {t['lines']} lines in {t['files']} files "
+            f"(code {t['code']}, comment {t['comment']}, blank {t['blank']})"
+        )
+    return "\n".join(rows)
+
+
+# ==================== Ranged Reads ====================
+
+@dataclass
+class LineIndex:
+    """Sparse line-start index for one version of a file"""
+    size: int
+    mtime_ns: int
+    total_lines: int
+    stride: int
+    checkpoints: array  # byte offset of every stride-th line start
+
+
+@dataclass
+class FileRange:
+    """A slice of a file returned by read_file_range"""
+    path: str
+    text: str
+    size: int
+    start_byte: int
+    end_byte: int
+    total_lines: Optional[int] = None
+    start_line: Optional[int] = None
+    end_line: Optional[int] = None
+    partial_line: bool = False  # end_line was cut at the byte budget
+
+    @property
+    def truncated(self) -> bool:
+        return self.start_byte > 0 or self.end_byte < self.size
+
+    def marker(self) -> str:
+        """Human/LLM-readable note describing what was left out, or ''"""
+        if not self.truncated:
+            return ""
+        if self.partial_line:
+            shown = f"part of line {self.end_line} (bytes {self.start_byte}-{self.end_byte} of {self.size})"
+            hint = f"use offset={self.end_byte} to continue"
+        elif self.start_line is not None:
+            shown = f"lines {self.start_line}-{self.end_line} of {self.total_lines}"
+            if self.end_line < self.total_lines:
+                hint = f"use start_line={self.end_line + 1} to continue"
+            else:
+                hint = "end of file reached"
+        else:
+            shown = f"bytes {self.start_byte}-{self.end_byte} of {self.size}"
+            hint = (f"use offset={self.end_byte} to continue"
+                    if self.end_byte < self.size else "end of file reached")
+        return f"\n... [truncated: showing {shown}; {hint}]"
+
+
+_line_index_cache: "OrderedDict[str, LineIndex]" = OrderedDict()
+_line_index_lock = threading.Lock()
+
+
+class _FileView:
+    """Context manager exposing a file as bytes (mmap for large files)"""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self._file = None
+        self._map = None
+
+    def __enter__(self):
+        self._file = open(self.path, "rb")
+        if self.size and self.size >= MMAP_THRESHOLD:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map
+        return self._file.read()
+
+    def __exit__(self, *exc):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+def _build_line_index(view, size: int, mtime_ns: int) -> LineIndex:
+    stride = LINE_INDEX_STRIDE
+    checkpoints = array("Q", [0])
+    newlines = 0
+    pos = view.find(b"\n")
+    while pos != -1:
+        newlines += 1
+        if newlines % stride == 0 and pos + 1 < size:
+            checkpoints.append(pos + 1)
+        pos = view.find(b"\n", pos + 1)
+    trailing = 1 if size and view[size - 1:size] != b"\n" else 0
+    return LineIndex(size=size, mtime_ns=mtime_ns, total_lines=newlines + trailing,
+                     stride=stride, checkpoints=checkpoints)
+
+
+def get_line_index(path: str, view=None) -> LineIndex:
+    """
+    Return the line index for a file, building it on first use.
+
+    Indexes are cached per resolved path and reused until the file's size
+    or mtime changes.
+    """
+    key = str(Path(path).resolve())
+    st = os.stat(key)
+    with _line_index_lock:
+        cached = _line_index_cache.get(key)
+        if cached and cached.size == st.st_size and cached.mtime_ns == st.st_mtime_ns:
+            _line_index_cache.move_to_end(key)
+            return cached
+
+    if view is None:
+        with _FileView(key, st.st_size) as v:
+            index = _build_line_index(v, st.st_size, st.st_mtime_ns)
+    else:
+        index = _build_line_index(view, st.st_size, st.st_mtime_ns)
+
+    with _line_index_lock:
+        _line_index_cache[key] = index
+        _line_index_cache.move_to_end(key)
+        while len(_line_index_cache) > LINE_INDEX_CACHE_SIZE:
+            _line_index_cache.popitem(last=False)
+    return index
+
+
+def _line_start(view, index: LineIndex, line: int) -> int:
+    """Byte offset where 1-based ``line`` starts"""
+    target = line - 1
+    pos = index.checkpoints[target // index.stride]
+    for _ in range(target % index.stride):
+        pos = view.find(b"\n", pos) + 1
+    return pos
+
+
+def _align_utf8(view, pos: int, size: int) -> int:
+    """Move pos forward past UTF-8 continuation bytes so slices decode cleanly"""
+    while pos < size and (view[pos] & 0xC0) == 0x80:
+        pos += 1
+    return pos
+
+
+def read_file_range(path: str, start_line: Optional[int] = None, max_lines: Optional[int] = None,
+                    offset: Optional[int] = None, max_bytes: Optional[int] = None) -> FileRange:
+    """
+    Read part of a file by line range or byte range without loading it whole.
+
+    Args:
+        path: File to read
+        start_line: 1-based first line (line mode, the default)
+        max_lines: Maximum number of lines to return
+        offset: Byte offset to start at (byte mode; ignores start_line)
+        max_bytes: Maximum bytes to return (defaults to DEFAULT_READ_BYTES)
+
+    Returns:
+        FileRange with the decoded text and position bookkeeping
+
+    Raises:
+        UnicodeDecodeError: If the requested range is not valid UTF-8
+        OSError: If the file cannot be read
+    """
+    size = os.path.getsize(path)
+    limit = max_bytes if max_bytes is not None else DEFAULT_READ_BYTES
+
+    with _FileView(path, size) as view:
+        if offset is not None:
+            start = _align_utf8(view, min(max(offset, 0), size), size)
+            end = _align_utf8(view, min(start + limit, size), size)
+            return FileRange(path=str(path), text=bytes(view[start:end]).decode("utf-8"),
+                             size=size, start_byte=start, end_byte=end)
+
+        index = get_line_index(path, view)
+        first = min(max(start_line or 1, 1), max(index.total_lines, 1))
+        start = _line_start(view, index, first) if index.total_lines else 0
+
+        end, line, partial = start, first - 1, False
+        while end < size and (max_lines is None or line - first + 1 < max_lines):
+            nl = view.find(b"\n", end)
+            line_end = size if nl == -1 else nl + 1
+            if line_end - start > limit:
+                if line < first:
+                    # Single line longer than the byte budget: cut it
+                    end, line, partial = _align_utf8(view, start + limit, size), first, True
+                break
+            end, line = line_end, line + 1
+
+        return FileRange(path=str(path), text=bytes(view[start:end]).decode("utf-8"),
+                         size=size, start_byte=start, end_byte=end,
+                         total_lines=index.total_lines, start_line=first, end_line=line,
+                         partial_line=partial)
+
+
+# ==================== Atomic Writes ====================
+
+def atomic_write(path: str, content, encoding: str = "utf-8") -> None:
+    """
+    Replace a file's contents atomically.
+
+    Writes to a temp file in the same directory, fsyncs it, then renames it
+    over the target so readers (and crashes) only ever see the old or the
+    new file. Existing permissions are preserved.
+
+    Args:
+        path: Destination file
+        content: str (encoded with ``encoding``) or bytes
+        encoding: Text encoding for str content
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    data = content.encode(encoding) if isinstance(content, str) else content
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=str(target.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if target.exists():
+            os.chmod(tmp_path, target.stat().st_mode & 0o7777)
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(target.parent)
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Persist a rename by fsyncing its directory (no-op where unsupported)"""
+    if os.name != "posix":
+        return
+    try:
+        fd = os.open(str(directory), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class EditTransaction:
+    """
+    Batches edits to files and applies them atomically.
+
+    Edits are staged in memory, so several edits to the same file cost one
+    read and one write. ``flush``/``commit`` write every staged file through
+    ``atomic_write``; ``rollback`` restores every touched file to the state
+    it had when the transaction first saw it (deleting files it created).
+    """
+
+    def __init__(self, encoding: str = "utf-8"):
+        self.encoding = encoding
+        self._staged: Dict[str, str] = {}
+        self._originals: Dict[str, Optional[bytes]] = {}  # None: file did not exist
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return str(Path(path).expanduser().resolve())
+
+    def _remember(self, key: str) -> None:
+        if key not in self._originals:
+            p = Path(key)
+            self._originals[key] = p.read_bytes() if p.is_file() else None
+
+    def exists(self, path: str) -> bool:
+        """True if the file exists on disk or has pending content"""
+        key = self._key(path)
+        with self._lock:
+            return key in self._staged or Path(key).is_file()
+
+    def read(self, path: str) -> str:
+        """Return the file's current content, including staged edits"""
+        key = self._key(path)
+        with self._lock:
+            if key in self._staged:
+                return self._staged[key]
+            self._remember(key)
+            original = self._originals[key]
+            if original is None:
+                raise FileNotFoundError(path)
+            return original.decode(self.encoding)
+
+    def stage(self, path: str, content: str) -> None:
+        """Queue new content for a file (written on flush/commit)"""
+        key = self._key(path)
+        with self._lock:
+            self._remember(key)
+            self._staged[key] = content
+
+    def record_original(self, path: str) -> None:
+        """Snapshot a file before an untracked change (e.g. deletion) so rollback restores it"""
+        with self._lock:
+            self._remember(self._key(path))
+
+    @property
+    def pending_files(self) -> List[str]:
+        with self._lock:
+            return list(self._staged)
+
+    @property
+    def touched_files(self) -> List[str]:
+        with self._lock:
+            return list(self._originals)
+
+    def flush(self) -> List[str]:
+        """Write all staged files atomically; returns the paths written"""
+        with self._lock:
+            written = []
+            for key, content in list(self._staged.items()):
+                atomic_write(key, content, self.encoding)
+                del self._staged[key]
+                written.append(key)
+            return written
+
+    def commit(self) -> List[str]:
+        """Alias for flush; the transaction can still be rolled back afterwards"""
+        return self.flush()
+
+    def rollback(self) -> List[str]:
+        """Discard staged edits and restore all touched files; returns restored paths"""
+        with self._lock:
+            self._staged.clear()
+            restored = []
+            for key, original in self._originals.items():
+                p = Path(key)
+                if original is None:
+                    if p.exists():
+                        p.unlink()
+                        restored.append(key)
+                elif not p.is_file() or p.read_bytes() != original:
+                    atomic_write(key, original)
+                    restored.append(key)
+            self._originals.clear()
+            return restored
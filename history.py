@@ -0,0 +1,219 @@
+"""
+Append-only chat history for BlondE-CLI
+
+Each turn is one JSON line ({"sender": ..., "message": ..., "ts": ...})
+appended and flushed as soon as it happens, so a crash loses at most the
+turn being written. Reading never requires the whole file:
+
+- tail(n) seeks backwards from the end to load the REPL's recent turns
+- iter_turns()/pages() stream the file forward for exports
+- compact() moves all but the newest turns to an archive file
+  (history.jsonl.1) and rewrites the file atomically; iter_turns() and
+  exports read the archive first, so no turn is ever dropped
+
+A torn last line from a crash is skipped on read. Histories saved by older
+versions as one JSON array are migrated on first use.
+
+Usage:
+    store = HistoryStore(Path.home() / ".blonde_history_default.jsonl")
+    store.append("You", "hello")
+    recent = store.tail(50)     # [("You", "hello"), ...]
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from fileio import atomic_write
+
+logger = logging.getLogger("blonde")
+
+# Turns loaded into the REPL at start
+DEFAULT_TAIL = 200
+
+# Compact automatically when the file grows past this size ...
+AUTO_COMPACT_BYTES = 8 * 1024 * 1024
+# ... keeping this many of the newest turns
+COMPACT_KEEP = 2000
+
+# Backwards read size for tail()
+_TAIL_BLOCK = 64 * 1024
+
+Turn = Tuple[str, str]
+
+
+def _decode(line: bytes) -> Optional[Turn]:
+    try:
+        record = json.loads(line)
+        return record["sender"], record["message"]
+    except (ValueError, KeyError, TypeError):
+        return None  # torn or foreign line
+
+
+def _encode(sender: str, message: str, ts: Optional[float]) -> bytes:
+    """One JSONL record; ts is None for turns whose time is unknown (legacy histories)"""
+    record = {"sender": sender, "message": message}
+    if ts is not None:
+        record["ts"] = round(ts, 3)
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class HistoryStore:
+    """JSONL chat history with per-turn appends and tail-only loading"""
+
+    def __init__(self, path: Path, legacy_path: Optional[Path] = None):
+        self.path = Path(path)
+        # Turns moved out by compact(), oldest first
+        self.archive_path = self.path.with_name(self.path.name + ".1")
+        self._lock = threading.Lock()
+        if legacy_path is not None:
+            self._migrate(Path(legacy_path))
+
+    def _migrate(self, legacy_path: Path) -> None:
+        """Convert an old single-array JSON history once, keeping the original as .bak"""
+        if self.path.exists() or not legacy_path.exists():
+            return
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                turns = json.load(f)
+            atomic_write(str(self.path), b"".join(_encode(sender, msg, None) for sender, msg in turns))
+            os.replace(legacy_path, legacy_path.with_name(legacy_path.name + ".bak"))
+            logger.info(f"Migrated {len(turns)} history turns to {self.path}")
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Could not migrate history {legacy_path}: {e}")
+
+    def append(self, sender: str, message: str) -> None:
+        """Persist one turn immediately"""
+        data = _encode(sender, message, time.time())
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def tail(self, n: int = DEFAULT_TAIL) -> List[Turn]:
+        """The newest n turns, oldest first, reading only the end of the file"""
+        if n <= 0 or not self.path.exists():
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            # n + 1 newlines guarantee n complete lines (the first may be partial)
+            while pos > 0 and data.count(b"\n") <= n + 1:
+                step = min(_TAIL_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        lines = data.split(b"\n")
+        if pos > 0:
+            lines = lines[1:]  # started mid-line
+        turns = [turn for turn in map(_decode, lines) if turn is not None]
+        return turns[-n:]
+
+    def iter_turns(self) -> Iterator[Turn]:
+        """Every turn, archived ones included, oldest first, streamed from disk"""
+        for path in (self.archive_path, self.path):
+            if not path.exists():
+                continue
+            with open(path, "rb") as f:
+                for line in f:
+                    turn = _decode(line)
+                    if turn is not None:
+                        yield turn
+
+    def pages(self, page_size: int = 100) -> Iterator[List[Turn]]:
+        """Turns in lists of page_size, oldest first"""
+        page: List[Turn] = []
+        for turn in self.iter_turns():
+            page.append(turn)
+            if len(page) >= page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def compact(self, keep: int = COMPACT_KEEP) -> int:
+        """
+        Move all but the newest `keep` turns to archive_path, then atomically
+        rewrite the file with the rest. Records are copied verbatim, so their
+        timestamps survive.
+
+        Returns:
+            Number of turns archived
+        """
+        with self._lock:
+            if not self.path.exists():
+                return 0
+            with open(self.path, "rb") as f:
+                total = sum(1 for line in f if _decode(line) is not None)
+            archived = max(0, total - keep)
+            if not archived:
+                return 0
+            kept = []
+            with open(self.path, "rb") as f, open(self.archive_path, "ab") as archive:
+                seen = 0
+                for line in f:
+                    if _decode(line) is None:
+                        continue  # torn line
+                    line = line if line.endswith(b"\n") else line + b"\n"
+                    if seen < archived:
+                        archive.write(line)
+                    else:
+                        kept.append(line)
+                    seen += 1
+                archive.flush()
+                os.fsync(archive.fileno())
+            # A crash before this write leaves turns in both files, never in neither
+            atomic_write(str(self.path), b"".join(kept))
+            return archived
+
+    def maybe_compact(self, max_bytes: int = AUTO_COMPACT_BYTES, keep: int = COMPACT_KEEP) -> int:
+        """Compact if the file has grown past max_bytes; returns the number of turns archived"""
+        if self.size() <= max_bytes:
+            return 0
+        archived = self.compact(keep)
+        logger.info(f"Archived {archived} history turns to {self.archive_path}")
+        return archived
+
+    def replace(self, turns: List[tuple]) -> None:
+        """
+        Atomically replace the whole history, archive included.
+
+        Args:
+            turns: (sender, message) or (sender, message, ts) tuples; turns
+                without a timestamp are stamped with the current time
+        """
+        now = time.time()
+        data = b"".join(_encode(turn[0], turn[1], turn[2] if len(turn) > 2 else now) for turn in turns)
+        with self._lock:
+            atomic_write(str(self.path), data)
+            if self.archive_path.exists():
+                os.remove(self.archive_path)
+
+    def clear(self) -> None:
+        with self._lock:
+            if self.path.exists():
+                atomic_write(str(self.path), b"")
+            if self.archive_path.exists():
+                os.remove(self.archive_path)
+
+    def export_markdown(self, out_file: str) -> int:
+        """Stream the history to a Markdown file; returns the number of turns written"""
+        count = 0
+        with open(out_file, "w", encoding="utf-8") as f:
+            for sender, message in self.iter_turns():
+                f.write(f"**{sender}:** {message}\n\n")
+                count += 1
+        return count
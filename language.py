@@ -0,0 +1,187 @@
+"""
+Language detection for BlondE-CLI
+
+Cheapest evidence first:
+
+1. Well-known file names (Dockerfile, Makefile, ...)
+2. Extension table
+3. Shebang line
+4. Content heuristics on the first few KB
+5. libmagic, imported lazily and only when everything above is inconclusive
+
+Results that needed the file's contents are memoized per path and
+(mtime, size), so repeated calls in fix/create loops cost one stat.
+
+Usage:
+    lang = detect_language("scripts/deploy")   # -> "bash" (from the shebang)
+"""
+
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger("blonde")
+
+UNKNOWN = "unknown"
+
+# Bytes read for shebang/content sniffing
+SNIFF_BYTES = 4096
+
+# Paths remembered by the content-based detector
+CACHE_SIZE = 4096
+
+# Shared by fileio (line counts) and ts_extract (parser choice); extend it here only
+LANGUAGE_BY_EXT = {
+    "py": "python", "pyw": "python", "pyi": "python",
+    "js": "javascript", "mjs": "javascript", "cjs": "javascript", "jsx": "javascript",
+    "ts": "typescript", "tsx": "typescript", "mts": "typescript", "cts": "typescript",
+    "java": "java", "kt": "kotlin", "kts": "kotlin", "scala": "scala", "groovy": "groovy",
+    "c": "c", "h": "c",
+    "cpp": "cpp", "cc": "cpp", "cxx": "cpp", "c++": "cpp", "hpp": "cpp", "hh": "cpp", "hxx": "cpp",
+    "cs": "csharp", "go": "go", "rs": "rust", "swift": "swift", "m": "objectivec",
+    "rb": "ruby", "php": "php", "pl": "perl", "pm": "perl", "lua": "lua", "r": "r",
+    "dart": "dart", "ex": "elixir", "exs": "elixir", "erl": "erlang", "hs": "haskell",
+    "clj": "clojure", "ml": "ocaml", "fs": "fsharp", "jl": "julia", "zig": "zig", "nim": "nim",
+    "sh": "bash", "bash": "bash", "zsh": "zsh", "fish": "fish", "ps1": "powershell", "bat": "batch",
+    "sql": "sql", "html": "html", "htm": "html", "css": "css", "scss": "scss", "less": "less",
+    "vue": "vue", "svelte": "svelte", "xml": "xml",
+    "json": "json", "yml": "yaml", "yaml": "yaml", "toml": "toml", "ini": "ini", "cfg": "ini",
+    "md": "markdown", "rst": "rst", "tex": "latex", "proto": "protobuf", "tf": "terraform",
+}
+
+LANGUAGE_BY_NAME = {
+    "Dockerfile": "docker", "Makefile": "make", "GNUmakefile": "make", "CMakeLists.txt": "cmake",
+    "Gemfile": "ruby", "Rakefile": "ruby", "Jenkinsfile": "groovy", "BUILD": "python", "SConstruct": "python",
+}
+
+LANGUAGE_BY_INTERPRETER = {
+    "python": "python", "node": "javascript", "deno": "typescript", "bun": "javascript",
+    "sh": "bash", "bash": "bash", "dash": "bash", "zsh": "zsh", "fish": "fish",
+    "ruby": "ruby", "perl": "perl", "php": "php", "lua": "lua", "Rscript": "r",
+}
+
+# (language, pattern) checked in order; first match wins. Each pattern is
+# anchored to line starts so prose mentioning "import" or "class" rarely hits.
+_CONTENT_RULES = [
+    ("php", re.compile(r"<\?php")),
+    ("cpp", re.compile(r"^\s*(#include\s*<(iostream|vector|string|memory)>|template\s*<|namespace\s+\w+|using\s+namespace\s)", re.M)),
+    ("c", re.compile(r"^\s*#include\s*[<\"]", re.M)),
+    ("go", re.compile(r"^package\s+\w+\s*$[\s\S]*^func\s", re.M)),
+    ("java", re.compile(r"^\s*(package\s+[\w.]+;|import\s+[\w.]+;|public\s+(final\s+)?class\s)", re.M)),
+    ("python", re.compile(r"^(\s*def\s+\w+\(.*\)\s*(->.*)?:|\s*class\s+\w+.*:\s*$|from\s+[\w.]+\s+import\s|import\s+[\w.]+\s*$)", re.M)),
+    ("javascript", re.compile(r"^\s*(function\s+\w+\s*\(|(const|let|var)\s+\w+\s*=|module\.exports|export\s+(default|function|const))|require\(", re.M)),
+]
+
+_cache: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_magic = None
+
+
+def language_from_name(file_path: str) -> Optional[str]:
+    """Language implied by the file name or extension alone, if any"""
+    name = os.path.basename(file_path)
+    if name in LANGUAGE_BY_NAME:
+        return LANGUAGE_BY_NAME[name]
+    _, dot, ext = name.rpartition(".")
+    if not dot:
+        return None
+    return LANGUAGE_BY_EXT.get(ext.lower()) or LANGUAGE_BY_EXT.get(ext)
+
+
+def language_from_shebang(head: bytes) -> Optional[str]:
+    """Language named by a #! line (handles '/usr/bin/env -S python3 -u')"""
+    if not head.startswith(b"#!"):
+        return None
+    line = head[2:].split(b"\n", 1)[0].decode("utf-8", errors="ignore").split()
+    if not line:
+        return None
+    words = line[1:] if os.path.basename(line[0]) == "env" else line
+    for word in words:
+        if word.startswith("-"):
+            continue
+        interpreter = re.sub(r"[\d.]+$", "", os.path.basename(word))
+        return LANGUAGE_BY_INTERPRETER.get(interpreter)
+    return None
+
+
+def language_from_content(head: bytes) -> Optional[str]:
+    """Cheap regex heuristics over the start of a file"""
+    if b"\0" in head:
+        return None  # binary
+    text = head.decode("utf-8", errors="ignore")
+    for language, pattern in _CONTENT_RULES:
+        if pattern.search(text):
+            return language
+    return None
+
+
+def language_from_magic(head: bytes) -> Optional[str]:
+    """Last resort: libmagic MIME sniffing (loaded on first use)"""
+    global _magic
+    if _magic is None:
+        try:
+            import magic
+            _magic = magic
+        except ImportError:
+            _magic = False
+    if not _magic:
+        return None
+    try:
+        mime = _magic.from_buffer(head, mime=True)
+    except Exception as e:
+        logger.debug(f"libmagic failed: {e}")
+        return None
+    for marker, language in (("python", "python"), ("javascript", "javascript"), ("ecmascript", "javascript"),
+                             ("x-java", "java"), ("c++", "cpp"), ("x-c", "c"), ("shellscript", "bash"),
+                             ("x-php", "php"), ("x-ruby", "ruby"), ("x-perl", "perl")):
+        if marker in mime:
+            return language
+    return None
+
+
+def detect_language(file_path: str) -> str:
+    """
+    Detect a file's language, returning UNKNOWN if nothing matches.
+
+    Names and extensions are answered without touching the disk; anything
+    else is sniffed once and cached until the file's mtime or size changes.
+    """
+    language = language_from_name(file_path)
+    if language:
+        return language
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return UNKNOWN
+
+    key = os.path.abspath(file_path)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            _cache.move_to_end(key)
+            return cached[2]
+
+    try:
+        with open(file_path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError as e:
+        logger.debug(f"Language detection failed for {file_path}: {e}")
+        return UNKNOWN
+    language = (language_from_shebang(head) or language_from_content(head)
+                or language_from_magic(head) or UNKNOWN)
+
+    with _cache_lock:
+        _cache[key] = (st.st_mtime_ns, st.st_size, language)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return language
+
+
+def clear_cache() -> None:
+    """Forget memoized content-based detections"""
+    with _cache_lock:
+        _cache.clear()
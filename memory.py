@@ -6,6 +6,7 @@ Provides:
 2. Long-term memory (semantic search via ChromaDB)
 3. Context injection for LLM prompts
 4. Task tracking and goal persistence
+5. Rolling conversation buffer (recent turns verbatim + running summary)
 
 Usage:
     mem = MemoryManager(user_id="default")
@@ -13,20 +14,44 @@ Usage:
     relevant = mem.retrieve_relevant_context(query, n_results=5)
     mem.add_task("Implement user authentication")
     mem.show_session_state()
+
+    convo = ConversationBuffer(summarize=ask_model)
+    convo.add("You", user_msg)
+    prompt = convo.build_prompt(next_user_msg)
 """
 
 import json
+import atexit
 import logging
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 
+from fileio import atomic_write
+
 console = Console()
 logger = logging.getLogger("blonde")
 
+# Session changes are coalesced and written at most once per this many seconds
+SESSION_SAVE_DELAY = 1.0
+
+# Managers with possibly unsaved session changes; weak, so registering does not keep them alive
+_live_managers: "weakref.WeakSet" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all() -> None:
+    """Write the pending session changes of every MemoryManager still alive at exit"""
+    for manager in list(_live_managers):
+        manager.flush()
+
 try:
     import chromadb
     from chromadb.config import Settings
@@ -36,6 +61,202 @@ except ImportError:
     logger.warning("ChromaDB not installed. Long-term memory disabled. Install with: pip install chromadb")
 
 
+class ConversationBuffer:
+    """
+    Keeps chat prompts bounded no matter how long the session runs.
+
+    The newest turns are kept verbatim (up to max_recent_chars). Older turns
+    are folded into a running summary by the model, in the background when
+    the adapter allows concurrent calls. With a state_file, the summary and
+    the turns not yet folded into it are saved after every change, so the
+    next session resumes from them (restore()) instead of summarizing the
+    saved history again; only turns added after that are ever folded.
+    """
+
+    SUMMARY_PROMPT = (
+        "Update the running summary of a conversation between a user and an AI coding assistant. "
+        "Keep decisions, file names, code identifiers, open questions and user preferences; drop small talk. "
+        "Answer with the updated summary only, at most {limit} characters.\n\n"
+        "Current summary:\n{summary}\n\nNew turns:\n{turns}"
+    )
+
+    STATE_VERSION = 1
+
+    def __init__(self, summarize: Callable[[str], str], max_recent_chars: int = 6000,
+                 max_summary_chars: int = 1500, max_turn_chars: int = 2000, background: bool = True,
+                 state_file: Optional[Path] = None, is_error: Callable[[str], bool] = lambda reply: not reply.strip()):
+        """
+        Args:
+            summarize: Prompt -> reply, used to fold old turns into the summary
+            max_recent_chars: Budget for verbatim recent turns
+            max_summary_chars: Budget for the running summary
+            max_turn_chars: Longest single message kept verbatim (longer ones are clipped)
+            background: Summarize on a worker thread (False for adapters that cannot overlap calls)
+            state_file: JSON file holding the summary and unfolded turns between sessions
+            is_error: Predicate for summarizer replies that must be discarded
+        """
+        self.summarize = summarize
+        self.max_recent_chars = max_recent_chars
+        self.max_summary_chars = max_summary_chars
+        self.max_turn_chars = max_turn_chars
+        self.is_error = is_error
+        self.state_file = Path(state_file) if state_file else None
+        self.summary = ""
+        self.recent: deque = deque()
+        self._recent_chars = 0
+        # Turns evicted by each add(), folded one batch at a time and in order
+        self._pending: List[List[Tuple[str, str]]] = []
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        # Bumped by clear(); a fold started before it must not write its result back
+        self._generation = 0
+        self._executor = ThreadPoolExecutor(max_workers=1) if background else None
+        self._future = None
+
+    def _clip(self, message: str) -> str:
+        if len(message) <= self.max_turn_chars:
+            return message
+        return message[:self.max_turn_chars] + " ... (truncated)"
+
+    def restore(self) -> bool:
+        """
+        Load the state saved by a previous session.
+
+        Returns:
+            True if state was restored; False if there was none (or it was
+            unreadable), in which case the caller replays history with add()
+        """
+        if not self.state_file or not self.state_file.exists():
+            return False
+        try:
+            state = json.loads(self.state_file.read_text(encoding="utf-8"))
+            if state.get("version") != self.STATE_VERSION:
+                return False
+            recent = [(str(s), str(m)) for s, m in state.get("recent", [])]
+            pending = [[(str(s), str(m)) for s, m in batch] for batch in state.get("pending", [])]
+            summary = str(state.get("summary", ""))
+        except (OSError, ValueError, TypeError, AttributeError):
+            logger.warning(f"Ignoring corrupted conversation state: {self.state_file}")
+            return False
+        with self._lock:
+            self.summary = summary
+            self.recent = deque(recent)
+            self._recent_chars = sum(len(m) for _, m in recent)
+            self._pending = pending  # folded on the next add()
+        return True
+
+    def _save_state(self) -> None:
+        if not self.state_file:
+            return
+        # One writer at a time, each snapshotting under it, so an older state never overwrites a newer one
+        with self._save_lock:
+            with self._lock:
+                state = {"version": self.STATE_VERSION, "summary": self.summary,
+                         "recent": list(self.recent), "pending": list(self._pending)}
+            try:
+                atomic_write(str(self.state_file), json.dumps(state, ensure_ascii=False))
+            except OSError as e:
+                logger.debug(f"Could not save conversation state: {e}")
+
+    def add(self, sender: str, message: str) -> None:
+        """Record a turn; evicts the oldest turns into the summary when over budget"""
+        turn = (sender, self._clip(message))
+        with self._lock:
+            self.recent.append(turn)
+            self._recent_chars += len(turn[1])
+            evicted = []
+            while self._recent_chars > self.max_recent_chars and len(self.recent) > 1:
+                old = self.recent.popleft()
+                self._recent_chars -= len(old[1])
+                evicted.append(old)
+            if evicted:
+                self._pending.append(evicted)
+            should_fold = bool(self._pending) and (self._future is None or self._future.done())
+        self._save_state()
+        if should_fold:
+            if self._executor is not None:
+                self._future = self._executor.submit(self._fold)
+            else:
+                self._fold()
+
+    def _fold(self) -> None:
+        """Merge pending turns into the running summary (one fold at a time)"""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                turns, summary, generation = self._pending[0], self.summary, self._generation
+            text = "\n".join(f"{sender}: {message}" for sender, message in turns)
+            prompt = self.SUMMARY_PROMPT.format(limit=self.max_summary_chars,
+                                                summary=summary or "(empty)", turns=text)
+            try:
+                reply = self.summarize(prompt)
+            except Exception as e:
+                logger.warning(f"Conversation summary failed: {e}")
+                return
+            if self.is_error(reply):
+                return  # keep turns pending; retried on the next eviction
+            with self._lock:
+                if generation != self._generation:
+                    return  # cleared while summarizing
+                self.summary = reply.strip()[:self.max_summary_chars]
+                self._pending.pop(0)
+            self._save_state()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until any background summarization finishes"""
+        future = self._future
+        if future is not None:
+            future.result(timeout=timeout)
+
+    def build_prompt(self, query: str, extra_context: str = "") -> str:
+        """
+        Prompt with summary, recent turns, optional retrieved context and the query.
+
+        Turns still waiting to be summarized are included newest-first while
+        they fit in max_recent_chars, so nothing drops out mid-fold and the
+        prompt stays bounded.
+        """
+        with self._lock:
+            summary = self.summary
+            recent = list(self.recent)
+            pending = [turn for batch in self._pending for turn in batch]
+        budget = self.max_recent_chars - sum(len(m) for _, m in recent)
+        carried = []
+        for sender, message in reversed(pending):
+            if len(message) > budget:
+                break
+            carried.append((sender, message))
+            budget -= len(message)
+        turns = list(reversed(carried)) + recent
+
+        parts = []
+        if extra_context:
+            parts.append(f"Context from previous conversations:\n{extra_context}")
+        if summary:
+            parts.append(f"Summary of earlier conversation:\n{summary}")
+        if turns:
+            parts.append("Recent conversation:\n" + "\n".join(f"{s}: {m}" for s, m in turns))
+        if not parts:
+            return query
+        parts.append(f"Current query: {query}")
+        return "\n\n".join(parts)
+
+    def clear(self) -> None:
+        """Forget everything; a fold still running is discarded when it finishes"""
+        with self._lock:
+            self._generation += 1
+            self.summary = ""
+            self.recent.clear()
+            self._recent_chars = 0
+            self._pending.clear()
+        self._save_state()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
 class MemoryManager:
     """Manages short-term and long-term memory for context-aware AI"""
     
@@ -71,6 +292,10 @@ class MemoryManager:
         # JSON for short-term/session memory
         self.session_file = self.cache_dir / f"session_{user_id}.json"
         self.session = self.load_session()
+        self._session_lock = threading.RLock()
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        _live_managers.add(self)
     
     def load_session(self) -> Dict:
         """Load active session state (goals, tasks, context)"""
@@ -95,12 +320,34 @@ class MemoryManager:
         }
     
     def save_session(self):
-        """Persist session state to disk"""
-        self.session["last_updated"] = datetime.now().isoformat()
-        try:
-            self.session_file.write_text(json.dumps(self.session, indent=2))
-        except Exception as e:
-            logger.error(f"Failed to save session: {e}")
+        """Persist session state to disk now"""
+        with self._session_lock:
+            self._dirty = True
+        self.flush()
+
+    def _mark_dirty(self):
+        """Schedule a save; repeated changes within SESSION_SAVE_DELAY share one write"""
+        with self._session_lock:
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(SESSION_SAVE_DELAY, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self):
+        """Write pending session changes atomically (temp file + rename)"""
+        with self._session_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+            self.session["last_updated"] = datetime.now().isoformat()
+            try:
+                atomic_write(str(self.session_file), json.dumps(self.session, separators=(",", ":")))
+                self._dirty = False
+            except Exception as e:
+                logger.error(f"Failed to save session: {e}")
     
     def add_conversation(self, user_msg: str, ai_response: str):
         """
@@ -166,15 +413,16 @@ class MemoryManager:
             task_description: Description of the task
             priority: Priority level (low, medium, high)
         """
-        task = {
-            "id": len(self.session["goals"]),
-            "description": task_description,
-            "priority": priority,
-            "created": datetime.now().isoformat(),
-            "status": "pending"
-        }
-        self.session["goals"].append(task)
-        self.save_session()
+        with self._session_lock:
+            task = {
+                "id": len(self.session["goals"]),
+                "description": task_description,
+                "priority": priority,
+                "created": datetime.now().isoformat(),
+                "status": "pending"
+            }
+            self.session["goals"].append(task)
+        self._mark_dirty()
         logger.info(f"Added task: {task_description}")
     
     def mark_task_complete(self, task_index: int):
@@ -184,15 +432,16 @@ class MemoryManager:
         Args:
             task_index: Index of task in goals list
         """
-        if 0 <= task_index < len(self.session["goals"]):
+        with self._session_lock:
+            if not 0 <= task_index < len(self.session["goals"]):
+                return False
             task = self.session["goals"].pop(task_index)
             task["status"] = "completed"
             task["completed_at"] = datetime.now().isoformat()
             self.session["completed_tasks"].append(task)
-            self.save_session()
-            logger.info(f"Completed task: {task['description']}")
-            return True
-        return False
+        self._mark_dirty()
+        logger.info(f"Completed task: {task['description']}")
+        return True
     
     def set_context_variable(self, key: str, value: str):
         """
@@ -202,8 +451,9 @@ class MemoryManager:
             key: Variable name
             value: Variable value
         """
-        self.session["context_variables"][key] = value
-        self.save_session()
+        with self._session_lock:
+            self.session["context_variables"][key] = value
+        self._mark_dirty()
     
     def get_context_variable(self, key: str) -> Optional[str]:
         """Retrieve a context variable"""
@@ -284,7 +534,8 @@ class MemoryManager:
     
     def clear_session(self):
         """Reset session state (keeps vector store)"""
-        self.session = self._create_new_session()
+        with self._session_lock:
+            self.session = self._create_new_session()
         self.save_session()
         logger.info("Session cleared")
     
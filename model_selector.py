@@ -1,20 +1,35 @@
 """
 Interactive Model Selector for BlondE-CLI
 Allows users to select from cached models or download new ones
+
+After a model is chosen, start_warmup() pulls its weights into the page
+cache in the background and BackgroundAdapter loads it on a worker
+thread, so both overlap with the rest of start-up instead of stalling
+the first request.
 """
 
 import os
+import mmap
+import time
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Optional
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.prompt import Prompt, Confirm
 from rich.text import Text
 
+from models.gguf import format_parameters
+from models.manifest import ModelManifest
+
 console = Console()
 
-# Recommended GGUF models with metadata
+# Recommended GGUF models with metadata.
+# "speculative" (optional) configures speculative decoding for the model:
+# prompt lookup, or a small draft model with the same tokenizer (see models/speculative.py);
+# only used when BLONDE_SPECULATIVE=1
+# "warmup" (optional) is "scan" (default), "advise" or "off"; see start_warmup()
 AVAILABLE_MODELS = {
     "1": {
         "name": "CodeLlama-7B",
@@ -22,28 +37,42 @@ AVAILABLE_MODELS = {
         "file": "codellama-7b.Q4_K_M.gguf",
         "size": "3.8GB",
         "description": "Best for code generation, bug fixing, and coding tasks",
-        "recommended": True
+        "recommended": True,
+        "speculative": {"mode": "prompt_lookup", "num_pred_tokens": 10}
     },
     "2": {
         "name": "Mistral-7B-Instruct",
         "repo": "TheBloke/Mistral-7B-Instruct-v0.2-GGUF",
         "file": "mistral-7b-instruct-v0.2.Q4_K_M.gguf",
         "size": "4.1GB",
-        "description": "Fast general-purpose model, great for chat and code"
+        "description": "Fast general-purpose model, great for chat and code",
+        "speculative": {"mode": "prompt_lookup", "num_pred_tokens": 10}
     },
     "3": {
         "name": "DeepSeek-Coder-6.7B",
         "repo": "TheBloke/deepseek-coder-6.7b-instruct-GGUF",
         "file": "deepseek-coder-6.7b-instruct.Q4_K_M.gguf",
         "size": "3.8GB",
-        "description": "Specialized for advanced coding tasks"
+        "description": "Specialized for advanced coding tasks",
+        "speculative": {
+            "mode": "draft",
+            "draft_repo": "TheBloke/deepseek-coder-1.3b-instruct-GGUF",
+            "draft_file": "deepseek-coder-1.3b-instruct.Q4_K_M.gguf",
+            "num_pred_tokens": 8
+        }
     },
     "4": {
         "name": "Llama-2-7B-Chat",
         "repo": "TheBloke/Llama-2-7B-Chat-GGUF",
         "file": "llama-2-7b-chat.Q4_K_M.gguf",
         "size": "3.8GB",
-        "description": "Optimized for conversational tasks"
+        "description": "Optimized for conversational tasks",
+        "speculative": {
+            "mode": "draft",
+            "draft_repo": "TheBloke/TinyLlama-1.1B-Chat-v1.0-GGUF",
+            "draft_file": "tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf",
+            "num_pred_tokens": 8
+        }
     },
     "5": {
         "name": "Phi-2",
@@ -55,6 +84,157 @@ AVAILABLE_MODELS = {
 }
 
 
+# Read size for the warm-up scan
+WARMUP_BLOCK = 16 * 1024 * 1024
+
+WARMUP_MODES = ("scan", "advise", "off")
+
+
+def warmup_mode(model_file: Optional[str]) -> str:
+    """Warm-up mode for a model: BLONDE_WARMUP overrides the per-model setting"""
+    mode = os.getenv("BLONDE_WARMUP")
+    if mode not in WARMUP_MODES:
+        mode = next((m.get("warmup", "scan") for m in AVAILABLE_MODELS.values() if m["file"] == model_file), "scan")
+    return mode
+
+
+def _available_memory() -> Optional[int]:
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class WarmUp:
+    """
+    Background prefetch of a model file into the page cache.
+
+    "advise" only hints the kernel (posix_fadvise/madvise WILLNEED) and
+    returns at once; "scan" also reads the file sequentially so every page
+    is resident before the first request. A scan is downgraded to
+    "advise" if the file does not fit in free memory, where it would only
+    evict its own earlier pages.
+    """
+
+    def __init__(self, path: str, mode: str = "scan"):
+        self.path = path
+        self.mode = mode
+        self.bytes_read = 0
+        self.elapsed: Optional[float] = None
+        self.error: Optional[Exception] = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+
+    def start(self) -> "WarmUp":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        start = time.perf_counter()
+        try:
+            size = os.path.getsize(self.path)
+            available = _available_memory()
+            if self.mode == "scan" and available is not None and size > available:
+                self.mode = "advise"
+            with open(self.path, "rb") as f:
+                self._advise(f.fileno(), size)
+                if self.mode == "scan":
+                    buffer = bytearray(WARMUP_BLOCK)
+                    while not self._cancel.is_set():
+                        n = f.readinto(buffer)
+                        if not n:
+                            break
+                        self.bytes_read += n
+        except (OSError, ValueError) as e:
+            self.error = e
+        self.elapsed = time.perf_counter() - start
+
+    @staticmethod
+    def _advise(fd: int, size: int) -> None:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        if size and hasattr(mmap, "MADV_WILLNEED"):
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                mm.madvise(mmap.MADV_WILLNEED)
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """True once the prefetch has finished"""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def summary(self) -> str:
+        if self.error:
+            return f"warm-up failed: {self.error}"
+        if self.elapsed is None:
+            return "warm-up still running"
+        if self.mode == "scan":
+            return f"prefetched {self.bytes_read / 1024 ** 3:.1f}GB in {self.elapsed:.1f}s"
+        return "prefetch hinted to the kernel"
+
+
+def start_warmup(model_file: Optional[str], path: Optional[str]) -> Optional[WarmUp]:
+    """Start prefetching a cached model's weights, unless its warm-up is off"""
+    mode = warmup_mode(model_file)
+    if mode == "off" or not path or not os.path.isfile(path):
+        return None
+    return WarmUp(path, mode).start()
+
+
+class BackgroundAdapter:
+    """
+    Builds a model adapter on a worker thread and stands in for it meanwhile.
+
+    Attribute access waits for the load to finish, so callers can use it
+    like the adapter itself; wait() does the same explicitly and re-raises
+    any load error.
+    """
+
+    def __init__(self, factory: Callable[[], Any], warmup: Optional[WarmUp] = None):
+        self._factory = factory
+        self._warmup = warmup
+        self._adapter = None
+        self._error: Optional[BaseException] = None
+        self._started = time.perf_counter()
+        self.ready_after: Optional[float] = None
+        self._thread = threading.Thread(target=self._load, name="model-load", daemon=True)
+        self._thread.start()
+
+    def _load(self) -> None:
+        try:
+            self._adapter = self._factory()
+        except BaseException as e:
+            self._error = e
+        self.ready_after = time.perf_counter() - self._started
+
+    def wait(self) -> Any:
+        """The loaded adapter (blocks until it is ready)"""
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._adapter
+
+    @property
+    def ready(self) -> bool:
+        return not self._thread.is_alive()
+
+    def status(self) -> str:
+        """Time-to-ready line for the UI"""
+        if self.ready_after is None:
+            return "Model loading..."
+        parts = [f"Model ready in {self.ready_after:.1f}s"]
+        if self._warmup is not None:
+            parts.append(self._warmup.summary())
+        return " | ".join(parts)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.wait(), name)
+
+
 def get_cache_dir() -> Path:
     """Get the model cache directory."""
     cache_dir = Path.home() / ".blonde" / "models"
@@ -63,36 +243,13 @@ def get_cache_dir() -> Path:
 
 
 def find_cached_models() -> List[Dict[str, str]]:
-    """Find all GGUF models in cache directory."""
-    cache_dir = get_cache_dir()
-    cached = []
-    
-    if cache_dir.exists():
-        for model_file in cache_dir.rglob("*.gguf"):
-            size_mb = model_file.stat().st_size / (1024 * 1024)
-            
-            # Extract repo name from HuggingFace cache structure
-            # Structure: models--{OWNER}--{NAME}/snapshots/{HASH}/{FILE}
-            repo_name = "Unknown"
-            try:
-                # Walk up to find the models-- directory
-                parts = model_file.parts
-                for i, part in enumerate(parts):
-                    if part.startswith("models--"):
-                        # Convert models--TheBloke--phi-2-GGUF to TheBloke/phi-2-GGUF
-                        repo_name = part.replace("models--", "").replace("--", "/", 1)
-                        break
-            except Exception:
-                repo_name = "Unknown"
-            
-            cached.append({
-                "file": model_file.name,
-                "path": str(model_file),
-                "size": f"{size_mb:.1f}MB",
-                "repo": repo_name
-            })
-    
-    return cached
+    """
+    Find all GGUF models in cache directory.
+
+    Reads the cache manifest (see models/manifest.py), which only walks the
+    cache again if a directory in it changed since the last scan.
+    """
+    return ModelManifest(get_cache_dir()).models()
 
 
 def display_cached_models(cached_models: List[Dict[str, str]]) -> None:
@@ -105,6 +262,9 @@ def display_cached_models(cached_models: List[Dict[str, str]]) -> None:
     table.add_column("#", style="cyan", width=4)
     table.add_column("Model File", style="green")
     table.add_column("Size", style="yellow", justify="right")
+    table.add_column("Quant", style="magenta")
+    table.add_column("Params", justify="right")
+    table.add_column("Context", justify="right")
     table.add_column("Repository", style="dim")
     
     for idx, model in enumerate(cached_models, 1):
@@ -112,6 +272,9 @@ def display_cached_models(cached_models: List[Dict[str, str]]) -> None:
             str(idx),
             model["file"],
             model["size"],
+            model.get("quant") or "-",
+            format_parameters(model.get("parameters") or 0),
+            str(model.get("context_length") or "-"),
             model["repo"]
         )
     
@@ -0,0 +1,112 @@
+"""
+Request queue and context pool for local inference
+
+A llama.cpp context serves one sequence at a time, so concurrent `fix`
+workers or agentic steps sharing one LocalAdapter used to queue on a
+single Llama. ContextPool hands each request its own context:
+
+- Contexts are created lazily, only when every existing one is busy,
+  up to `size`. Extra contexts open the same GGUF file, whose weights are
+  mmapped and therefore shared through the page cache; each context only
+  adds its own KV cache.
+- When all `size` contexts are busy, requests wait in FIFO order.
+
+Usage:
+    pool = ContextPool(load_context, size=2, primary=llm)
+    with pool.lease() as llm:
+        output = llm(prompt)
+"""
+
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+logger = logging.getLogger("blonde")
+
+
+class ContextPool:
+    """Lends out up to `size` inference contexts built by `factory`"""
+
+    def __init__(self, factory: Callable[[], Any], size: int = 1, primary: Any = None):
+        self.factory = factory
+        self.size = max(1, size)
+        self._idle: "queue.Queue[Any]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._contexts: List[Any] = []
+        self._slots = 0  # contexts created or being created
+        self._in_use = 0
+        self.peak_in_use = 0
+        self.served = 0
+        self.waited = 0  # requests that had to queue for a context
+        if primary is not None:
+            self._contexts.append(primary)
+            self._slots = 1
+            self._idle.put(primary)
+
+    @property
+    def created(self) -> int:
+        return len(self._contexts)
+
+    @property
+    def contexts(self) -> List[Any]:
+        return list(self._contexts)
+
+    def acquire(self) -> Any:
+        """Take an idle context, creating one if all are busy and the pool can grow"""
+        try:
+            context = self._idle.get_nowait()
+        except queue.Empty:
+            context = self._grow_or_wait()
+        with self._lock:
+            self._in_use += 1
+            self.served += 1
+            self.peak_in_use = max(self.peak_in_use, self._in_use)
+        return context
+
+    def _grow_or_wait(self) -> Any:
+        with self._lock:
+            grow = self._slots < self.size
+            if grow:
+                self._slots += 1  # reserve the slot; the context loads outside the lock
+                slot = self._slots
+            else:
+                self.waited += 1
+        if not grow:
+            return self._idle.get()
+        try:
+            start = time.perf_counter()
+            context = self.factory()
+            logger.debug(f"Opened inference context {slot}/{self.size} in {time.perf_counter() - start:.1f}s")
+        except Exception:
+            with self._lock:
+                self._slots -= 1
+                self.size = max(1, self._slots)  # likely out of memory; stop trying to grow
+                have_others = self._slots > 0
+            if have_others:
+                logger.warning("Could not open another inference context; waiting for a busy one")
+                return self._idle.get()
+            raise
+        with self._lock:
+            self._contexts.append(context)
+        return context
+
+    def release(self, context: Any) -> None:
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(context)
+
+    @contextmanager
+    def lease(self) -> Iterator[Any]:
+        context = self.acquire()
+        try:
+            yield context
+        finally:
+            self.release(context)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"contexts": len(self._contexts), "in_use": self._in_use, "peak_in_use": self.peak_in_use,
+                    "served": self.served, "waited": self.waited}
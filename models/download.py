@@ -0,0 +1,402 @@
+"""
+Resumable, parallel model downloads from the Hugging Face hub
+
+hf_hub_download fetches a multi-GB GGUF as one stream. DownloadManager
+splits it into byte ranges fetched by several workers into one
+preallocated file:
+
+- Completed ranges are recorded next to the partial file, so an
+  interrupted download resumes where it stopped (at most one range per
+  worker is fetched again).
+- The finished file is checked against the sha256 the hub reports for
+  LFS files (X-Linked-Etag) before it is moved into place.
+- Files land in the huggingface_hub cache layout
+  (models--OWNER--NAME/blobs/<sha256>, linked from snapshots/<commit>/),
+  so models fetched either way are shared and found by the model manifest.
+- Servers without range support are downloaded in a single stream.
+
+Usage:
+    manager = DownloadManager(Path.home() / ".blonde" / "models")
+    result = manager.download("TheBloke/phi-2-GGUF", "phi-2.Q4_K_M.gguf")
+    print(result.path, f"{result.throughput / 1024 ** 2:.1f} MB/s")
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from urllib.parse import quote, urljoin, urlsplit
+
+import requests
+from rich.progress import BarColumn, DownloadColumn, Progress, TextColumn, TimeRemainingColumn, TransferSpeedColumn
+
+from fileio import atomic_write
+
+logger = logging.getLogger("blonde")
+
+DEFAULT_ENDPOINT = "https://huggingface.co"
+DEFAULT_WORKERS = int(os.getenv("BLONDE_DOWNLOAD_WORKERS", "4"))
+CHUNK_SIZE = 32 * 1024 * 1024  # bytes per range request
+BLOCK_SIZE = 1024 * 1024  # bytes per read from a response
+RETRIES = 3  # attempts per range
+RETRY_WAIT = 0.5  # seconds before the first retry, doubled after each
+TIMEOUT = 30  # seconds to connect / between reads
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+class DownloadError(ValueError):
+    """A download failed, or its checksum did not match the hub's"""
+
+
+@dataclass
+class RemoteFile:
+    """What the hub says about one file"""
+    url: str  # where the bytes are served (after the hub's redirect)
+    size: int
+    sha256: Optional[str]  # None for files stored in git rather than LFS
+    commit: Optional[str]
+    etag: str
+
+
+@dataclass
+class DownloadResult:
+    """A finished (or already cached) download"""
+    path: str
+    size: int
+    sha256: Optional[str]
+    downloaded: int  # bytes fetched this time
+    resumed: int  # bytes already on disk from an earlier attempt
+    seconds: float
+    cached: bool = False
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second fetched over the network"""
+        return self.downloaded / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        if self.cached:
+            return f"Using cached {Path(self.path).name}"
+        parts = [f"Downloaded {self.downloaded / 1024 ** 2:.1f}MB in {self.seconds:.1f}s "
+                 f"({self.throughput / 1024 ** 2:.1f} MB/s)"]
+        if self.resumed:
+            parts.append(f"resumed after {self.resumed / 1024 ** 2:.1f}MB")
+        if self.sha256:
+            parts.append("sha256 verified")
+        return ", ".join(parts)
+
+
+def sha256_file(path: Path, block_size: int = 8 * 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DownloadManager:
+    """Downloads hub files into a huggingface_hub-style cache directory"""
+
+    def __init__(self, cache_dir: Path, endpoint: Optional[str] = None, workers: int = DEFAULT_WORKERS,
+                 chunk_size: int = CHUNK_SIZE, token: Optional[str] = None, show_progress: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.endpoint = (endpoint or os.getenv("HF_ENDPOINT") or DEFAULT_ENDPOINT).rstrip("/")
+        self.workers = max(1, workers)
+        self.chunk_size = max(BLOCK_SIZE, chunk_size)
+        self.token = token or os.getenv("HF_TOKEN")
+        self.show_progress = show_progress
+        self._session = requests.Session()
+
+    def _headers(self, url: str, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Request headers; the token only goes to the hub itself, never to the CDN it redirects to"""
+        headers = {"User-Agent": "blonde-cli"}
+        if self.token and urlsplit(url).netloc == urlsplit(self.endpoint).netloc:
+            headers["Authorization"] = f"Bearer {self.token}"
+        headers.update(extra or {})
+        return headers
+
+    def _repo_dir(self, repo: str) -> Path:
+        return self.cache_dir / ("models--" + repo.replace("/", "--"))
+
+    def cached_path(self, repo: str, filename: str, revision: str = "main") -> Optional[str]:
+        """Local path of a file already in the cache for revision, without touching the network"""
+        repo_dir = self._repo_dir(repo)
+        try:
+            commit = (repo_dir / "refs" / revision).read_text().strip()
+        except OSError:
+            commit = revision
+        path = repo_dir / "snapshots" / commit / filename
+        return str(path) if path.exists() else None
+
+    def file_metadata(self, repo: str, filename: str, revision: str = "main") -> RemoteFile:
+        """
+        Size, sha256 and download URL of a hub file.
+
+        Raises:
+            DownloadError: If the hub does not serve the file
+        """
+        url = f"{self.endpoint}/{repo}/resolve/{quote(revision, safe='')}/{quote(filename)}"
+        commit = None
+        for _ in range(5):  # renamed repos redirect to the new name before the LFS redirect
+            try:
+                response = self._session.head(url, headers=self._headers(url), allow_redirects=False, timeout=TIMEOUT)
+            except requests.RequestException as e:
+                raise DownloadError(f"Could not reach {self.endpoint}: {e}")
+            if response.status_code >= 400:
+                raise DownloadError(f"{repo}/{filename}: HTTP {response.status_code}")
+            commit = response.headers.get("X-Repo-Commit") or commit
+            linked = response.headers.get("X-Linked-Etag")
+            location = response.headers.get("Location")
+            if response.is_redirect and location and not linked:
+                url = urljoin(url, location)
+                continue
+            etag = (linked or response.headers.get("ETag") or "").removeprefix("W/").strip('"')
+            size = int(response.headers.get("X-Linked-Size") or response.headers.get("Content-Length") or 0)
+            target = urljoin(url, location) if response.is_redirect and location else url
+            return RemoteFile(url=target, size=size, sha256=etag if _SHA256.match(etag) else None,
+                              commit=commit, etag=etag)
+        raise DownloadError(f"{repo}/{filename}: too many redirects")
+
+    def download(self, repo: str, filename: str, revision: str = "main") -> DownloadResult:
+        """
+        Fetch a file into the cache, resuming an earlier partial download.
+
+        Args:
+            repo: Hub repo id (e.g. TheBloke/phi-2-GGUF)
+            filename: File in the repo
+            revision: Branch, tag or commit
+
+        Returns:
+            DownloadResult with the snapshot path of the file
+
+        Raises:
+            DownloadError: If the download fails or the checksum does not match
+        """
+        cached = self.cached_path(repo, filename, revision)
+        if cached:
+            size = os.path.getsize(cached)
+            return DownloadResult(cached, size, None, 0, 0, 0.0, cached=True)
+
+        remote = self.file_metadata(repo, filename, revision)
+        repo_dir = self._repo_dir(repo)
+        blob = repo_dir / "blobs" / (remote.sha256 or remote.etag or hashlib.sha256(filename.encode()).hexdigest())
+        start = time.perf_counter()
+        downloaded = resumed = 0
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            downloaded, resumed = self._fetch(remote, blob, filename)
+            if remote.sha256:
+                self._verify(blob.with_name(blob.name + ".part"), remote.sha256)
+            os.replace(blob.with_name(blob.name + ".part"), blob)
+            _remove(blob.with_name(blob.name + ".part.json"))
+        seconds = time.perf_counter() - start
+
+        path = self._link_snapshot(repo_dir, remote.commit or revision, filename, blob)
+        if remote.commit and revision != remote.commit:
+            (repo_dir / "refs").mkdir(parents=True, exist_ok=True)
+            atomic_write(str(repo_dir / "refs" / revision), remote.commit)
+        return DownloadResult(str(path), remote.size or blob.stat().st_size, remote.sha256,
+                              downloaded, resumed, seconds)
+
+    def _fetch(self, remote: RemoteFile, blob: Path, filename: str):
+        """Download remote into blob.part; returns (bytes fetched now, bytes kept from before)"""
+        part = blob.with_name(blob.name + ".part")
+        if remote.size <= 0 or not self._supports_ranges(remote.url):
+            return self._fetch_stream(remote, part, filename), 0
+
+        state_file = blob.with_name(blob.name + ".part.json")
+        chunks = [(offset, min(offset + self.chunk_size, remote.size))
+                  for offset in range(0, remote.size, self.chunk_size)]
+        done = self._load_state(state_file, part, remote.size)
+        resumed = sum(end - begin for begin, end in chunks if begin in done)
+        if not part.exists():
+            with open(part, "wb") as f:
+                f.truncate(remote.size)
+
+        counter = _Counter()
+        stop = threading.Event()
+        state_lock = threading.Lock()
+        todo = [chunk for chunk in chunks if chunk[0] not in done]
+
+        def fetch(chunk):
+            self._fetch_range(remote.url, part, chunk, counter, stop)
+            with state_lock:
+                done.add(chunk[0])
+                self._save_state(state_file, remote.size, done)
+
+        with self._progress(filename, remote.size, resumed) as report:
+            with ThreadPoolExecutor(max_workers=min(self.workers, max(1, len(todo)))) as pool:
+                futures = [pool.submit(fetch, chunk) for chunk in todo]
+                try:
+                    for future in _with_progress(futures, counter, report):
+                        future.result()
+                except BaseException:
+                    stop.set()
+                    raise
+        return counter.value, resumed
+
+    def _supports_ranges(self, url: str) -> bool:
+        try:
+            response = self._session.get(url, headers=self._headers(url, {"Range": "bytes=0-0"}),
+                                         stream=True, timeout=TIMEOUT)
+            response.close()
+        except requests.RequestException as e:
+            raise DownloadError(f"Could not reach {url}: {e}")
+        return response.status_code == 206
+
+    def _fetch_range(self, url: str, part: Path, chunk, counter: "_Counter", stop: threading.Event) -> None:
+        begin, end = chunk
+        last_error = None
+        for attempt in range(RETRIES):
+            if stop.is_set():
+                raise DownloadError("Download cancelled")
+            received = 0
+            try:
+                response = self._session.get(url, headers=self._headers(url, {"Range": f"bytes={begin}-{end - 1}"}),
+                                             stream=True, timeout=TIMEOUT)
+                if response.status_code != 206:
+                    response.close()
+                    raise DownloadError(f"Range request returned HTTP {response.status_code}")
+                with response, open(part, "r+b") as f:
+                    f.seek(begin)
+                    for block in response.iter_content(BLOCK_SIZE):
+                        if stop.is_set():
+                            raise DownloadError("Download cancelled")
+                        block = block[:end - begin - received]
+                        f.write(block)
+                        received += len(block)
+                        counter.add(len(block))
+                if received == end - begin:
+                    return
+                last_error = DownloadError(f"Range {begin}-{end - 1} ended after {received} bytes")
+            except (requests.RequestException, DownloadError) as e:
+                if stop.is_set():
+                    raise
+                last_error = e
+            counter.add(-received)  # refetched from the start of the range
+            if attempt + 1 < RETRIES:
+                logger.warning(f"Retrying bytes {begin}-{end - 1} ({attempt + 2}/{RETRIES}): {last_error}")
+                time.sleep(RETRY_WAIT * 2 ** attempt)
+        raise DownloadError(f"Could not download bytes {begin}-{end - 1}: {last_error}")
+
+    def _fetch_stream(self, remote: RemoteFile, part: Path, filename: str) -> int:
+        """Single-stream fallback for servers that ignore Range"""
+        try:
+            response = self._session.get(remote.url, headers=self._headers(remote.url), stream=True, timeout=TIMEOUT)
+        except requests.RequestException as e:
+            raise DownloadError(f"{filename}: {e}")
+        try:
+            response.raise_for_status()
+        except requests.RequestException as e:
+            response.close()
+            raise DownloadError(f"{filename}: {e}")
+        received = 0
+        with self._progress(filename, remote.size, 0) as report, response, open(part, "wb") as f:
+            for block in response.iter_content(BLOCK_SIZE):
+                f.write(block)
+                received += len(block)
+                report(received)
+        if remote.size and received != remote.size:
+            raise DownloadError(f"{filename}: expected {remote.size} bytes, got {received}")
+        return received
+
+    def _verify(self, path: Path, expected: str) -> None:
+        actual = sha256_file(path)
+        if actual != expected:
+            _remove(path)
+            _remove(path.with_name(path.name + ".json"))
+            raise DownloadError(f"Checksum mismatch for {path.name}: expected {expected}, got {actual}")
+
+    def _load_state(self, state_file: Path, part: Path, size: int) -> Set[int]:
+        """Offsets of ranges finished by an earlier attempt (none if the layout changed)"""
+        try:
+            state = json.loads(state_file.read_text())
+        except (OSError, ValueError):
+            state = None
+        if (not state or state.get("size") != size or state.get("chunk_size") != self.chunk_size
+                or not part.exists() or part.stat().st_size != size):
+            _remove(part)
+            return set()
+        return set(state.get("done", []))
+
+    def _save_state(self, state_file: Path, size: int, done: Set[int]) -> None:
+        atomic_write(str(state_file), json.dumps({"size": size, "chunk_size": self.chunk_size, "done": sorted(done)}))
+
+    @staticmethod
+    def _link_snapshot(repo_dir: Path, commit: str, filename: str, blob: Path) -> Path:
+        path = repo_dir / "snapshots" / commit / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists() or path.is_symlink():
+            path.unlink()
+        try:
+            path.symlink_to(os.path.relpath(blob, path.parent))
+        except OSError:
+            os.replace(blob, path)  # no symlinks (e.g. Windows without developer mode)
+        return path
+
+    def _progress(self, filename: str, size: int, completed: int):
+        return _ProgressReport(filename, size, completed, self.show_progress)
+
+
+class _Counter:
+    """Bytes received across workers"""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def add(self, n: int) -> None:
+        with self._lock:
+            self.value += n
+
+
+class _ProgressReport:
+    """Rich progress bar (or nothing) fed with the running byte count"""
+
+    def __init__(self, filename: str, size: int, completed: int, enabled: bool):
+        self.base = completed
+        self._progress = None
+        if enabled:
+            self._progress = Progress(TextColumn("[cyan]{task.description}"), BarColumn(), DownloadColumn(),
+                                      TransferSpeedColumn(), TimeRemainingColumn(), transient=True)
+            self._task = self._progress.add_task(filename, total=size or None, completed=completed)
+
+    def __enter__(self):
+        if self._progress:
+            self._progress.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._progress:
+            self._progress.stop()
+
+    def __call__(self, received: int) -> None:
+        if self._progress:
+            self._progress.update(self._task, completed=self.base + received)
+
+
+def _with_progress(futures: List, counter: _Counter, report: _ProgressReport, interval: float = 0.2):
+    """Yield futures as they finish, updating the progress bar meanwhile"""
+    pending = set(futures)
+    while pending:
+        finished, pending = wait(pending, timeout=interval, return_when=FIRST_COMPLETED)
+        report(counter.value)
+        yield from finished
+
+
+def _remove(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
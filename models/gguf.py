@@ -0,0 +1,227 @@
+"""
+GGUF header and metadata reader
+
+Everything the selector and LocalAdapter want to know about a model
+(architecture, trained context length, quantization, parameter count)
+is in the GGUF header: a key/value table followed by the tensor
+descriptors. read_gguf() memory-maps the file and parses only those, so
+only the first few MB of a multi-GB file are ever paged in, and it needs
+neither llama.cpp nor a model load.
+
+Layout (GGUF v2/v3, little-endian):
+    "GGUF" | u32 version | u64 tensor_count | u64 kv_count
+    kv_count x (string key | u32 type | value)
+    tensor_count x (string name | u32 n_dims | n_dims x u64 dim | u32 type | u64 offset)
+
+Usage:
+    info = read_gguf(path)
+    print(info.architecture, info.context_length, info.quantization, info.parameters_label)
+"""
+
+import mmap
+import struct
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+GGUF_MAGIC = b"GGUF"
+
+# Arrays longer than this (tokenizer vocabularies, merges) are skipped and
+# recorded by length only
+MAX_ARRAY_ITEMS = 64
+
+# Value type id -> struct format for fixed-size scalars
+_SCALARS = {
+    0: "B", 1: "b", 2: "H", 3: "h", 4: "I", 5: "i", 6: "f", 7: "?", 10: "Q", 11: "q", 12: "d",
+}
+_STRING, _ARRAY = 8, 9
+
+# llama.cpp's GGML_MAX_DIMS
+MAX_DIMS = 4
+# Smallest encodings, used to reject counts a file of its size cannot hold:
+# key length + value type + 1-byte value; name length + n_dims + type + offset
+_MIN_KV_BYTES = 8 + 4 + 1
+_MIN_TENSOR_BYTES = 8 + 4 + 4 + 8
+
+# llama_ftype values stored in general.file_type
+FILE_TYPES = {
+    0: "F32", 1: "F16", 2: "Q4_0", 3: "Q4_1", 7: "Q8_0", 8: "Q5_0", 9: "Q5_1",
+    10: "Q2_K", 11: "Q3_K_S", 12: "Q3_K_M", 13: "Q3_K_L", 14: "Q4_K_S", 15: "Q4_K_M",
+    16: "Q5_K_S", 17: "Q5_K_M", 18: "Q6_K", 19: "IQ2_XXS", 20: "IQ2_XS", 21: "Q2_K_S",
+    22: "IQ3_XS", 23: "IQ3_XXS", 24: "IQ1_S", 25: "IQ4_NL", 26: "IQ3_S", 27: "IQ3_M",
+    28: "IQ2_S", 29: "IQ2_M", 30: "IQ4_XS", 31: "IQ1_M", 32: "BF16",
+}
+
+
+class GGUFError(ValueError):
+    """The file is not a readable GGUF model"""
+
+
+@dataclass
+class GGUFInfo:
+    """Header summary of one GGUF file"""
+    path: str
+    version: int
+    tensor_count: int
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    parameters: int = 0  # total elements over all tensors
+
+    @property
+    def architecture(self) -> Optional[str]:
+        return self.metadata.get("general.architecture")
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.metadata.get("general.name")
+
+    def arch_value(self, key: str) -> Any:
+        """An architecture-scoped key, e.g. arch_value("context_length") -> llama.context_length"""
+        return self.metadata.get(f"{self.architecture}.{key}")
+
+    @property
+    def context_length(self) -> Optional[int]:
+        """Context length the model was trained with"""
+        value = self.arch_value("context_length")
+        return int(value) if isinstance(value, int) and value > 0 else None
+
+    @property
+    def quantization(self) -> Optional[str]:
+        file_type = self.metadata.get("general.file_type")
+        return FILE_TYPES.get(file_type) if isinstance(file_type, int) else None
+
+    @property
+    def parameters_label(self) -> str:
+        return format_parameters(self.parameters)
+
+
+def format_parameters(count: int) -> str:
+    """6738415616 -> "6.7B" """
+    if not count:
+        return "-"
+    for scale, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if count >= scale:
+            return f"{count / scale:.1f}{suffix}"
+    return str(count)
+
+
+class _Reader:
+    """Sequential little-endian reads over a memory map"""
+
+    def __init__(self, buffer, offset: int = 0):
+        self.buffer = buffer
+        self.offset = offset
+
+    def unpack(self, fmt: str) -> Tuple:
+        try:
+            values = struct.unpack_from("<" + fmt, self.buffer, self.offset)
+        except struct.error:
+            raise GGUFError(f"Truncated header at byte {self.offset}")
+        self.offset += struct.calcsize("<" + fmt)
+        return values
+
+    def u32(self) -> int:
+        return self.unpack("I")[0]
+
+    def u64(self) -> int:
+        return self.unpack("Q")[0]
+
+    def string(self) -> str:
+        length = self.u64()
+        end = self.offset + length
+        if end > len(self.buffer):
+            raise GGUFError(f"Truncated string at byte {self.offset}")
+        data = self.buffer[self.offset:end]
+        self.offset = end
+        return bytes(data).decode("utf-8", errors="replace")
+
+    def skip_string(self) -> None:
+        length = self.u64()  # read first: it advances offset
+        self.offset += length
+        if self.offset > len(self.buffer):
+            raise GGUFError("Truncated string")
+
+    def value(self, value_type: int) -> Any:
+        if value_type in _SCALARS:
+            return self.unpack(_SCALARS[value_type])[0]
+        if value_type == _STRING:
+            return self.string()
+        if value_type == _ARRAY:
+            item_type, count = self.u32(), self.u64()
+            if count > MAX_ARRAY_ITEMS:
+                self.skip_array(item_type, count)
+                return {"type": item_type, "length": count}
+            return [self.value(item_type) for _ in range(count)]
+        raise GGUFError(f"Unknown value type {value_type} at byte {self.offset}")
+
+    def skip_array(self, item_type: int, count: int) -> None:
+        if item_type in _SCALARS:
+            self.offset += struct.calcsize("<" + _SCALARS[item_type]) * count
+        elif item_type == _STRING:
+            for _ in range(count):
+                self.skip_string()
+        else:
+            for _ in range(count):
+                self.value(item_type)
+        if self.offset > len(self.buffer):
+            raise GGUFError("Truncated array")
+
+
+def read_gguf(path: str) -> GGUFInfo:
+    """
+    Parse the metadata and tensor descriptors of a GGUF file.
+
+    Args:
+        path: Model file
+
+    Returns:
+        GGUFInfo; long arrays in the metadata are replaced by {"type", "length"}
+
+    Raises:
+        GGUFError: If the file is not GGUF or its header is truncated
+        OSError: If the file cannot be opened
+    """
+    with open(path, "rb") as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise GGUFError(f"{path} is empty")
+    with buffer:
+        if buffer[:4] != GGUF_MAGIC:
+            raise GGUFError(f"{path} is not a GGUF file")
+        reader = _Reader(buffer, 4)
+        version = reader.u32()
+        if version > 0xFFFF:
+            raise GGUFError(f"{path} is a big-endian GGUF file, which is not supported")
+        if version < 2:
+            # v1 used 32-bit counts and lengths; llama.cpp stopped reading it long ago
+            raise GGUFError(f"Unsupported GGUF version {version}")
+        tensor_count, kv_count = reader.u64(), reader.u64()
+        if kv_count * _MIN_KV_BYTES + tensor_count * _MIN_TENSOR_BYTES > len(buffer) - reader.offset:
+            raise GGUFError(f"Truncated header: {path} claims {kv_count} keys and {tensor_count} tensors, more than the file holds")
+
+        metadata: Dict[str, Any] = {}
+        for _ in range(kv_count):
+            key = reader.string()
+            metadata[key] = reader.value(reader.u32())
+
+        parameters = 0
+        for _ in range(tensor_count):
+            reader.skip_string()
+            n_dims = reader.u32()
+            if n_dims > MAX_DIMS:
+                raise GGUFError(f"Tensor with {n_dims} dimensions at byte {reader.offset}")
+            elements = 1
+            for dim in reader.unpack("Q" * n_dims):
+                elements *= dim
+            reader.unpack("IQ")  # type, data offset
+            parameters += elements
+
+    return GGUFInfo(path=str(path), version=version, tensor_count=tensor_count,
+                    metadata=metadata, parameters=parameters)
+
+
+def try_read_gguf(path: str) -> Optional[GGUFInfo]:
+    """read_gguf, or None if the file cannot be parsed"""
+    try:
+        return read_gguf(path)
+    except (GGUFError, OSError):
+        return None
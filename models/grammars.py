@@ -0,0 +1,90 @@
+"""
+Built-in GBNF grammars for constrained local decoding
+
+llama.cpp can restrict sampling to strings a grammar accepts, so a local
+model cannot wrap code in prose or emit half-formed JSON. LocalAdapter.chat
+takes either a name from BUILTIN_GRAMMARS or raw GBNF text:
+
+- "code":           exactly one fenced code block, nothing before or after
+- "json_plan":      a JSON array of step objects (TaskPlanner's text format)
+- "diff":           unified diff hunks, or NO_CHANGES
+- "search_replace": SEARCH/REPLACE blocks (the format `fix` asks for), or NO_CHANGES
+
+The patch grammars produce exactly what patching.parse_patch accepts.
+
+Usage:
+    adapter.chat(prompt, grammar="code")
+"""
+
+from typing import List
+
+from patching import NO_CHANGES
+
+
+def line_not_starting_with(marker: str) -> str:
+    """
+    GBNF alternatives for one newline-terminated line that does not begin with marker.
+
+    A line either diverges from marker at some position or is a strict
+    prefix of it, which is expressible without negative lookahead.
+    """
+    options: List[str] = []
+    for i, char in enumerate(marker):
+        prefix = f'"{_escape(marker[:i])}" ' if i else ""
+        options.append(f'{prefix}[^{_escape_class(char)}\\n] [^\\n]* "\\n"')
+        if i:
+            options.append(f'{prefix}"\\n"')
+    options.append('"\\n"')
+    return " | ".join(f"( {option} )" for option in options)
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _escape_class(char: str) -> str:
+    return "\\" + char if char in "]^-\\" else char
+
+
+CODE_GRAMMAR = f"""
+root ::= "```" lang? "\\n" line* "```" "\\n"?
+lang ::= [a-zA-Z0-9_+.#-]+
+line ::= {line_not_starting_with("```")}
+"""
+
+JSON_PLAN_GRAMMAR = r"""
+root   ::= ws "[" ws object ( ws "," ws object )* ws "]" ws
+value  ::= object | array | string | number | "true" | "false" | "null"
+object ::= "{" ws ( string ws ":" ws value ( ws "," ws string ws ":" ws value )* )? ws "}"
+array  ::= "[" ws ( value ( ws "," ws value )* )? ws "]"
+string ::= "\"" ( [^"\\\x7F\x00-\x1F] | "\\" ( ["\\/bfnrt] | "u" hex hex hex hex ) )* "\""
+hex    ::= [0-9a-fA-F]
+number ::= "-"? ( [0-9] | [1-9] [0-9]* ) ( "." [0-9]+ )? ( [eE] [-+]? [0-9]+ )?
+ws     ::= ( [ \t\n] ws )?
+"""
+
+DIFF_GRAMMAR = f"""
+root  ::= "{NO_CHANGES}" | hunk+
+hunk  ::= "@@ -" num ( "," num )? " +" num ( "," num )? " @@" [^\\n]* "\\n" hline+
+hline ::= [ +-] [^\\n]* "\\n"
+num   ::= [0-9]+
+"""
+
+SEARCH_REPLACE_GRAMMAR = f"""
+root   ::= "{NO_CHANGES}" | block+
+block  ::= "<<<<<<< SEARCH\\n" search* "=======\\n" replace* ">>>>>>> REPLACE\\n"
+search  ::= {line_not_starting_with("=======")}
+replace ::= {line_not_starting_with(">>>>>>>")}
+"""
+
+BUILTIN_GRAMMARS = {
+    "code": CODE_GRAMMAR,
+    "json_plan": JSON_PLAN_GRAMMAR,
+    "diff": DIFF_GRAMMAR,
+    "search_replace": SEARCH_REPLACE_GRAMMAR,
+}
+
+
+def grammar_text(grammar: str) -> str:
+    """GBNF for a built-in grammar name, or the argument itself if it is already GBNF"""
+    return BUILTIN_GRAMMARS.get(grammar, grammar)
@@ -1,29 +1,82 @@
 import os
+import json
+import threading
 from pathlib import Path
-from huggingface_hub import hf_hub_download
-from llama_cpp import Llama
+from llama_cpp import Llama, LlamaGrammar
 from tenacity import retry, stop_after_attempt, wait_fixed
 from rich.console import Console
 
+from models.context_pool import ContextPool
+from models.download import DownloadManager
+from models.gguf import try_read_gguf
+from models.grammars import grammar_text
+from models.manifest import ModelManifest
+from models.speculative import build_draft_model, speculative_config, speculative_enabled
+from models.tool_calling import parse_tool_call_json, tool_call_prompt, tool_call_schema
+from utils import env_int
+
 console = Console()
 
+# Inference contexts per adapter; each extra one costs a KV cache (the weights are shared)
+DEFAULT_CONTEXTS = env_int("BLONDE_LOCAL_CONTEXTS", 1)
+
+# Context length when the GGUF header does not say; models trained on longer
+# contexts get up to MAX_DEFAULT_N_CTX (each token of context costs KV-cache memory)
+FALLBACK_N_CTX = 2048
+MAX_DEFAULT_N_CTX = env_int("BLONDE_MAX_N_CTX", 4096)
+
+
+def default_n_ctx(info) -> int:
+    """Context length for a model: its trained context, capped at MAX_DEFAULT_N_CTX"""
+    trained = info.context_length if info else None
+    return min(trained, MAX_DEFAULT_N_CTX) if trained else FALLBACK_N_CTX
+
+
 class LocalAdapter:
-    def __init__(self, model_name="TheBloke/CodeLlama-7B-GGUF", model_file="codellama-7b.Q4_K_M.gguf", debug: bool = False, cached_path: str = None):
+    # A single Llama instance cannot serve overlapping requests (see contexts= for a pool)
+    supports_concurrency = False
+    # chat() accepts grammar= and json_schema= to constrain decoding
+    supports_grammar = True
+
+    def __init__(self, model_name="TheBloke/CodeLlama-7B-GGUF", model_file="codellama-7b.Q4_K_M.gguf", debug: bool = False, cached_path: str = None, speculative: bool = None, contexts: int = None, n_ctx: int = None):
         """Initialize GGUF model adapter.
         Args:
             model_name: Hugging Face model repo (e.g., TheBloke/CodeLlama-7B-GGUF).
             model_file: Specific GGUF file in repo (e.g., codellama-7b.Q4_K_M.gguf).
             debug: Enable debug logging.
             cached_path: Direct path to cached model file (skips download if provided).
+            speculative: Use the speculative decoding configured for this model in
+                AVAILABLE_MODELS, if any (default: BLONDE_SPECULATIVE, off). Costs an
+                n_ctx x n_vocab logits buffer per context (see models/speculative.py).
+            contexts: Maximum concurrent requests (default BLONDE_LOCAL_CONTEXTS or 1).
+                Extra contexts are opened on demand and split the CPU threads.
+            n_ctx: Context length (default: the model's trained context from its
+                GGUF header, capped at BLONDE_MAX_N_CTX).
         """
         self.model_name = model_name
         self.model_file = model_file
         self.debug = debug
         self.cached_path = cached_path
+        if speculative is None:
+            speculative = speculative_enabled()
+        self.speculative = speculative_config(model_name, model_file) if speculative else None
         self.cache_dir = Path.home() / ".blonde" / "models"
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.contexts = max(1, contexts or DEFAULT_CONTEXTS)
+        self.n_threads = max(1, (os.cpu_count() or 4) // self.contexts)
+        self.supports_concurrency = self.contexts > 1
+        self.max_concurrency = self.contexts
         self.model_path = self._download_model()
+        self.gguf = try_read_gguf(self.model_path)  # header only; no weights are read
+        self.n_ctx = n_ctx or default_n_ctx(self.gguf)  # Context length
+        if self.gguf:
+            console.print(f"[dim]{self.gguf.architecture or 'unknown'} | {self.gguf.parameters_label} params | "
+                          f"{self.gguf.quantization or '?'} | trained context {self.gguf.context_length or '?'} "
+                          f"(using {self.n_ctx})[/dim]")
         self.llm = self._load_model()
+        self.pool = ContextPool(self._load_model, size=self.contexts, primary=self.llm)
+        self._grammars = {}  # (context id, kind, GBNF or JSON schema text) -> compiled LlamaGrammar
+        self._grammar_lock = threading.Lock()
 
     def _download_model(self) -> str:
         """Download GGUF model from Hugging Face if not cached.
@@ -43,17 +96,15 @@ class LocalAdapter:
                 console.print(f"[yellow]⚠ Cached path not found: {self.cached_path}[/yellow]")
                 console.print(f"[dim]Falling back to download...[/dim]")
         
-        # Otherwise, download from HuggingFace
+        # Otherwise, download from HuggingFace (parallel ranges, resumable, sha256-checked)
         try:
             console.print(f"[cyan]Checking for model {self.model_name}/{self.model_file}...[/cyan]")
-            model_path = hf_hub_download(
-                repo_id=self.model_name,
-                filename=self.model_file,
-                cache_dir=self.cache_dir,
-                local_dir_use_symlinks=False
-            )
-            console.print(f"[green]Model cached at {model_path}[/green]")
-            return model_path
+            result = DownloadManager(self.cache_dir).download(self.model_name, self.model_file)
+            console.print(f"[green]Model cached at {result.path}[/green]")
+            if not result.cached:
+                console.print(f"[dim]{result.summary()}[/dim]")
+                self._record_download(result.path, self.model_name, result.sha256)
+            return result.path
         except Exception as e:
             console.print(f"[red]Failed to download model: {e}[/red]")
             raise ValueError(f"Model download failed: {e}")
@@ -66,38 +117,124 @@ class LocalAdapter:
             ValueError: If model loading fails.
         """
         try:
-            return Llama(
+            llm = Llama(
                 model_path=str(self.model_path),
-                n_ctx=2048,  # Context length
-                n_threads=os.cpu_count() or 4,  # Use available CPU cores
+                n_ctx=self.n_ctx,
+                n_threads=self.n_threads,  # Available CPU cores, split between contexts
+                logits_all=self.speculative is not None,  # Drafts are verified at every position
                 verbose=self.debug
             )
         except Exception as e:
             console.print(f"[red]Failed to load model: {e}[/red]")
             raise ValueError(f"Model loading failed: {e}")
+        if self.speculative is not None:
+            llm.draft_model = build_draft_model(self.speculative, llm, self._download_draft, self.n_threads)
+            console.print(f"[dim]Speculative decoding: {type(llm.draft_model).__name__}[/dim]")
+        return llm
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-    def chat(self, prompt: str) -> str:
+    def _download_draft(self, repo: str, file: str) -> str:
+        """Fetch a draft model into the same cache as the main model"""
+        result = DownloadManager(self.cache_dir).download(repo, file)
+        if not result.cached:
+            self._record_download(result.path, repo, result.sha256)
+        return result.path
+
+    def _record_download(self, path: str, repo: str, sha256: str = None) -> None:
+        """Add a downloaded model to the cache manifest the model selector reads"""
+        try:
+            ModelManifest(self.cache_dir).record(path, repo=repo, sha256=sha256)
+        except OSError as e:
+            console.print(f"[yellow]⚠ Could not update model manifest: {e}[/yellow]")
+
+    def chat(self, prompt: str, grammar: str = None, json_schema: dict = None) -> str:
         """Generate response from GGUF model.
         Args:
             prompt: Input string.
+            grammar: Optional built-in grammar name ("code", "json_plan", "diff",
+                "search_replace"; see models.grammars) or raw GBNF text.
+            json_schema: Optional JSON schema the response must satisfy (overrides grammar).
         Returns:
-            Generated text.
+            Generated text. Constrained output is generated greedily and may run
+            until the grammar completes (at most the context left after the
+            prompt), instead of stopping at 200 tokens.
         Raises:
-            ValueError: If inference fails.
+            ValueError: If inference fails or constrained output was cut off by the token limit.
         """
+        if grammar or json_schema is not None:
+            # Greedy decoding is deterministic: a retry would fail the same way, at the same cost
+            return self._complete(prompt, grammar, json_schema)
+        return self._complete_with_retry(prompt)
+
+    @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
+    def _complete_with_retry(self, prompt: str) -> str:
+        return self._complete(prompt)
+
+    def _complete(self, prompt: str, grammar: str = None, json_schema: dict = None) -> str:
         try:
-            output = self.llm(
+            with self.pool.lease() as llm:
+                output = self._generate(llm, prompt, grammar, json_schema)
+            choice = output["choices"][0]
+            if (grammar or json_schema is not None) and choice.get("finish_reason") == "length":
+                raise ValueError("constrained output was cut off by the token limit")
+            response = choice["text"].strip()
+            if self.debug:
+                console.print(f"[yellow]Debug: Local model response: {response[:100]}...[/yellow]")
+            return response
+        except Exception as e:
+            console.print(f"[red]Inference failed: {e}[/red]")
+            raise ValueError(f"Inference failed: {e}")
+
+    def _generate(self, llm: Llama, prompt: str, grammar: str = None, json_schema: dict = None) -> dict:
+        """Run one completion on a leased context"""
+        constraint = self._grammar(llm, grammar, json_schema)
+        if constraint is None:
+            return llm(
                 prompt,
                 max_tokens=200,  # Limit output length
                 temperature=0.7,
                 stop=["</s>", "<|end|>"],  # Common stop tokens for GGUF
                 echo=False  # Don't repeat prompt
             )
-            response = output["choices"][0]["text"].strip()
-            if self.debug:
-                console.print(f"[yellow]Debug: Local model response: {response[:100]}...[/yellow]")
-            return response
-        except Exception as e:
-            console.print(f"[red]Inference failed: {e}[/red]")
-            raise ValueError(f"Inference failed: {e}")
\ No newline at end of file
+        room = self.n_ctx - len(llm.tokenize(prompt.encode("utf-8")))
+        if room <= 0:
+            raise ValueError(f"Prompt fills the whole context ({self.n_ctx} tokens)")
+        return llm(
+            prompt,
+            max_tokens=room,  # Until the grammar completes, within the context left after the prompt
+            temperature=0,
+            grammar=constraint,
+            echo=False
+        )
+
+    def _grammar(self, llm: Llama, grammar: str = None, json_schema: dict = None) -> LlamaGrammar:
+        """Compile (once per context) the grammar for a name, GBNF text or JSON schema; None if unconstrained"""
+        # A LlamaGrammar carries parse state while sampling, so contexts must not share one
+        if json_schema is not None:
+            key = (id(llm), "schema", json.dumps(json_schema, sort_keys=True))
+        elif grammar:
+            key = (id(llm), "gbnf", grammar_text(grammar))
+        else:
+            return None
+        with self._grammar_lock:
+            compiled = self._grammars.get(key)
+        if compiled is None:
+            if key[1] == "schema":
+                compiled = LlamaGrammar.from_json_schema(key[2], verbose=self.debug)
+            else:
+                compiled = LlamaGrammar.from_string(key[2], verbose=self.debug)
+            with self._grammar_lock:
+                self._grammars[key] = compiled
+        return compiled
+
+    def chat_tools(self, prompt: str, tools: list) -> list:
+        """Generate one tool call, constrained by a grammar so it is always valid JSON.
+        Args:
+            prompt: Input string.
+            tools: OpenAI-style tool definitions (see models.tool_calling).
+        Returns:
+            List holding the single ToolCall.
+        Raises:
+            ValueError: If inference fails or the output was cut off by the token limit.
+        """
+        text = self.chat(tool_call_prompt(prompt, tools), json_schema=tool_call_schema(tools))
+        return [parse_tool_call_json(text)]
@@ -0,0 +1,213 @@
+"""
+Manifest of cached GGUF models
+
+Listing cached models used to mean walking the whole HuggingFace cache
+(blobs, refs and locks included) and stat-ing every file, which takes
+seconds on network filesystems. The manifest records each model once,
+together with the mtime of every directory the scan visited:
+
+- A file added to or removed from any directory changes that directory's
+  mtime, so comparing the recorded mtimes with a stat per directory is
+  enough to tell that the manifest is still current; only then is the
+  tree walked again.
+- The walk skips blobs/, refs/ and lock directories; models are found
+  through snapshots/.
+- Architecture, trained context and parameter count come from the GGUF
+  header (models/gguf.py), read once per new file.
+- sha256 comes from the blob the snapshot entry links to (HuggingFace names
+  LFS blobs by their sha256) or is recorded when the model is downloaded;
+  a rescan never hashes multi-GB files.
+
+Usage:
+    manifest = ModelManifest(cache_dir)       # ~/.blonde/models.manifest.json
+    for model in manifest.models():
+        print(model["file"], model["quant"], model["sha256"])
+    manifest.record(path, repo="TheBloke/phi-2-GGUF")   # after a download
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from fileio import atomic_write
+from models.gguf import try_read_gguf
+
+logger = logging.getLogger("blonde")
+
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 2  # 2: GGUF header fields
+
+# HuggingFace cache directories that never contain model entry points
+SKIP_DIRS = {"blobs", "refs", ".locks", ".no_exist"}
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+_QUANT = re.compile(r"[.-]((?:I?Q\d+(?:_[A-Z0-9]+)*)|F16|F32|BF16)$", re.IGNORECASE)
+
+
+def quantization(filename: str) -> Optional[str]:
+    """Quantization type from a GGUF file name, e.g. "Q4_K_M" for codellama-7b.Q4_K_M.gguf"""
+    match = _QUANT.search(Path(filename).stem)
+    return match.group(1).upper() if match else None
+
+
+def repo_from_path(path: Path) -> str:
+    """Repo id from the HuggingFace cache layout models--{OWNER}--{NAME}/snapshots/{HASH}/{FILE}"""
+    for part in path.parts:
+        if part.startswith("models--"):
+            return part[len("models--"):].replace("--", "/", 1)
+    return "Unknown"
+
+
+def blob_sha256(path: Path) -> Optional[str]:
+    """sha256 of a cached file, if it is a link to a content-addressed blob"""
+    try:
+        target = os.readlink(path)
+    except OSError:
+        return None
+    name = os.path.basename(target)
+    return name if _SHA256.match(name) else None
+
+
+def file_sha256(path: Path, block_size: int = 8 * 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _walk(root: Path, dirs: Dict[str, int]) -> Iterator[Path]:
+    """GGUF files under root, recording the mtime of every directory visited"""
+    try:
+        dirs[str(root)] = root.stat().st_mtime_ns
+        entries = list(os.scandir(root))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS:
+                    yield from _walk(Path(entry.path), dirs)
+            elif entry.name.endswith(".gguf"):
+                yield Path(entry.path)
+        except OSError:
+            continue
+
+
+class ModelManifest:
+    """JSON index of the GGUF models in one cache directory"""
+
+    def __init__(self, cache_dir: Path, path: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir)
+        # Kept beside the cache, not in it: writing it must not change the mtimes it records
+        self.path = Path(path) if path else self.cache_dir.with_name(self.cache_dir.name + MANIFEST_SUFFIX)
+        self._lock = threading.Lock()
+        self.rescans = 0
+        self._data = self._read()
+
+    def _read(self) -> Dict:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return {}
+        return data
+
+    def is_current(self) -> bool:
+        """True if no directory scanned last time has changed since"""
+        dirs = self._data.get("dirs")
+        if not dirs or str(self.cache_dir) not in dirs or self._data.get("cache_dir") != str(self.cache_dir):
+            return False
+        for path, mtime in dirs.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def models(self) -> List[Dict]:
+        """Cached models, rescanning the cache only if it changed"""
+        with self._lock:
+            if not self.is_current():
+                self._rescan()
+            return [dict(model) for model in self._data["models"]]
+
+    def _rescan(self) -> None:
+        previous = {model["path"]: model for model in self._data.get("models", [])}
+        dirs: Dict[str, int] = {}
+        models = []
+        for path in _walk(self.cache_dir, dirs):
+            try:
+                st = path.stat()
+            except OSError:
+                continue  # dangling link to a removed blob
+            old = previous.get(str(path))
+            if old and old.get("size_bytes") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+                models.append(old)
+            else:
+                models.append(self._entry(path, st))
+        models.sort(key=lambda model: model["path"])
+        self.rescans += 1
+        self._data = {"version": MANIFEST_VERSION, "cache_dir": str(self.cache_dir), "models": models, "dirs": dirs}
+        self._save()
+
+    @staticmethod
+    def _entry(path: Path, st: os.stat_result, repo: Optional[str] = None, sha256: Optional[str] = None) -> Dict:
+        info = try_read_gguf(str(path))
+        return {
+            "file": path.name,
+            "path": str(path),
+            "size": f"{st.st_size / (1024 * 1024):.1f}MB",
+            "size_bytes": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "repo": repo or repo_from_path(path),
+            "quant": (info and info.quantization) or quantization(path.name),
+            "sha256": sha256 or blob_sha256(path),
+            "architecture": info.architecture if info else None,
+            "context_length": info.context_length if info else None,
+            "parameters": info.parameters if info else None,
+        }
+
+    def record(self, path: str, repo: Optional[str] = None, sha256: Optional[str] = None) -> Dict:
+        """
+        Add or refresh a model after it was downloaded.
+
+        Args:
+            path: The model file
+            repo: Repo it came from (default: derived from the cache layout)
+            sha256: Known checksum; otherwise read from the blob link, or hashed
+
+        Returns:
+            The manifest entry
+        """
+        model_path = Path(path)
+        st = model_path.stat()
+        entry = self._entry(model_path, st, repo, sha256)
+        known = next((m for m in self._data.get("models", []) if m["path"] == entry["path"]), None)
+        if entry["sha256"] is None and known and known.get("sha256") \
+                and (known.get("size_bytes"), known.get("mtime_ns")) == (st.st_size, st.st_mtime_ns):
+            entry["sha256"] = known["sha256"]  # already hashed; hf_hub_download returns cached files too
+        if entry["sha256"] is None:
+            entry["sha256"] = file_sha256(model_path)
+        with self._lock:
+            models = [m for m in self._data.get("models", []) if m["path"] != entry["path"]]
+            self._data["models"] = models + [entry]
+            # The download changed the directories, so rescan; unchanged entries (this one included) are reused
+            self._rescan()
+        return entry
+
+    def _save(self) -> None:
+        try:
+            atomic_write(str(self.path), json.dumps(self._data, indent=1))
+        except OSError as e:
+            logger.warning(f"Could not save model manifest {self.path}: {e}")
@@ -1,10 +1,14 @@
 # models/openai.py
 import os
 from openai import OpenAI
+from models.tool_calling import parse_tool_calls, tool_choice
+from utils import env_int
 
 class OpenAIAdapter:
     def __init__(self):
         self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Context window in tokens (gpt-oss: 131072); set OPENAI_CONTEXT for other models
+        self.n_ctx = env_int("OPENAI_CONTEXT", 131_072)
 
     def chat(self, prompt: str) -> str:
         response = self.client.chat.completions.create(
@@ -16,3 +20,13 @@ class OpenAIAdapter:
         # return response.choices[0].message.content
         return response["choices"][0]["message"]["content"]
 
+    def chat_tools(self, prompt: str, tools: list) -> list:
+        """Returns the model's tool calls for prompt (see models.tool_calling)."""
+        response = self.client.chat.completions.create(
+            model="openai/gpt-oss-120b:free",
+            messages=[{"role": "user", "content": prompt}],
+            tools=tools,
+            tool_choice=tool_choice(tools),
+            temperature=0
+        )
+        return parse_tool_calls(response.choices[0].message.model_dump())
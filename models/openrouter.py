@@ -2,8 +2,9 @@
 import os
 import requests
 import json
-from tenacity import retry, stop_after_attempt, wait_fixed
-from utils import load_api_key, setup_logging
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
+from utils import env_int, load_api_key, setup_logging
+from models.tool_calling import parse_tool_calls, tool_choice
 
 class OpenRouterAdapter:
     def __init__(self, debug: bool = False):
@@ -14,6 +15,8 @@ class OpenRouterAdapter:
             raise ValueError("OPENROUTER_API_KEY is not set")
         self.api_url = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
         self.model = os.getenv("OPENROUTER_MODEL", "openai/gpt-oss-20b:free")
+        # Context window in tokens (gpt-oss: 131072); set OPENROUTER_CONTEXT for other models
+        self.n_ctx = env_int("OPENROUTER_CONTEXT", 131_072)
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
     def chat(self, prompt: str) -> str:
@@ -54,4 +57,39 @@ class OpenRouterAdapter:
                 raise ValueError(f"Unexpected response structure")
         except requests.RequestException as e:
             self.logger.error(f"API request failed: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    # Only transport errors are retried: a 4xx usually means the model has no tool support
+    @retry(stop=stop_after_attempt(3), wait=wait_fixed(2),
+           retry=retry_if_exception_type((requests.ConnectionError, requests.Timeout)), reraise=True)
+    def chat_tools(self, prompt: str, tools: list) -> list:
+        """Sends prompt with OpenAI-style tool definitions and returns the tool calls.
+        Args:
+            prompt: User input string.
+            tools: Tool definitions (see models.tool_calling.function_tool).
+        Returns:
+            List of ToolCall with parsed JSON arguments.
+        Raises:
+            ValueError: If the model answered without a valid tool call.
+            requests.HTTPError: If API call fails (e.g. the model has no tool support).
+        """
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        data = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "tools": tools,
+            "tool_choice": tool_choice(tools),
+            "temperature": 0,
+        }
+
+        response = requests.post(self.api_url, headers=headers, data=json.dumps(data))
+        self.logger.debug(f"Status code: {response.status_code}")
+        response.raise_for_status()
+        try:
+            message = response.json()["choices"][0]["message"]
+        except (json.JSONDecodeError, KeyError, IndexError):
+            raise ValueError(f"Unexpected response structure")
+        return parse_tool_calls(message)
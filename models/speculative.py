@@ -0,0 +1,257 @@
+"""
+Speculative decoding for LocalAdapter
+
+A cheap drafter proposes the next few tokens and the main model checks
+them all in one batched forward pass; every accepted draft token is a
+token the main model did not have to decode on its own. llama-cpp-python
+runs the verification loop itself (Llama(draft_model=...)); this module
+provides the drafters:
+
+- "prompt_lookup": copies continuations of n-grams found earlier in the
+  context. Free, and very effective for fix/edit prompts, whose output
+  mostly repeats the input file.
+- "draft": a small GGUF model sharing the main model's tokenizer
+  (e.g. DeepSeek-Coder-1.3B for 6.7B, TinyLlama for Llama-2-7B).
+
+Pairs are configured per model in model_selector.AVAILABLE_MODELS under
+"speculative". A draft model whose vocabulary differs from the main
+model's is rejected in favour of prompt lookup.
+
+Speculative decoding is off unless BLONDE_SPECULATIVE=1 (or
+LocalAdapter(speculative=True)). It is not free:
+
+- Verification needs logits for every position (logits_all=True), an
+  n_ctx x n_vocab float32 buffer: about 0.5GB per context at n_ctx=4096
+  with a 32k vocabulary, for each pooled context.
+- "draft" models download and load a second GGUF on first use.
+
+Benchmark (acceptance rate and tokens/sec with and without drafting):
+
+    python -m models.speculative ~/.blonde/models/.../deepseek-coder-6.7b-instruct.Q4_K_M.gguf
+"""
+
+import os
+import time
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger("blonde")
+
+DEFAULT_PRED_TOKENS = 10
+
+
+def speculative_enabled() -> bool:
+    """Whether BLONDE_SPECULATIVE turns speculative decoding on"""
+    return os.getenv("BLONDE_SPECULATIVE", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class SpeculativeConfig:
+    """How to draft tokens for one main model"""
+    mode: str = "prompt_lookup"  # "prompt_lookup" or "draft"
+    num_pred_tokens: int = DEFAULT_PRED_TOKENS
+    draft_repo: Optional[str] = None
+    draft_file: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SpeculativeConfig":
+        return cls(
+            mode=data.get("mode", "prompt_lookup"),
+            num_pred_tokens=int(data.get("num_pred_tokens", DEFAULT_PRED_TOKENS)),
+            draft_repo=data.get("draft_repo"),
+            draft_file=data.get("draft_file"),
+        )
+
+
+def speculative_config(model_repo: Optional[str], model_file: Optional[str]) -> Optional[SpeculativeConfig]:
+    """The configured speculative mode for a model, matched by file name (cached models may lack a repo)"""
+    from model_selector import AVAILABLE_MODELS
+
+    for model in AVAILABLE_MODELS.values():
+        if model["file"] == model_file or (not model_file and model["repo"] == model_repo):
+            spec = model.get("speculative")
+            return SpeculativeConfig.from_dict(spec) if spec else None
+    return None
+
+
+class CountingDraft:
+    """Wraps a drafter and counts what it proposed, so acceptance can be measured"""
+
+    def __init__(self, drafter):
+        self.drafter = drafter
+        self.calls = 0
+        self.proposed = 0
+
+    def __call__(self, input_ids, **kwargs):
+        draft = self.drafter(input_ids, **kwargs)
+        self.calls += 1
+        self.proposed += len(draft)
+        return draft
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.proposed = 0
+
+
+class DraftLlama:
+    """
+    A small Llama used as a drafter (llama-cpp's LlamaDraftModel interface).
+
+    Drafts greedily; Llama.generate reuses the KV cache for the shared
+    prefix, so each call only evaluates tokens added since the last one.
+    """
+
+    def __init__(self, llm, num_pred_tokens: int = DEFAULT_PRED_TOKENS):
+        self.llm = llm
+        self.num_pred_tokens = num_pred_tokens
+
+    def __call__(self, input_ids, **kwargs):
+        import numpy as np
+
+        tokens = []
+        for token in self.llm.generate(list(input_ids), top_k=1, temp=0.0):
+            tokens.append(token)
+            if len(tokens) >= self.num_pred_tokens:
+                break
+        return np.array(tokens, dtype=np.intc)
+
+
+def build_draft_model(config: SpeculativeConfig, target, download: Callable[[str, str], str],
+                      n_threads: Optional[int] = None):
+    """
+    The drafter for config, checked against the loaded target model.
+
+    The target must have been created with logits_all=True (verification
+    samples at every drafted position).
+
+    Args:
+        config: Speculative settings for the target
+        target: Loaded llama_cpp.Llama the drafts are verified by
+        download: (repo, file) -> local path, for draft models
+        n_threads: CPU threads for a draft model
+
+    Returns:
+        An object usable as Llama.draft_model
+    """
+    from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+
+    lookup = LlamaPromptLookupDecoding(num_pred_tokens=config.num_pred_tokens)
+    if config.mode != "draft" or not (config.draft_repo and config.draft_file):
+        return lookup
+
+    from llama_cpp import Llama
+
+    try:
+        draft = Llama(model_path=download(config.draft_repo, config.draft_file), n_ctx=target.n_ctx(),
+                      n_threads=n_threads or os.cpu_count() or 4, verbose=False)
+    except Exception as e:
+        logger.warning(f"Could not load draft model {config.draft_file}, using prompt lookup: {e}")
+        return lookup
+    if draft.n_vocab() != target.n_vocab():
+        logger.warning(f"Draft model {config.draft_file} has a different vocabulary "
+                       f"({draft.n_vocab()} vs {target.n_vocab()}), using prompt lookup")
+        return lookup
+    return DraftLlama(draft, config.num_pred_tokens)
+
+
+@dataclass
+class SpeculativeStats:
+    """Result of one timed generation"""
+    tokens: int
+    seconds: float
+    draft_calls: int = 0
+    proposed: int = 0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        return self.tokens / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def accepted(self) -> int:
+        # Every verification round emits its accepted drafts plus one token from the main model
+        return max(0, self.tokens - self.draft_calls) if self.draft_calls else 0
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.proposed if self.proposed else 0.0
+
+
+def timed_generation(llm, prompt: str, max_tokens: int) -> SpeculativeStats:
+    """Greedy completion of prompt, counting draft proposals if llm.draft_model is a CountingDraft"""
+    counter = llm.draft_model if isinstance(llm.draft_model, CountingDraft) else None
+    if counter:
+        counter.reset()
+    llm.reset()  # no KV-cache reuse between runs, so both modes evaluate the full prompt
+    start = time.perf_counter()
+    output = llm(prompt, max_tokens=max_tokens, temperature=0)
+    seconds = time.perf_counter() - start
+    tokens = output["usage"]["completion_tokens"]
+    if counter:
+        return SpeculativeStats(tokens, seconds, counter.calls, counter.proposed)
+    return SpeculativeStats(tokens, seconds)
+
+
+def benchmark(llm, drafter, prompts, max_tokens: int = 256) -> Dict[str, float]:
+    """
+    Compare generation with and without drafting on the same loaded model.
+
+    Returns:
+        baseline/speculative tokens per second, speedup and acceptance rate
+    """
+    counter = CountingDraft(drafter)
+    baseline, speculative = [], []
+    original = llm.draft_model
+    try:
+        for prompt in prompts:
+            llm.draft_model = None
+            baseline.append(timed_generation(llm, prompt, max_tokens))
+            llm.draft_model = counter
+            speculative.append(timed_generation(llm, prompt, max_tokens))
+    finally:
+        llm.draft_model = original
+
+    def rate(stats):
+        seconds = sum(s.seconds for s in stats)
+        return sum(s.tokens for s in stats) / seconds if seconds > 0 else 0.0
+
+    proposed = sum(s.proposed for s in speculative)
+    base, spec = rate(baseline), rate(speculative)
+    return {
+        "baseline_tokens_per_sec": base,
+        "speculative_tokens_per_sec": spec,
+        "speedup": spec / base if base else 0.0,
+        "acceptance_rate": sum(s.accepted for s in speculative) / proposed if proposed else 0.0,
+    }
+
+
+BENCH_PROMPTS = [
+    "Fix the bug in this function and output the whole corrected function:\n\n"
+    "def average(values):\n    total = 0\n    for v in values:\n        total += v\n    return total / len(value)\n",
+    "Write a Python function that parses a CSV file and returns a list of dicts.\n",
+]
+
+
+if __name__ == "__main__":
+    import argparse
+    from llama_cpp import Llama
+    from huggingface_hub import hf_hub_download
+
+    parser = argparse.ArgumentParser(description="Benchmark speculative decoding for a GGUF model")
+    parser.add_argument("model_path")
+    parser.add_argument("--max-tokens", type=int, default=256)
+    args = parser.parse_args()
+
+    config = speculative_config(None, os.path.basename(args.model_path)) or SpeculativeConfig()
+    target = Llama(model_path=args.model_path, n_ctx=4096, n_threads=os.cpu_count() or 4,
+                   logits_all=True, verbose=False)
+    drafter = build_draft_model(
+        config, target,
+        download=lambda repo, file: hf_hub_download(repo_id=repo, filename=file,
+                                                    cache_dir=os.path.expanduser("~/.blonde/models")))
+    results = benchmark(target, drafter, BENCH_PROMPTS, args.max_tokens)
+    print(f"mode:         {config.mode}")
+    print(f"baseline:     {results['baseline_tokens_per_sec']:.1f} tok/s")
+    print(f"speculative:  {results['speculative_tokens_per_sec']:.1f} tok/s")
+    print(f"speedup:      {results['speedup']:.2f}x")
+    print(f"acceptance:   {results['acceptance_rate']:.0%}")
@@ -0,0 +1,141 @@
+"""
+Structured tool calling shared by the model adapters
+
+Adapters that implement
+
+    chat_tools(prompt: str, tools: List[dict]) -> List[ToolCall]
+
+return tool calls as parsed JSON instead of free text:
+
+- Remote adapters (OpenRouter, OpenAI) send OpenAI-style `tools` and read
+  `message.tool_calls` from the reply
+- LocalAdapter constrains decoding with a GBNF grammar built from
+  tool_call_schema(), so the output is valid JSON by construction
+
+Tools are described once, in the OpenAI function format:
+
+    tool = function_tool("submit_plan", "Submit the plan", {"type": "object", ...})
+    calls = adapter.chat_tools(prompt, [tool])
+    calls[0].arguments   # -> dict
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+
+@dataclass
+class ToolCall:
+    """One function call requested by the model"""
+    name: str
+    arguments: Dict[str, Any] = field(default_factory=dict)
+    id: Optional[str] = None
+
+
+def function_tool(name: str, description: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """An OpenAI-style tool definition"""
+    return {
+        "type": "function",
+        "function": {"name": name, "description": description, "parameters": parameters},
+    }
+
+
+def tool_choice(tools: List[Dict[str, Any]]) -> Union[str, Dict[str, Any]]:
+    """Force the call when there is only one tool, otherwise let the model pick"""
+    if len(tools) == 1:
+        return {"type": "function", "function": {"name": tools[0]["function"]["name"]}}
+    return "auto"
+
+
+class NoToolCallError(ValueError):
+    """The model answered in text instead of calling a tool (it ignores `tools`)"""
+
+
+def is_unsupported_error(error: Exception) -> bool:
+    """
+    True if error from chat_tools means the adapter or model cannot call tools
+    at all, as opposed to a transient failure worth retrying later.
+
+    That is an adapter that declares it unsupported (NotImplementedError), a
+    model that ignored the tools (NoToolCallError), or an API rejecting the
+    tools request with a 4xx (other than timeouts and rate limits).
+    """
+    if isinstance(error, (NotImplementedError, NoToolCallError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+
+def parse_tool_calls(message: Dict[str, Any]) -> List[ToolCall]:
+    """
+    Tool calls from an OpenAI-style assistant message.
+
+    Raises:
+        NoToolCallError: If the message has no tool calls
+        ValueError: If their arguments are not JSON objects
+    """
+    calls = []
+    for raw in message.get("tool_calls") or []:
+        function = raw.get("function") or {}
+        arguments = function.get("arguments") or "{}"
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid arguments for tool {function.get('name')}: {e}")
+        if not isinstance(arguments, dict):
+            raise ValueError(f"Arguments for tool {function.get('name')} are not an object")
+        calls.append(ToolCall(function.get("name", ""), arguments, raw.get("id")))
+    if not calls:
+        raise NoToolCallError("Model did not call a tool")
+    return calls
+
+
+def tool_call_schema(tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """JSON schema for one {"name": ..., "arguments": {...}} object calling any of tools"""
+    options = []
+    for tool in tools:
+        function = tool["function"]
+        options.append({
+            "type": "object",
+            "properties": {
+                "name": {"const": function["name"]},
+                "arguments": function.get("parameters") or {"type": "object"},
+            },
+            "required": ["name", "arguments"],
+        })
+    return options[0] if len(options) == 1 else {"anyOf": options}
+
+
+def tool_call_prompt(prompt: str, tools: List[Dict[str, Any]]) -> str:
+    """Prompt for models without native tool support: describe the tools, ask for one JSON call"""
+    described = "\n".join(
+        f"- {tool['function']['name']}: {tool['function'].get('description', '')}\n"
+        f"  arguments schema: {json.dumps(tool['function'].get('parameters') or {})}"
+        for tool in tools
+    )
+    return (
+        f"{prompt}\n\nYou can call these tools:\n{described}\n\n"
+        'Reply with exactly one JSON object of the form {"name": <tool name>, "arguments": {...}}.\n'
+    )
+
+
+def parse_tool_call_json(text: str) -> ToolCall:
+    """
+    The call in a grammar-constrained {"name", "arguments"} reply.
+
+    Raises:
+        ValueError: If text is not such an object
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Tool call is not valid JSON: {e}")
+    if not isinstance(data, dict) or not isinstance(data.get("name"), str):
+        raise ValueError("Tool call has no name")
+    arguments = data.get("arguments") or {}
+    if not isinstance(arguments, dict):
+        raise ValueError(f"Arguments for tool {data['name']} are not an object")
+    return ToolCall(data["name"], arguments)
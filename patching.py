@@ -0,0 +1,196 @@
+"""
+Patch parsing and fuzzy hunk application for BlondE-CLI
+
+Lets the model answer a fix request with just the changed regions instead
+of regenerating the whole file. Two answer formats are accepted:
+
+1. Search/replace blocks:
+
+    <<<<<<< SEARCH
+    exact lines from the original
+    =======
+    replacement lines
+    >>>>>>> REPLACE
+
+2. Unified diff hunks (``@@ -12,4 +12,5 @@`` with ' ', '-', '+' lines)
+
+Hunks are located exactly first, then ignoring whitespace, then by
+similarity near the expected position, so small model slips (indentation,
+stale line numbers) still apply. Anything ambiguous or unmatched raises
+PatchError rather than guessing.
+
+Usage:
+    new_source = apply_patch(original, model_response)
+"""
+
+import re
+import difflib
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+logger = logging.getLogger("blonde")
+
+# Minimum similarity for a fuzzy (non-exact) hunk match
+FUZZY_THRESHOLD = 0.85
+
+# How far (in lines) around the expected position fuzzy matching looks
+FUZZY_WINDOW = 200
+
+NO_CHANGES = "NO_CHANGES"
+
+_SEARCH_REPLACE_RE = re.compile(
+    r"^<{5,9} ?SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} ?REPLACE[^\n]*$",
+    re.DOTALL | re.MULTILINE,
+)
+_HUNK_HEADER_RE = re.compile(r"^@@(?: -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))?)? ?@@")
+
+
+class PatchError(ValueError):
+    """Raised when a patch cannot be parsed or applied cleanly"""
+
+
+@dataclass
+class Hunk:
+    """One change: replace ``old`` lines with ``new`` lines"""
+    old: List[str]
+    new: List[str]
+    old_start: Optional[int] = None  # 1-based line hint (unified diffs only)
+    applied_at: Optional[int] = field(default=None, compare=False)
+
+
+def parse_search_replace(text: str) -> List[Hunk]:
+    """Parse SEARCH/REPLACE blocks into hunks"""
+    hunks = []
+    for search, replace in _SEARCH_REPLACE_RE.findall(text):
+        hunks.append(Hunk(old=search.splitlines(), new=replace.splitlines()))
+    return hunks
+
+
+def parse_unified_diff(text: str) -> List[Hunk]:
+    """Parse unified diff hunks (file headers are ignored)"""
+    hunks: List[Hunk] = []
+    current: Optional[Hunk] = None
+    for line in text.splitlines():
+        header = _HUNK_HEADER_RE.match(line)
+        if header:
+            old_start = int(header.group(1)) if header.group(1) else None
+            if old_start is not None and header.group(2) == "0":
+                old_start += 1  # "-N,0" inserts after line N
+            current = Hunk(old=[], new=[], old_start=old_start)
+            hunks.append(current)
+            continue
+        if current is None or line.startswith(("--- ", "+++ ")):
+            continue
+        if line.startswith("\\"):  # "\ No newline at end of file"
+            continue
+        if line.startswith(" ") or line == "":
+            current.old.append(line[1:])
+            current.new.append(line[1:])
+        elif line.startswith("-"):
+            current.old.append(line[1:])
+        elif line.startswith("+"):
+            current.new.append(line[1:])
+        else:
+            current = None  # prose or a closing fence ends the hunk
+    # Models often pad hunks with blank "context" lines at the end
+    for hunk in hunks:
+        while hunk.old and hunk.new and hunk.old[-1] == "" and hunk.new[-1] == "":
+            hunk.old.pop()
+            hunk.new.pop()
+    return hunks
+
+
+def parse_patch(text: str) -> List[Hunk]:
+    """Parse a model response in either supported format"""
+    hunks = parse_search_replace(text)
+    if not hunks:
+        hunks = parse_unified_diff(text)
+    return hunks
+
+
+def _closest(candidates: List[int], hint: Optional[int]) -> Optional[int]:
+    if not candidates:
+        return None
+    if len(candidates) == 1:
+        return candidates[0]
+    if hint is None:
+        raise PatchError(f"Ambiguous hunk: matches at lines {[c + 1 for c in candidates]}")
+    return min(candidates, key=lambda c: abs(c - hint))
+
+
+def _find_block(lines: List[str], block: List[str], hint: Optional[int]) -> int:
+    """Return the 0-based index where block starts in lines"""
+    n = len(block)
+    starts = range(len(lines) - n + 1)
+
+    for normalize in (None, str.rstrip, str.strip):
+        norm_lines = lines if normalize is None else [normalize(l) for l in lines]
+        target = block if normalize is None else [normalize(b) for b in block]
+        candidates = [i for i in starts if norm_lines[i:i + n] == target]
+        found = _closest(candidates, hint)
+        if found is not None:
+            return found
+
+    # Fuzzy: best-scoring window near the hint
+    if hint is not None:
+        lo, hi = max(0, hint - FUZZY_WINDOW), min(len(lines) - n, hint + FUZZY_WINDOW)
+        starts = range(lo, hi + 1)
+    wanted = "\n".join(b.strip() for b in block)
+    best, best_score = None, 0.0
+    for i in starts:
+        matcher = difflib.SequenceMatcher(None, "\n".join(l.strip() for l in lines[i:i + n]), wanted)
+        if matcher.real_quick_ratio() < FUZZY_THRESHOLD or matcher.quick_ratio() < FUZZY_THRESHOLD:
+            continue
+        score = matcher.ratio()
+        if score > best_score:
+            best, best_score = i, score
+    if best is not None and best_score >= FUZZY_THRESHOLD:
+        logger.debug(f"Fuzzy hunk match at line {best + 1} (score {best_score:.2f})")
+        return best
+    preview = "\n".join(block[:3])
+    raise PatchError(f"Hunk not found in file:\n{preview}")
+
+
+def apply_hunks(original: str, hunks: List[Hunk]) -> str:
+    """
+    Apply hunks in order to the original text.
+
+    Raises:
+        PatchError: If a hunk cannot be located unambiguously
+    """
+    lines = original.splitlines()
+    delta = 0
+    for hunk in hunks:
+        hint = hunk.old_start - 1 + delta if hunk.old_start else None
+        if not hunk.old:
+            # Pure insertion: at the hinted line, or appended for SEARCH blocks
+            at = min(max(hint, 0), len(lines)) if hint is not None else len(lines)
+        else:
+            at = _find_block(lines, hunk.old, hint)
+        lines[at:at + len(hunk.old)] = hunk.new
+        hunk.applied_at = at
+        delta += len(hunk.new) - len(hunk.old)
+
+    result = "\n".join(lines)
+    if original.endswith("\n") or (not original and result):
+        result += "\n"
+    return result
+
+
+def apply_patch(original: str, response: str) -> str:
+    """
+    Apply a model's patch response to the original source.
+
+    Returns:
+        Patched source (the original unchanged if the model said NO_CHANGES)
+
+    Raises:
+        PatchError: If the response has no usable hunks or they do not apply
+    """
+    hunks = parse_patch(response)
+    if not hunks:
+        if NO_CHANGES in response:
+            return original
+        raise PatchError("No search/replace blocks or diff hunks found in response")
+    return apply_hunks(original, hunks)
@@ -0,0 +1,523 @@
+"""
+Repository indexing and relevance-ranked context for BlondE-CLI
+
+Turns the scan_repo map into prompt context that is actually about the
+file being worked on. Files are ranked against a target by:
+
+1. Import-graph distance (files the target imports, or that import it)
+2. Call overlap (the target calls what a file defines, or vice versa)
+3. Name similarity (path/identifier tokens shared with the target or query)
+
+The graph is built once per scan and reused for every target.
+
+Python files are parsed by a single-pass extractor (extract_python) that
+records definitions with line spans, resolved imports and call edges.
+SymbolTable turns those per-file records into a repo-wide, resolved call
+graph stored in flat arrays, so callers/callees of a symbol are an O(1)
+slice lookup.
+
+Usage:
+    selector = RepoContextSelector.for_repo_map(repo_map)
+    context = selector.build_context("pkg/service.py", max_tokens=500)
+
+    table = SymbolTable.for_repo_map(repo_map)
+    table.callers("pkg.db.query")   # -> ["pkg.service.get_users", ...]
+"""
+
+import os
+import re
+import ast
+import difflib
+import logging
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("blonde")
+
+# Rough prompt-size estimate used to convert token budgets to characters
+CHARS_PER_TOKEN = 4
+
+# Score weights for ranking candidate files
+IMPORT_WEIGHT = 0.5
+CALL_WEIGHT = 0.3
+NAME_WEIGHT = 0.2
+
+_IDENT_SPLIT_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def module_name(relative_path: str) -> str:
+    """Dotted module name for a repo-relative path (pkg/__init__.py -> pkg)"""
+    stem, _ = os.path.splitext(relative_path.replace(os.sep, "/"))
+    parts = [p for p in stem.split("/") if p]
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def name_tokens(text: str) -> Set[str]:
+    """Lower-case identifier tokens (snake_case and CamelCase aware)"""
+    return {t.lower() for t in _IDENT_SPLIT_RE.findall(text) if len(t) > 1}
+
+
+def imported_modules(node, relative_path: str) -> List[str]:
+    """
+    Dotted names an import statement refers to, with relative imports resolved.
+
+    Returns names like 'pkg.mod' or 'pkg.mod.symbol' (resolvers trim
+    trailing parts until something in the repo matches).
+    """
+    if isinstance(node, ast.Import):
+        return [alias.name for alias in node.names]
+    base = []
+    if node.level:
+        package = [p for p in os.path.dirname(relative_path).replace(os.sep, "/").split("/") if p]
+        base = package[:len(package) - (node.level - 1)] if node.level > 1 else package
+    if node.module:
+        base = base + node.module.split(".")
+    prefix = ".".join(base)
+    return [f"{prefix}.{alias.name}" if prefix and alias.name != "*" else (prefix or alias.name)
+            for alias in node.names]
+
+
+def _dotted(expr) -> Optional[str]:
+    """'a.b.c' for Name/Attribute chains, None for anything else"""
+    parts = []
+    while isinstance(expr, ast.Attribute):
+        parts.append(expr.attr)
+        expr = expr.value
+    if isinstance(expr, ast.Name):
+        parts.append(expr.id)
+        return ".".join(reversed(parts))
+    return None
+
+
+class PythonExtractor(ast.NodeVisitor):
+    """
+    Single AST pass collecting everything scan_repo and SymbolTable need.
+
+    Produces the legacy scan_repo lists (functions, classes, imports, bare
+    call names, modules) plus:
+        symbols: [qualname, kind, start_line, end_line] for every def/class
+        edges:   [caller qualname, callee reference] with import aliases,
+                 module-level names and self/cls methods already expanded
+                 to dotted paths (unresolved names are kept as written)
+    """
+
+    def __init__(self, relative_path: str):
+        self.relative_path = relative_path
+        self.module = module_name(relative_path)
+        self.functions: List[str] = []
+        self.classes: List[str] = []
+        self.imports: List[str] = []
+        self.calls: List[str] = []
+        self.modules: List[str] = []
+        self.symbols: List[list] = []
+        self.aliases: Dict[str, str] = {}
+        self._raw_edges: List[Tuple[str, str, Optional[str]]] = []
+        self._scope: List[str] = []
+        self._scope_kinds: List[str] = []
+        self._class_stack: List[str] = []
+        self._top_level: Set[str] = set()
+
+    def _qualname(self, name: str) -> str:
+        return ".".join([self.module] + self._scope + [name]) if self.module else ".".join(self._scope + [name])
+
+    def _visit_def(self, node, kind: str):
+        qualname = self._qualname(node.name)
+        self.symbols.append([qualname, kind, node.lineno, getattr(node, "end_lineno", None) or node.lineno])
+        if not self._scope:
+            self._top_level.add(node.name)
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self._scope.append(node.name)
+        self._scope_kinds.append(kind)
+        if kind == "class":
+            self._class_stack.append(qualname)
+        for child in node.body:
+            self.visit(child)
+        if kind == "class":
+            self._class_stack.pop()
+        self._scope_kinds.pop()
+        self._scope.pop()
+        # Defaults, annotations and bases are evaluated in the enclosing scope
+        for field in ("args", "returns", "bases", "keywords"):
+            value = getattr(node, field, None)
+            for item in (value if isinstance(value, list) else [value]):
+                if isinstance(item, ast.AST):
+                    self.visit(item)
+
+    def visit_FunctionDef(self, node):
+        self.functions.append(node.name)
+        in_class = bool(self._scope_kinds) and self._scope_kinds[-1] == "class"
+        self._visit_def(node, "method" if in_class else "function")
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self.classes.append(node.name)
+        self._visit_def(node, "class")
+
+    def _visit_import(self, node):
+        resolved = imported_modules(node, self.relative_path)
+        self.modules.extend(resolved)
+        for alias, dotted in zip(node.names, resolved):
+            self.imports.append(alias.name)
+            if alias.name == "*":
+                continue
+            if isinstance(node, ast.Import):
+                # "import a.b" binds "a"; "import a.b as c" binds c -> a.b
+                local = alias.asname or alias.name.split(".")[0]
+                self.aliases[local] = alias.name if alias.asname else local
+            else:
+                self.aliases[alias.asname or alias.name] = dotted
+
+    visit_Import = _visit_import
+    visit_ImportFrom = _visit_import
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Name):
+            self.calls.append(func.id)
+        elif isinstance(func, ast.Attribute):
+            self.calls.append(func.attr)
+        reference = _dotted(func)
+        if reference:
+            caller = ".".join([self.module] + self._scope) if self._scope else self.module
+            owner = self._class_stack[-1] if self._class_stack else None
+            self._raw_edges.append((caller, reference, owner))
+        self.generic_visit(node)
+
+    def _expand(self, reference: str, owner: Optional[str]) -> str:
+        head, _, rest = reference.partition(".")
+        if head in ("self", "cls") and owner and rest:
+            return f"{owner}.{rest}"
+        if head in self.aliases:
+            base = self.aliases[head]
+            return f"{base}.{rest}" if rest else base
+        if head in self._top_level:
+            return f"{self.module}.{reference}" if self.module else reference
+        return reference
+
+    def result(self) -> dict:
+        # Expanded after the walk so calls to functions defined later in the file resolve
+        edges = [[caller, self._expand(ref, owner)] for caller, ref, owner in self._raw_edges]
+        return {
+            "functions": self.functions, "classes": self.classes, "imports": self.imports,
+            "calls": self.calls, "modules": self.modules,
+            "symbols": self.symbols, "edges": edges,
+        }
+
+
+def extract_python(source: str, relative_path: str) -> dict:
+    """
+    Parse a Python file once and return its scan_repo metadata.
+
+    Raises:
+        SyntaxError: If the source does not parse
+    """
+    extractor = PythonExtractor(relative_path)
+    extractor.visit(ast.parse(source))
+    return extractor.result()
+
+
+@dataclass(frozen=True)
+class Symbol:
+    """A definition in the repo, 1-based inclusive line span"""
+    qualname: str
+    kind: str
+    path: str
+    start_line: int
+    end_line: int
+
+
+class SymbolTable:
+    """
+    Repo-wide symbol table and resolved call graph.
+
+    Symbols are interned to integer ids; their attributes live in parallel
+    arrays. Call edges are stored twice in CSR form (offsets + targets), once
+    forward and once reversed, so callees(sym) and callers(sym) are a dict
+    lookup plus an array slice.
+    """
+
+    _cache: Dict[int, Tuple[dict, "SymbolTable"]] = {}
+
+    def __init__(self, repo_map: Dict[str, dict]):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.kinds: List[str] = []
+        self.paths: List[str] = []
+        self.starts = array("i")
+        self.ends = array("i")
+        self.by_path: Dict[str, List[int]] = {}
+        self.external: Dict[str, Set[str]] = {}
+
+        for path, info in repo_map.items():
+            module = module_name(path)
+            if module and module not in self.ids:
+                self._add(module, "module", path, 1, 0)
+            for qualname, kind, start, end in info.get("symbols", []):
+                if qualname not in self.ids:
+                    self._add(qualname, kind, path, start, end)
+
+        edges: Set[Tuple[int, int]] = set()
+        for info in repo_map.values():
+            for caller, reference in info.get("edges", []):
+                source = self.ids.get(caller)
+                target = self.resolve(reference)
+                if source is None:
+                    continue
+                if target is None:
+                    self.external.setdefault(caller, set()).add(reference)
+                elif target != source:
+                    edges.add((source, target))
+        self._out_offsets, self._out_targets = self._csr(edges)
+        self._in_offsets, self._in_targets = self._csr({(b, a) for a, b in edges})
+
+    @classmethod
+    def for_repo_map(cls, repo_map: Dict[str, dict]) -> "SymbolTable":
+        """Return the table for this repo map, building it only once per scan"""
+        cached = cls._cache.get(id(repo_map))
+        if cached and cached[0] is repo_map:
+            return cached[1]
+        table = cls(repo_map)
+        cls._cache = {id(repo_map): (repo_map, table)}
+        return table
+
+    def _add(self, qualname: str, kind: str, path: str, start: int, end: int) -> None:
+        self.ids[qualname] = len(self.names)
+        self.names.append(qualname)
+        self.kinds.append(kind)
+        self.paths.append(path)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.by_path.setdefault(path, []).append(self.ids[qualname])
+
+    def _csr(self, edges: Set[Tuple[int, int]]) -> Tuple[array, array]:
+        counts = [0] * (len(self.names) + 1)
+        for source, _ in edges:
+            counts[source + 1] += 1
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+        offsets = array("i", counts)
+        targets = array("i", [0]) * len(edges)
+        fill = list(counts[:-1])
+        for source, target in sorted(edges):
+            targets[fill[source]] = target
+            fill[source] += 1
+        return offsets, targets
+
+    def resolve(self, reference: str) -> Optional[int]:
+        """
+        Map an expanded dotted reference to a symbol id.
+
+        Only exact qualified names match; calls through instances
+        (obj.method()) or package re-exports stay in self.external.
+        """
+        return self.ids.get(reference)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, qualname: str) -> bool:
+        return qualname in self.ids
+
+    def symbol(self, qualname: str) -> Optional[Symbol]:
+        """Definition details for a qualified name"""
+        i = self.ids.get(qualname)
+        if i is None:
+            return None
+        return Symbol(self.names[i], self.kinds[i], self.paths[i], self.starts[i], self.ends[i])
+
+    def callees(self, qualname: str) -> List[str]:
+        """Symbols in the repo that qualname calls"""
+        i = self.ids.get(qualname)
+        if i is None:
+            return []
+        return [self.names[t] for t in self._out_targets[self._out_offsets[i]:self._out_offsets[i + 1]]]
+
+    def callers(self, qualname: str) -> List[str]:
+        """Symbols in the repo that call qualname"""
+        i = self.ids.get(qualname)
+        if i is None:
+            return []
+        return [self.names[t] for t in self._in_targets[self._in_offsets[i]:self._in_offsets[i + 1]]]
+
+    def symbols_in(self, path: str) -> List[Symbol]:
+        """Definitions in a file, in source order"""
+        found = [self.symbol(self.names[i]) for i in self.by_path.get(path, []) if self.kinds[i] != "module"]
+        return sorted(found, key=lambda s: s.start_line)
+
+    def symbol_at(self, path: str, line: int) -> Optional[Symbol]:
+        """Innermost definition containing a line"""
+        best = None
+        for sym in self.symbols_in(path):
+            if sym.start_line <= line <= sym.end_line:
+                if best is None or sym.start_line >= best.start_line:
+                    best = sym
+        return best
+
+
+class RepoContextSelector:
+    """Ranks repo files by relevance to a target file and renders compact context"""
+
+    _cache: Dict[int, Tuple[dict, "RepoContextSelector"]] = {}
+
+    def __init__(self, repo_map: Dict[str, dict]):
+        self.repo_map = repo_map
+        self.modules = {module_name(path): path for path in repo_map}
+        self.defined: Dict[str, Set[str]] = {}
+        self.calls: Dict[str, Set[str]] = {}
+        self.tokens: Dict[str, Set[str]] = {}
+        self.neighbors: Dict[str, Set[str]] = {path: set() for path in repo_map}
+
+        for path, info in repo_map.items():
+            self.defined[path] = set(info.get("functions", [])) | set(info.get("classes", []))
+            self.calls[path] = set(info.get("calls", []))
+            self.tokens[path] = name_tokens(module_name(path))
+            for imported in info.get("modules", []):
+                target = self.resolve_module(imported)
+                if target and target != path:
+                    # Undirected: importing and being imported are both relevant
+                    self.neighbors[path].add(target)
+                    self.neighbors[target].add(path)
+
+        # Resolved cross-file call counts, per ordered (caller file, callee file)
+        self.table = SymbolTable.for_repo_map(repo_map)
+        self.call_links: Dict[Tuple[str, str], int] = {}
+        for i, name in enumerate(self.table.names):
+            for callee in self.table.callees(name):
+                pair = (self.table.paths[i], self.table.symbol(callee).path)
+                if pair[0] != pair[1]:
+                    self.call_links[pair] = self.call_links.get(pair, 0) + 1
+
+    @classmethod
+    def for_repo_map(cls, repo_map: Dict[str, dict]) -> "RepoContextSelector":
+        """Return a selector for this repo map, building it only once per scan"""
+        cached = cls._cache.get(id(repo_map))
+        if cached and cached[0] is repo_map:
+            return cached[1]
+        selector = cls(repo_map)
+        cls._cache = {id(repo_map): (repo_map, selector)}  # keep only the latest scan
+        return selector
+
+    def resolve_module(self, dotted: str) -> Optional[str]:
+        """Map an imported dotted name to a repo file, trying shorter prefixes"""
+        parts = dotted.split(".")
+        while parts:
+            path = self.modules.get(".".join(parts))
+            if path:
+                return path
+            parts.pop()
+        return None
+
+    def resolve_target(self, file_path: str) -> Optional[str]:
+        """Find the repo_map key for a filesystem path (longest suffix match)"""
+        normalized = os.path.normpath(file_path)
+        best = None
+        for key in self.repo_map:
+            norm_key = os.path.normpath(key)
+            if normalized == norm_key or normalized.endswith(os.sep + norm_key):
+                if best is None or len(norm_key) > len(best):
+                    best = key
+        return best
+
+    def _distances(self, start: str) -> Dict[str, int]:
+        dist = {start: 0}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for nxt in self.neighbors.get(node, ()):
+                if nxt not in dist:
+                    dist[nxt] = dist[node] + 1
+                    queue.append(nxt)
+        return dist
+
+    def rank(self, target: str, query: str = "", limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Score every other file against the target.
+
+        Args:
+            target: Path of the file being fixed/created (need not exist in the map)
+            query: Optional free text (e.g. a create description) for name matching
+            limit: Return at most this many files
+
+        Returns:
+            (repo-relative path, score) pairs, best first, zero scores dropped
+        """
+        key = self.resolve_target(target)
+        target_tokens = name_tokens(os.path.splitext(os.path.basename(target))[0]) | name_tokens(query)
+        target_calls = self.calls.get(key, set())
+        target_defs = self.defined.get(key, set())
+        distances = self._distances(key) if key else {}
+
+        scored = []
+        for path in self.repo_map:
+            if path == key:
+                continue
+            score = 0.0
+            if path in distances:
+                score += IMPORT_WEIGHT / distances[path]
+            defs = self.defined[path]
+            resolved = self.call_links.get((key, path), 0) + self.call_links.get((path, key), 0)
+            if resolved and defs:
+                score += CALL_WEIGHT * min(1.0, resolved / max(1, min(len(defs), 10)))
+            elif defs and (target_calls or target_defs):
+                # Bare-name fallback for calls the symbol table could not resolve
+                used = len(target_calls & defs) + len(self.calls[path] & target_defs)
+                score += CALL_WEIGHT * min(1.0, used / max(1, min(len(defs), 10)))
+            symbol_tokens = self.tokens[path] | {t for d in defs for t in name_tokens(d)}
+            if target_tokens and symbol_tokens:
+                overlap = len(target_tokens & symbol_tokens) / len(target_tokens)
+                stem_similarity = difflib.SequenceMatcher(
+                    None, os.path.basename(target), os.path.basename(path)).ratio()
+                score += NAME_WEIGHT * max(overlap, stem_similarity if stem_similarity > 0.6 else 0.0)
+            if score > 0:
+                scored.append((path, score))
+
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit] if limit else scored
+
+    def summarize(self, path: str) -> str:
+        """One compact line describing a file's symbols"""
+        info = self.repo_map.get(path, {})
+        parts = []
+        if info.get("classes"):
+            parts.append("classes: " + ", ".join(info["classes"][:8]))
+        functions = [f for f in info.get("functions", []) if not f.startswith("unparsed_")]
+        if functions:
+            parts.append("functions: " + ", ".join(functions[:12]))
+        if info.get("imports"):
+            parts.append("imports: " + ", ".join(sorted(set(info["imports"]))[:8]))
+        return f"- {path}: " + ("; ".join(parts) if parts else "(no symbols)")
+
+    def build_context(self, target: str, query: str = "", max_tokens: int = 500) -> str:
+        """
+        Render ranked symbol summaries for the target within a token budget.
+
+        The target's own summary comes first (when it is in the map), then
+        related files in rank order until the budget is used up.
+        """
+        budget = max_tokens * CHARS_PER_TOKEN
+        lines = []
+        key = self.resolve_target(target)
+        if key:
+            lines.append(self.summarize(key))
+        used = sum(len(l) + 1 for l in lines)
+        for path, _ in self.rank(target, query):
+            line = self.summarize(path)
+            if used + len(line) + 1 > budget:
+                break
+            lines.append(line)
+            used += len(line) + 1
+        return "\n".join(lines)
+
+
+def select_repo_context(repo_map: Optional[Dict[str, dict]], target: str, query: str = "",
+                        max_tokens: int = 500) -> str:
+    """Relevance-ranked repo context for a target file ('' if there is no map)"""
+    if not repo_map:
+        return ""
+    return RepoContextSelector.for_repo_map(repo_map).build_context(target, query, max_tokens)
@@ -43,7 +43,7 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/YOUR_GITHUB/blonde-cli",
     packages=find_packages(exclude=("tests",)),
-    py_modules=["cli", "utils", "model_selector", "memory", "tools", "server", "agentic_tools"],
+    py_modules=["cli", "utils", "model_selector", "memory", "tools", "server", "agentic_tools", "fileio", "patching", "code_chunks", "repo_index", "ts_extract", "docgen", "language", "stream_render", "fences", "history"],
     python_requires=">=3.10",
     install_requires=[
         "typer>=0.9.0",
@@ -51,7 +51,7 @@ setup(
         "pyyaml",
         "tenacity",
         "python-dotenv",
-        "tree-sitter",
+        "tree-sitter<0.22",
         "tree-sitter-languages",
         "openai",
         "requests",
@@ -0,0 +1,144 @@
+"""
+Incremental Markdown rendering for streamed responses
+
+Rendering Markdown(buffer) for the whole buffer on every chunk is quadratic
+in response length. StreamRenderer instead splits the stream into blocks
+(paragraphs separated by blank lines, and fenced code blocks):
+
+- A block is rendered exactly once, printed above the live region, as soon
+  as it is complete
+- Only the trailing open block is shown in the Live region, clipped to the
+  terminal height
+- Live frames are throttled to MAX_FPS, so fast streams do not redraw per chunk
+
+Total work is linear in the response length, so 10k-line answers stream
+as smoothly as short ones.
+
+Usage:
+    with StreamRenderer(console) as renderer:
+        for chunk in chunks:
+            renderer.feed(chunk)
+"""
+
+import time
+import logging
+from typing import List, Optional
+
+from rich.console import Console
+from rich.live import Live
+from rich.markdown import Markdown
+from rich.syntax import Syntax
+from rich.text import Text
+
+from fences import match_fence, closes_fence, parse_info
+
+logger = logging.getLogger("blonde")
+
+# Live region redraws per second (terminals rarely show more)
+MAX_FPS = 20
+
+CURSOR = "▊"
+
+
+class StreamRenderer:
+    """Feed text chunks; completed blocks are printed once, the open block stays live"""
+
+    def __init__(self, console: Console, max_fps: int = MAX_FPS, code_theme: str = "monokai"):
+        self.console = console
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.code_theme = code_theme
+        self._chunks: List[str] = []  # everything fed, for the caller's buffer
+        self._partial = ""        # current line without its newline yet
+        self._lines: List[str] = []  # complete lines of the open block
+        self._fence: Optional[str] = None  # fence marker while inside a code block
+        self._lang = ""
+        self._last_frame = 0.0
+        self._live: Optional[Live] = None
+        self.blocks_rendered = 0
+
+    def __enter__(self) -> "StreamRenderer":
+        self._live = Live(Text(""), console=self.console, auto_refresh=False, transient=True)
+        self._live.__enter__()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def buffer(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> None:
+        """Consume a chunk, finalizing any blocks it completes"""
+        self._chunks.append(chunk)
+        data = self._partial + chunk
+        *lines, self._partial = data.split("\n")
+        for line in lines:
+            self._push_line(line)
+        self._frame()
+
+    def close(self) -> None:
+        """Finalize the trailing block and stop the live region"""
+        if self._partial:
+            self._push_line(self._partial)
+            self._partial = ""
+        self._finalize()
+        if self._live is not None:
+            self._live.update(Text(""), refresh=True)
+            self._live.__exit__(None, None, None)
+            self._live = None
+
+    def _push_line(self, line: str) -> None:
+        if self._fence is None:
+            fence = match_fence(line)
+            if fence:
+                self._finalize()  # text before the fence is its own block
+                self._fence, self._lang = fence[0], parse_info(fence[1])[0]
+            elif not line.strip():
+                self._finalize()
+            else:
+                self._lines.append(line)
+        elif closes_fence(line, self._fence):
+            self._finalize()
+        else:
+            self._lines.append(line)
+
+    def _renderable(self, lines: List[str], in_code: bool, cursor: bool = False):
+        body = "\n".join(lines)
+        if in_code:
+            return Syntax(body + (CURSOR if cursor else ""), self._lang or "text",
+                          theme=self.code_theme, line_numbers=False)
+        if cursor:
+            return Text(body + CURSOR, style="white")
+        return Markdown(body, style="white")
+
+    def _finalize(self) -> None:
+        in_code = self._fence is not None
+        if self._lines and (in_code or any(l.strip() for l in self._lines)):
+            try:
+                renderable = self._renderable(self._lines, in_code)
+            except Exception as e:
+                logger.debug(f"Stream render error: {e}")
+                renderable = Text("\n".join(self._lines))
+            self._print(renderable)
+            self.blocks_rendered += 1
+        self._lines = []
+        self._fence, self._lang = None, ""
+
+    def _print(self, renderable) -> None:
+        if self._live is not None:
+            self._live.console.print(renderable)
+        else:
+            self.console.print(renderable)
+
+    def _frame(self) -> None:
+        if self._live is None:
+            return
+        now = time.monotonic()
+        if now - self._last_frame < self.min_interval:
+            return
+        self._last_frame = now
+        # Only what fits on screen is redrawn, however long the open block is
+        height = max(1, self.console.size.height - 2)
+        lines = self._lines[-(height - 1):] + [self._partial] if height > 1 else [self._partial]
+        self._live.update(self._renderable(lines, self._fence is not None, cursor=True), refresh=True)
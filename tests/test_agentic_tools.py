@@ -0,0 +1,298 @@
+"""
+Unit tests for planning, plan scheduling and tool-result caching in agentic mode
+
+Run with: pytest tests/test_agentic_tools.py -v
+"""
+
+import time
+import threading
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import agentic_tools
+from agentic_tools import (
+    AgenticExecutor,
+    EnhancedToolRegistry,
+    TaskPlanner,
+    ToolResultCache,
+    normalize_steps,
+    plan_tool,
+    step_dependencies,
+)
+from models.tool_calling import ToolCall
+
+READ_ONLY = EnhancedToolRegistry.READ_ONLY_TOOLS
+
+
+class FakeLLM:
+    def __init__(self, reply="[]"):
+        self.reply = reply
+
+    def chat(self, prompt):
+        return self.reply
+
+
+def make_executor(reply="[]"):
+    llm = FakeLLM(reply)
+    tools = EnhancedToolRegistry(require_confirmation=False)
+    return AgenticExecutor(llm, tools, TaskPlanner(llm))
+
+
+def step(n, tool, depends_on=None, **params):
+    s = {"step": n, "action": f"{tool} {n}", "tool": tool, "params": params}
+    if depends_on is not None:
+        s["depends_on"] = depends_on
+    return s
+
+
+class TestPlanDependencies:
+    """Tests for step normalization and effective dependencies"""
+
+    def test_missing_depends_on_defaults(self):
+        """Reads default to no dependencies, other tools to the previous step"""
+        steps = normalize_steps([step(1, "read_file"), step(2, "read_file"), step(3, "write_file")], READ_ONLY)
+        assert [s["depends_on"] for s in steps] == [[], [], [2]]
+
+    def test_forward_and_unknown_dependencies_dropped(self):
+        """Only earlier steps can be dependencies, so plans never cycle"""
+        steps = normalize_steps([step(1, "read_file", [2]), step(2, "read_file", [1, 9, "x"])], READ_ONLY)
+        assert [s["depends_on"] for s in steps] == [[], [1]]
+
+    def test_duplicate_ids_renumbered(self):
+        steps = normalize_steps([step(1, "read_file"), step(1, "list_dir")], READ_ONLY)
+        assert [s["step"] for s in steps] == [1, 2]
+
+    def test_writes_are_barriers(self):
+        """A write waits for everything before it; later reads wait for the write"""
+        steps = normalize_steps([step(1, "read_file"), step(2, "read_file", []), step(3, "write_file", []),
+                                 step(4, "read_file", [])], READ_ONLY)
+        deps = step_dependencies(steps, READ_ONLY)
+        assert deps[2] == set()
+        assert deps[3] == {1, 2}
+        assert deps[4] == {3}
+
+
+class TestScheduler:
+    """Tests for AgenticExecutor's DAG execution"""
+
+    def test_independent_reads_run_concurrently(self):
+        executor = make_executor()
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow_read(path):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.1)
+            with lock:
+                active[0] -= 1
+            return f"read {path}"
+
+        executor.tools.tools["read_file"] = slow_read
+        results = []
+        executor._run_steps([step(i, "read_file", path=f"f{i}") for i in range(1, 5)], results)
+
+        assert peak[0] > 1
+        assert results == ["read f1", "read f2", "read f3", "read f4"]
+        assert executor.planner.completed_steps and set(executor.planner.completed_steps) == {1, 2, 3, 4}
+
+    def test_reads_after_write_see_staged_edit(self, tmp_path):
+        """Parallel reads after an edit run once it is flushed to disk"""
+        executor = make_executor()
+        target = tmp_path / "a.txt"
+        plan = [step(1, "write_file", path=str(target), content="new"),
+                step(2, "read_file", path=str(target)),
+                step(3, "count_lines", path=str(tmp_path))]
+        executor.tools.begin_transaction()
+        results = []
+        executor._run_steps(plan, results)
+        executor.tools.commit_transaction()
+
+        assert results[0].startswith("✅ Written")
+        assert "new" in results[1]
+        assert executor.planner.step_status == {1: "done", 2: "done", 3: "done"}
+
+    def test_failed_step_marked(self, tmp_path):
+        executor = make_executor()
+        results = []
+        executor._run_steps([step(1, "read_file", path=str(tmp_path / "missing.py")),
+                             step(2, "no_such_tool")], results)
+        assert executor.planner.step_status == {1: "failed", 2: "failed"}
+        assert results[1].startswith("⚠️ Unknown tool")
+
+    def test_failed_plan_edits_rolled_back(self, tmp_path):
+        """A plan with a failed step should not leave its edits behind"""
+        target = tmp_path / "a.txt"
+        target.write_text("old")
+        reply = (f'[{{"step": 1, "action": "Write", "tool": "write_file", "params": {{"path": "{target}", "content": "new"}}}},'
+                 f' {{"step": 2, "action": "Read", "tool": "read_file", "params": {{"path": "{tmp_path / "missing.py"}"}}}}]')
+        executor = make_executor(reply)
+        executor.execute_task("edit", auto_confirm=True)
+
+        assert target.read_text() == "old"
+        assert executor.last_transaction is None
+
+    def test_rename_undone_by_rollback(self, tmp_path):
+        """Renames in a plan should be recorded so /rollback restores both paths"""
+        old, new = tmp_path / "old.py", tmp_path / "new.py"
+        old.write_text("x = 1\n")
+        reply = f'[{{"step": 1, "action": "Rename", "tool": "rename_file", "params": {{"old_path": "{old}", "new_path": "{new}"}}}}]'
+        executor = make_executor(reply)
+        executor.execute_task("rename", auto_confirm=True)
+        assert new.exists() and not old.exists()
+
+        executor.rollback_last_plan()
+        assert old.read_text() == "x = 1\n" and not new.exists()
+
+    def test_execute_task_uses_planned_dependencies(self, tmp_path):
+        (tmp_path / "a.py").write_text("a = 1\n")
+        (tmp_path / "b.py").write_text("b = 2\n")
+        reply = (f'[{{"step": 1, "action": "Read a", "tool": "read_file", "params": {{"path": "{tmp_path / "a.py"}"}}, "depends_on": []}},'
+                 f' {{"step": 2, "action": "Read b", "tool": "read_file", "params": {{"path": "{tmp_path / "b.py"}"}}, "depends_on": []}}]')
+        executor = make_executor(reply)
+        summary = executor.execute_task("read both", auto_confirm=True)
+        assert "a = 1" in summary and "b = 2" in summary
+        assert executor.planner.completed_steps
+
+
+class TestToolResultCache:
+    """Tests for memoized read-only tool results"""
+
+    def test_repeat_read_is_cached(self, tmp_path):
+        tools = EnhancedToolRegistry(require_confirmation=False)
+        target = tmp_path / "a.py"
+        target.write_text("x = 1\n")
+        first = tools.call_tool("read_file", path=str(target))
+        assert tools.call_tool("read_file", path=str(target)) == first
+        assert tools.cache.hits == 1
+
+    def test_external_change_invalidates(self, tmp_path):
+        """A file changed behind the registry's back is re-read (mtime/size differ)"""
+        tools = EnhancedToolRegistry(require_confirmation=False)
+        target = tmp_path / "a.py"
+        target.write_text("x = 1\n")
+        tools.call_tool("read_file", path=str(target))
+        target.write_text("x = 22\n")
+        assert "x = 22" in tools.call_tool("read_file", path=str(target))
+        assert tools.cache.hits == 0
+
+    def test_registry_writes_invalidate(self, tmp_path):
+        tools = EnhancedToolRegistry(require_confirmation=False)
+        target = tmp_path / "a.py"
+        target.write_text("x = 1\n")
+        tools.call_tool("read_file", path=str(target))
+        tools.call_tool("list_dir", path=str(tmp_path))
+        tools.call_tool("write_file", path=str(tmp_path / "b.py"), content="y")
+        # Same-size rewrite within one mtime tick would fool the stat check alone
+        tools.call_tool("edit_file", path=str(target), old_text="1", new_text="2")
+
+        assert "x = 2" in tools.call_tool("read_file", path=str(target))
+        assert "b.py" in tools.call_tool("list_dir", path=str(tmp_path))
+        assert tools.cache.hits == 0
+
+    def test_git_results_keyed_on_index(self, tmp_path):
+        git_dir = tmp_path / ".git"
+        git_dir.mkdir()
+        (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+        (git_dir / "index").write_bytes(b"v1")
+        cache = ToolResultCache(git_dir=str(git_dir))
+        fp = cache.fingerprint("git_status", {})
+        cache.put("git_status", {}, fp, "clean")
+        assert cache.get("git_status", {}, cache.fingerprint("git_status", {})) == "clean"
+
+        (git_dir / "index").write_bytes(b"v22")
+        assert cache.get("git_status", {}, cache.fingerprint("git_status", {})) is None
+
+    def test_errors_and_directory_counts_not_cached(self, tmp_path):
+        cache = ToolResultCache()
+        assert cache.fingerprint("count_lines", {"path": str(tmp_path)}) is None
+        assert cache.fingerprint("search_in_files", {"pattern": "x"}) is None
+        fp = cache.fingerprint("read_file", {"path": str(tmp_path)})
+        cache.put("read_file", {"path": str(tmp_path)}, fp, "❌ Read error")
+        assert cache.get("read_file", {"path": str(tmp_path)}, fp) is None
+
+    def test_plan_summary_reports_hits(self, tmp_path):
+        (tmp_path / "a.py").write_text("a = 1\n")
+        path = tmp_path / "a.py"
+        reply = (f'[{{"step": 1, "action": "Read a", "tool": "read_file", "params": {{"path": "{path}"}}}},'
+                 f' {{"step": 2, "action": "Read a again", "tool": "read_file", "params": {{"path": "{path}"}}, "depends_on": [1]}}]')
+        executor = make_executor(reply)
+        summary = executor.execute_task("read twice", auto_confirm=True)
+        assert "Reused 1 cached tool result" in summary
+
+
+class StructuredLLM(FakeLLM):
+    """Adapter with native tool calling; chat() must not be needed"""
+
+    def __init__(self, steps=None, error=None):
+        super().__init__("[]")
+        self.steps, self.error = steps, error
+        self.tools_seen = None
+        self.chat_calls = 0
+
+    def chat(self, prompt):
+        self.chat_calls += 1
+        return super().chat(prompt)
+
+    def chat_tools(self, prompt, tools):
+        self.tools_seen = tools
+        if self.error:
+            raise self.error
+        return [ToolCall("submit_plan", {"steps": self.steps})]
+
+
+class TestStructuredPlanning:
+    """Tests for planning through chat_tools"""
+
+    def test_plan_from_tool_call(self):
+        llm = StructuredLLM(steps=[step(1, "read_file", [], path="a.py"), step(2, "edit_file", [1], path="a.py")])
+        planner = TaskPlanner(llm, tool_names=["read_file", "edit_file"])
+        steps = planner.decompose_task("fix a.py")
+
+        assert [s["tool"] for s in steps] == ["read_file", "edit_file"]
+        assert llm.chat_calls == 0
+        enum = llm.tools_seen[0]["function"]["parameters"]["properties"]["steps"]["items"]["properties"]["tool"]["enum"]
+        assert enum == ["edit_file", "manual", "read_file"]
+
+    def test_falls_back_to_text_plan_once(self):
+        """A model without tool support is detected once, then planning uses plain chat"""
+        llm = StructuredLLM(error=NotImplementedError("no tool support"))
+        planner = TaskPlanner(llm)
+        planner.decompose_task("anything")
+        planner.decompose_task("anything")
+        assert planner.structured is False
+        assert llm.chat_calls == 2
+
+    def test_transient_error_keeps_structured_planning(self):
+        """A timeout falls back to a text plan this time only"""
+        llm = StructuredLLM(error=TimeoutError("read timed out"))
+        planner = TaskPlanner(llm)
+        planner.decompose_task("anything")
+        assert planner.structured is True
+        assert llm.chat_calls == 1
+
+    def test_repeated_failures_disable_structured_planning(self):
+        llm = StructuredLLM(error=TimeoutError("read timed out"))
+        planner = TaskPlanner(llm)
+        for _ in range(agentic_tools.MAX_STRUCTURED_FAILURES):
+            planner.decompose_task("anything")
+        assert planner.structured is False
+
+    def test_model_ignoring_tools_disables_structured_planning(self):
+        """A reply without a tool call should not cost an extra round-trip on every plan"""
+        llm = StructuredLLM()
+        llm.chat_tools = lambda prompt, tools: []
+        planner = TaskPlanner(llm)
+        planner.decompose_task("anything")
+        assert planner.structured is False
+
+    def test_plan_tool_without_names(self):
+        tool_field = plan_tool()["function"]["parameters"]["properties"]["steps"]["items"]["properties"]["tool"]
+        assert tool_field == {"type": "string"}
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
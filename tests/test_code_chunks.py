@@ -0,0 +1,104 @@
+"""
+Unit tests for AST-aware chunked fixing
+
+Run with: pytest tests/test_code_chunks.py -v
+"""
+
+import ast
+import pytest
+from pathlib import Path
+from unittest.mock import Mock
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cli
+from code_chunks import split_into_chunks, build_outline, fix_chunks, stitch_chunks
+
+
+def make_source(n_funcs: int = 12) -> str:
+    parts = ["import os\n\n"]
+    for i in range(n_funcs):
+        parts.append(f"# helper {i}\ndef func_{i}(x):\n    return x + {i}\n\n")
+    parts.append("class Big:\n    \"\"\"Doc\"\"\"\n")
+    for i in range(6):
+        parts.append(f"    def method_{i}(self):\n        return {i}\n\n")
+    return "".join(parts)
+
+
+class TestSplitIntoChunks:
+    """Tests for chunk boundaries"""
+
+    def test_chunks_cover_file_exactly(self):
+        """Stitching unchanged chunks should reproduce the source"""
+        source = make_source()
+        chunks = split_into_chunks(source, max_chars=150)
+
+        assert len(chunks) > 1
+        assert stitch_chunks(chunks, [None] * len(chunks)) == source
+
+    def test_boundaries_follow_definitions(self):
+        """Each chunk should start at a definition (or its leading comment)"""
+        chunks = split_into_chunks(make_source(), max_chars=150)
+
+        for chunk in chunks[1:]:
+            first = chunk.text.lstrip().splitlines()[0]
+            assert first.startswith(("# helper", "def ", "class ")), first
+
+    def test_oversized_class_split_into_methods(self):
+        """Should split a class larger than the budget along its methods"""
+        chunks = split_into_chunks(make_source(n_funcs=0), max_chars=80)
+        names = [n for chunk in chunks for n in chunk.names]
+
+        assert "Big.method_3" in names
+
+    def test_outline_lists_signatures(self):
+        """Outline should include imports and signatures, not bodies"""
+        outline = build_outline(make_source(n_funcs=2))
+
+        assert "import os" in outline
+        assert "def func_1(x)" in outline
+        assert "    def method_0(self)" in outline
+        assert "return" not in outline
+
+
+class TestChunkedFix:
+    """Tests for the parallel fix-and-stitch flow"""
+
+    def test_parallel_fix_preserves_order(self):
+        """Should stitch fixed chunks back in original order"""
+        source = make_source()
+        chunks = split_into_chunks(source, max_chars=150)
+
+        fixed = fix_chunks(chunks, lambda c: c.text.replace("return x +", "return x -"), max_workers=4)
+        result = stitch_chunks(chunks, fixed)
+
+        ast.parse(result)
+        assert result == source.replace("return x +", "return x -")
+
+    def test_fix_file_in_chunks_reindents_methods(self, monkeypatch):
+        """Should send dedented method chunks and restore indentation"""
+        source = make_source(n_funcs=0)
+        bot = Mock()
+        bot.n_ctx = None
+        bot.chat = Mock(side_effect=lambda prompt: cli.NO_CHANGES)
+        monkeypatch.setattr(cli, "bot", bot, raising=False)
+        monkeypatch.setattr(cli, "FIX_CHUNK_CHARS", 80)
+
+        result = cli._fix_file_in_chunks("big.py", source, "python", "", False, patch=True)
+
+        assert result == source
+        assert bot.chat.call_count > 1
+
+    def test_budget_follows_context_window(self, monkeypatch):
+        """Should size chunks from the adapter's n_ctx, falling back to FIX_CHUNK_CHARS"""
+        monkeypatch.setenv("OPENROUTER_CONTEXT", "32768")
+        monkeypatch.setenv("OPENROUTER_API_KEY", "key")
+        from models.openrouter import OpenRouterAdapter
+
+        assert cli._fix_char_budget(OpenRouterAdapter()) == 32768 * 3 // 2
+        assert cli._fix_char_budget(Mock(n_ctx=None)) == cli.FIX_CHUNK_CHARS
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
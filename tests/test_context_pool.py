@@ -0,0 +1,97 @@
+"""
+Unit tests for the local inference context pool
+
+Run with: pytest tests/test_context_pool.py -v
+"""
+
+import time
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_chunks import chunk_workers
+from models.context_pool import ContextPool
+
+
+def run_requests(pool, count, seconds=0.1):
+    """Issue count concurrent requests that each hold a context for `seconds`"""
+    def request(_):
+        with pool.lease() as context:
+            time.sleep(seconds)
+            return context
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        used = list(executor.map(request, range(count)))
+    return used, time.perf_counter() - start
+
+
+class TestContextPool:
+    """Tests for lazy growth, queuing and failure handling"""
+
+    def test_sequential_requests_reuse_primary(self):
+        factory_calls = []
+        pool = ContextPool(lambda: factory_calls.append(1) or object(), size=4, primary="primary")
+        for _ in range(3):
+            with pool.lease() as context:
+                assert context == "primary"
+        assert factory_calls == [] and pool.created == 1
+
+    def test_throughput_scales_with_contexts(self):
+        serial = ContextPool(object, size=1, primary=object())
+        _, serial_time = run_requests(serial, 4)
+        pooled = ContextPool(object, size=4, primary=object())
+        used, pooled_time = run_requests(pooled, 4)
+
+        assert pooled.created == 4 and len(set(map(id, used))) == 4
+        assert pooled_time < serial_time / 2
+        assert serial.waited == 3
+
+    def test_requests_queue_beyond_size(self):
+        pool = ContextPool(object, size=2, primary=object())
+        run_requests(pool, 5, seconds=0.05)
+        stats = pool.stats()
+        assert stats["contexts"] == 2 and stats["peak_in_use"] == 2
+        assert stats["served"] == 5 and stats["in_use"] == 0
+
+    def test_failed_growth_falls_back_to_waiting(self):
+        def factory():
+            raise MemoryError("no room for another KV cache")
+
+        pool = ContextPool(factory, size=3, primary="primary")
+        used, _ = run_requests(pool, 3, seconds=0.02)
+        assert used == ["primary"] * 3
+        assert pool.size == 1
+
+    def test_first_context_failure_raises(self):
+        pool = ContextPool(lambda: (_ for _ in ()).throw(RuntimeError("bad model")), size=2)
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+
+    def test_context_returned_on_error(self):
+        pool = ContextPool(object, size=1, primary="primary")
+        with pytest.raises(ValueError):
+            with pool.lease():
+                raise ValueError("inference failed")
+        assert pool.acquire() == "primary"
+
+
+class TestChunkWorkers:
+    """chunk_workers follows the adapter's concurrency limit"""
+
+    @pytest.mark.parametrize("attrs,expected", [
+        ({"supports_concurrency": False}, 1),
+        ({"supports_concurrency": True, "max_concurrency": 2}, 2),
+        ({}, 4),
+    ])
+    def test_limits(self, attrs, expected):
+        adapter = type("Adapter", (), attrs)()
+        assert chunk_workers(adapter) == expected
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,111 @@
+"""
+Unit tests for map-reduce repository documentation
+
+Run with: pytest tests/test_docgen.py -v
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from docgen import document_repo, SummaryCache, file_excerpt
+import docgen
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """Two packages with two files each"""
+    for pkg in ("api", "core"):
+        (tmp_path / pkg).mkdir()
+        for name in ("a.py", "b.py"):
+            (tmp_path / pkg / name).write_text(f"def {pkg}_{name[0]}():\n    return 1\n")
+    return tmp_path
+
+
+def fake_model(prompt: str) -> str:
+    if "Summarize the file" in prompt:
+        return "file summary: " + prompt.split("def ", 1)[1].split("(", 1)[0]
+    if "parts of the package" in prompt:
+        return "package summary"
+    return "repo summary"
+
+
+PATHS = ["api/a.py", "api/b.py", "core/a.py", "core/b.py"]
+
+
+class TestDocumentRepo:
+    """Tests for the map-reduce pipeline"""
+
+    def test_hierarchy_and_call_count(self, repo):
+        """Should summarize each file, each package, then the repo"""
+        doc = document_repo(str(repo), PATHS, fake_model, max_workers=4)
+
+        assert doc.model_calls == 4 + 2 + 1
+        assert doc.overview == "repo summary"
+        assert set(doc.packages) == {"api", "core"}
+        rendered = doc.render()
+        assert "## api" in rendered and "- `core/b.py`: file summary: core_b" in rendered
+
+    def test_rerun_only_touches_changed_files(self, repo, tmp_path_factory):
+        """Unchanged files and packages should come from the cache"""
+        cache_path = tmp_path_factory.mktemp("cache") / "doc_cache.json"
+        cache = SummaryCache(cache_path)
+        document_repo(str(repo), PATHS, fake_model, cache=cache)
+        cache.save()
+
+        (repo / "core" / "a.py").write_text("def changed():\n    return 2\n")
+        doc = document_repo(str(repo), PATHS, fake_model, cache=SummaryCache(cache_path))
+
+        # changed file and its package; the overview's inputs are unchanged
+        assert doc.model_calls == 2
+
+    def test_style_context_reaches_overview_only(self, repo, tmp_path):
+        """Past documentation should shape the overview without invalidating file summaries"""
+        prompts = []
+
+        def model(prompt):
+            prompts.append(prompt)
+            return fake_model(prompt)
+
+        cache = SummaryCache(tmp_path / "c.json")
+        document_repo(str(repo), PATHS, model, cache=cache, style_context="Use bullet points.")
+        assert [p for p in prompts if "Use bullet points." in p] == [prompts[-1]]
+        assert "parts of the repository" in prompts[-1]
+
+        prompts.clear()
+        document_repo(str(repo), PATHS, model, cache=cache, style_context="Use tables.")
+        assert len(prompts) == 1 and "Use tables." in prompts[0]
+
+    def test_errors_not_cached(self, repo, tmp_path):
+        """Replies flagged as errors should be retried next time"""
+        cache = SummaryCache(tmp_path / "c.json")
+        document_repo(str(repo), PATHS[:1], lambda p: "ERR", cache=cache, is_error=lambda r: r == "ERR")
+
+        assert cache.get(next(iter(cache._entries), "missing")) is None
+
+    def test_large_package_reduced_in_batches(self, repo, monkeypatch):
+        """Should reduce oversized packages in several prompts"""
+        monkeypatch.setattr(docgen, "MAX_REDUCE_CHARS", 40)
+        prompts = []
+
+        def model(prompt):
+            prompts.append(prompt)
+            return fake_model(prompt)
+
+        document_repo(str(repo), PATHS[:2], model, max_workers=1)
+
+        assert sum("parts of the package" in p for p in prompts) > 1
+
+    def test_long_file_sent_as_outline_and_head(self):
+        """Should bound the per-file excerpt"""
+        source = "".join(f"def f{i}():\n    return {i}\n\n" for i in range(500))
+        excerpt = file_excerpt("big.py", source, max_chars=1000)
+
+        assert "Outline of the whole file" in excerpt
+        assert len(excerpt) < 1200
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,201 @@
+"""
+Unit tests for the model download manager, against a local stand-in for the hub
+
+Run with: pytest tests/test_download.py -v
+"""
+
+import os
+import re
+import hashlib
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import download as download_module
+from models.download import DownloadError, DownloadManager
+
+REPO = "TheBloke/tiny-GGUF"
+FILE = "tiny.Q4_K_M.gguf"
+COMMIT = "c0ffee" * 6 + "abcd"
+CHUNK = 1024 * 1024  # DownloadManager's smallest range size
+
+
+class FakeHub:
+    """Serves one file the way the hub does: HEAD with LFS headers + redirect, ranged GETs"""
+
+    def __init__(self, content: bytes, ranges: bool = True, sha256: str = None, cdn_host: str = None):
+        self.content = content
+        self.cdn_host = cdn_host  # serve the LFS redirect from another host name
+        self.auth = []  # (method, Authorization header) per request
+        self.ranges = ranges
+        self.sha256 = sha256 or hashlib.sha256(content).hexdigest()
+        self.fail_offsets = set()  # range starts that always return 500
+        self.requests = []
+        self.lock = threading.Lock()
+        hub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                hub.auth.append(("HEAD", self.headers.get("Authorization")))
+                if self.path != f"/{REPO}/resolve/main/{FILE}":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(302)
+                port = hub.server.server_address[1]
+                self.send_header("Location", f"http://{hub.cdn_host}:{port}/cdn/blob" if hub.cdn_host else "/cdn/blob")
+                self.send_header("X-Linked-Etag", f'"{hub.sha256}"')
+                self.send_header("X-Linked-Size", str(len(hub.content)))
+                self.send_header("X-Repo-Commit", COMMIT)
+                self.end_headers()
+
+            def do_GET(self):
+                header = self.headers.get("Range")
+                with hub.lock:
+                    hub.requests.append(header)
+                    hub.auth.append(("GET", self.headers.get("Authorization")))
+                match = re.match(r"bytes=(\d+)-(\d+)", header or "")
+                if hub.ranges and match:
+                    begin, end = int(match.group(1)), int(match.group(2))
+                    if begin in hub.fail_offsets:
+                        self.send_response(500)
+                        self.end_headers()
+                        return
+                    body = hub.content[begin:end + 1]
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {begin}-{end}/{len(hub.content)}")
+                else:
+                    body = hub.content
+                    self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def data_requests(self):
+        return [r for r in self.requests if r != "bytes=0-0"]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def content():
+    return os.urandom(3 * CHUNK + 12345)
+
+
+@pytest.fixture
+def hub(content):
+    server = FakeHub(content)
+    yield server
+    server.close()
+
+
+@pytest.fixture(autouse=True)
+def no_retry_wait(monkeypatch):
+    monkeypatch.setattr(download_module, "RETRY_WAIT", 0)
+
+
+def manager(tmp_path, hub, **kwargs):
+    return DownloadManager(tmp_path / "models", endpoint=hub.url, chunk_size=CHUNK, show_progress=False, **kwargs)
+
+
+class TestMetadata:
+    """Tests for reading file metadata from the hub"""
+
+    def test_lfs_headers(self, tmp_path, hub, content):
+        remote = manager(tmp_path, hub).file_metadata(REPO, FILE)
+        assert remote.size == len(content)
+        assert remote.sha256 == hashlib.sha256(content).hexdigest()
+        assert remote.commit == COMMIT
+        assert remote.url == f"{hub.url}/cdn/blob"
+
+    def test_missing_file(self, tmp_path, hub):
+        with pytest.raises(DownloadError, match="404"):
+            manager(tmp_path, hub).file_metadata(REPO, "missing.gguf")
+
+
+class TestDownload:
+    """Tests for parallel, resumable, verified downloads"""
+
+    def test_parallel_ranges_into_hub_layout(self, tmp_path, hub, content):
+        result = manager(tmp_path, hub, workers=4).download(REPO, FILE)
+        path = Path(result.path)
+
+        assert path.read_bytes() == content
+        assert path == tmp_path / "models" / "models--TheBloke--tiny-GGUF" / "snapshots" / COMMIT / FILE
+        assert path.is_symlink() and Path(os.readlink(path)).name == result.sha256
+        assert (tmp_path / "models" / "models--TheBloke--tiny-GGUF" / "refs" / "main").read_text() == COMMIT
+        assert len(hub.data_requests()) == 4
+        assert result.downloaded == len(content) and result.resumed == 0
+        assert result.throughput > 0
+        assert "sha256 verified" in result.summary()
+
+    def test_cached_file_needs_no_network(self, tmp_path, hub):
+        first = manager(tmp_path, hub).download(REPO, FILE)
+        hub.requests.clear()
+        second = manager(tmp_path, hub).download(REPO, FILE)
+        assert second.cached and second.path == first.path
+        assert hub.requests == []
+
+    def test_resume_fetches_only_missing_ranges(self, tmp_path, hub, content):
+        hub.fail_offsets = {2 * CHUNK}
+        with pytest.raises(DownloadError):
+            manager(tmp_path, hub, workers=1).download(REPO, FILE)
+        assert not list((tmp_path / "models").rglob(FILE))
+
+        hub.fail_offsets = set()
+        hub.requests.clear()
+        result = manager(tmp_path, hub, workers=2).download(REPO, FILE)
+
+        assert Path(result.path).read_bytes() == content
+        assert result.resumed == 2 * CHUNK
+        assert sorted(hub.data_requests()) == [f"bytes={2 * CHUNK}-{3 * CHUNK - 1}",
+                                               f"bytes={3 * CHUNK}-{len(content) - 1}"]
+        assert result.resumed + result.downloaded == len(content)
+        assert not list((tmp_path / "models").rglob("*.part*"))
+
+    def test_checksum_mismatch_rejected(self, tmp_path, content):
+        hub = FakeHub(content, sha256="0" * 64)
+        try:
+            with pytest.raises(DownloadError, match="Checksum mismatch"):
+                manager(tmp_path, hub).download(REPO, FILE)
+        finally:
+            hub.close()
+        assert not list((tmp_path / "models").rglob(FILE))
+        assert not list((tmp_path / "models").rglob("*.part"))
+
+    def test_server_without_ranges(self, tmp_path, content):
+        hub = FakeHub(content, ranges=False)
+        try:
+            result = manager(tmp_path, hub).download(REPO, FILE)
+        finally:
+            hub.close()
+        assert Path(result.path).read_bytes() == content
+        assert hub.data_requests() == [None]
+
+    def test_token_not_sent_to_cdn(self, tmp_path, content):
+        """The hub token goes to the hub only, not to the host it redirects downloads to"""
+        hub = FakeHub(content, cdn_host="localhost")
+        try:
+            result = manager(tmp_path, hub, token="secret").download(REPO, FILE)
+        finally:
+            hub.close()
+        assert Path(result.path).read_bytes() == content
+        assert ("HEAD", "Bearer secret") in hub.auth
+        assert all(auth is None for method, auth in hub.auth if method == "GET")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,90 @@
+"""
+Unit tests for the fenced code block tokenizer
+
+Run with: pytest tests/test_fences.py -v
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fences import tokenize, code_blocks
+from cli import _split_generated_files
+
+
+MULTI_FILE = """Here is the app.
+
+**app.py**
+```python
+from util import add
+print(add(1, 2))
+```
+
+File: util.py
+```python
+def add(a, b):
+    return a + b
+```
+
+```js title="web/index.js"
+console.log("hi")
+```
+Done."""
+
+
+class TestTokenize:
+    """Tests for segment boundaries and metadata"""
+
+    def test_segments_cover_text(self):
+        """Segments should be in order with offsets into the original text"""
+        segments = tokenize(MULTI_FILE)
+
+        assert [s.kind for s in segments] == ["text", "code", "text", "code", "text", "code", "text"]
+        for seg in segments:
+            assert MULTI_FILE[seg.start:seg.end].find(seg.text.strip()) >= 0
+
+    def test_languages_and_filenames(self):
+        """Should read languages and filenames from info strings and label lines"""
+        blocks = code_blocks(MULTI_FILE)
+
+        assert [(b.lang, b.filename) for b in blocks] == [
+            ("python", "app.py"), ("python", "util.py"), ("js", "web/index.js")]
+
+    def test_unclosed_and_inline_closed_fences(self):
+        """Should handle a missing closing fence and 'code```' endings"""
+        unclosed = code_blocks("```python\nx = 1\n")
+        inline = code_blocks("```python\nx = 1```")
+
+        assert unclosed[0].text == "x = 1\n" and not unclosed[0].closed
+        assert inline[0].text.strip() == "x = 1" and inline[0].closed
+
+    def test_longer_fence_contains_shorter(self):
+        """A ```` block may contain ``` lines"""
+        blocks = code_blocks("````md\n```py\nx\n```\n````\n")
+
+        assert len(blocks) == 1
+        assert "```py" in blocks[0].text
+
+
+class TestMultiFileCreate:
+    """Tests for splitting a create answer into several files"""
+
+    def test_split_main_and_extra_files(self):
+        """The block labelled with the target is the main file"""
+        main, extras = _split_generated_files(MULTI_FILE, "proj/app.py")
+
+        assert main.startswith("from util import add")
+        assert sorted(seg.filename for seg in extras) == ["util.py", "web/index.js"]
+
+    def test_single_unlabelled_block(self):
+        """Plain single-block answers behave like extract_code"""
+        main, extras = _split_generated_files("```python\nx = 1\n```", "a.py")
+
+        assert main == "x = 1"
+        assert extras == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
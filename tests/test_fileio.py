@@ -0,0 +1,222 @@
+"""
+Unit tests for file I/O helpers
+
+Run with: pytest tests/test_fileio.py -v
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fileio import (
+    count_newlines,
+    count_file_lines,
+    count_lines_parallel,
+    iter_code_files,
+    summarize_by_language,
+    read_file_range,
+    get_line_index,
+    atomic_write,
+    EditTransaction,
+)
+import fileio
+
+
+class TestLineCounting:
+    """Tests for streaming line counting"""
+
+    def test_count_matches_readlines(self, tmp_path):
+        """Should agree with readlines(), including a trailing partial line"""
+        f = tmp_path / "a.txt"
+        f.write_text("one\ntwo\nthree")
+
+        assert count_newlines(str(f)) == 3
+        assert count_newlines(str(f), chunk_size=2) == 3
+
+    def test_empty_file(self, tmp_path):
+        """Should count zero lines in an empty file"""
+        f = tmp_path / "empty.py"
+        f.write_text("")
+
+        assert count_newlines(str(f)) == 0
+        assert count_file_lines(str(f)).lines == 0
+
+    def test_blank_and_comment_lines(self, tmp_path):
+        """Should classify blank and comment lines across chunk boundaries"""
+        f = tmp_path / "mod.py"
+        f.write_text("# header\n\nimport os\n    # indented\nx = 1\n")
+
+        stats = count_file_lines(str(f), chunk_size=3)
+
+        assert stats.language == "python"
+        assert stats.lines == 5
+        assert stats.blank == 1
+        assert stats.comment == 2
+        assert stats.code == 2
+
+    def test_unclassified_file_only_counted(self, tmp_path):
+        """Should count lines of files without comment markers, as count_newlines does"""
+        f = tmp_path / "server.log"
+        f.write_text("start\n\n# not a comment\nend")
+
+        stats = count_file_lines(str(f), chunk_size=3)
+
+        assert stats.language == "unknown"
+        assert stats.lines == 4
+        assert stats.blank == 0 and stats.comment == 0
+
+    def test_long_line_is_bounded(self, tmp_path):
+        """Should classify a single very long line without keeping it whole"""
+        f = tmp_path / "long.js"
+        f.write_text("// " + "x" * 50_000 + "\nlet a = 1;\n")
+
+        stats = count_file_lines(str(f), chunk_size=1024)
+
+        assert stats.lines == 2
+        assert stats.comment == 1
+
+    def test_parallel_summary_by_language(self, tmp_path):
+        """Should aggregate totals per language across files"""
+        (tmp_path / "a.py").write_text("a = 1\n\n")
+        (tmp_path / "b.py").write_text("b = 2\n")
+        (tmp_path / "c.js").write_text("// hi\nlet c;\n")
+        (tmp_path / "notes.md").write_text("ignored\n")
+
+        files = sorted(iter_code_files(str(tmp_path), {".py", ".js"}))
+        results = count_lines_parallel(files, max_workers=4)
+        totals = summarize_by_language(results)
+
+        assert len(results) == 3
+        assert totals["python"] == {"files": 2, "lines": 3, "blank": 1, "comment": 0, "code": 2}
+        assert totals["javascript"]["comment"] == 1
+
+
+class TestRangedRead:
+    """Tests for line- and byte-ranged reads"""
+
+    @pytest.fixture
+    def numbered_file(self, tmp_path, monkeypatch):
+        """1000-line file with a small index stride so lookups cross checkpoints"""
+        monkeypatch.setattr(fileio, "LINE_INDEX_STRIDE", 7)
+        f = tmp_path / "big.log"
+        f.write_text("".join(f"line {i}\n" for i in range(1, 1001)))
+        return f
+
+    def test_line_range(self, numbered_file):
+        """Should return exactly the requested lines with a continuation marker"""
+        page = read_file_range(str(numbered_file), start_line=500, max_lines=3)
+
+        assert page.text == "line 500\nline 501\nline 502\n"
+        assert page.total_lines == 1000
+        assert page.truncated
+        assert "start_line=503" in page.marker()
+
+    def test_byte_budget_stops_at_line_boundary(self, numbered_file):
+        """Should not split lines when the byte budget runs out"""
+        page = read_file_range(str(numbered_file), start_line=1, max_bytes=20)
+
+        assert page.text == "line 1\nline 2\n"
+        assert page.end_line == 2
+
+    def test_long_line_continues_by_offset(self, tmp_path):
+        """A line cut at the byte budget should be continued by offset, not by the next line"""
+        f = tmp_path / "wide.txt"
+        f.write_text("short\n" + "x" * 5000 + "\nlast\n")
+
+        page = read_file_range(str(f), start_line=2, max_bytes=1000)
+
+        assert page.text == "x" * 1000
+        assert page.partial_line and page.end_line == 2
+        assert f"offset={page.end_byte}" in page.marker()
+        assert "start_line" not in page.marker()
+        rest = read_file_range(str(f), offset=page.end_byte, max_bytes=10_000)
+        assert rest.text == "x" * 4000 + "\nlast\n"
+
+    def test_byte_offset_mode(self, numbered_file):
+        """Should read by byte offset when offset is given"""
+        page = read_file_range(str(numbered_file), offset=7, max_bytes=7)
+
+        assert page.text == "line 2\n"
+        assert "offset=14" in page.marker()
+
+    def test_mmap_path_matches(self, numbered_file, monkeypatch):
+        """Should give the same result when the file is memory-mapped"""
+        monkeypatch.setattr(fileio, "MMAP_THRESHOLD", 1)
+
+        page = read_file_range(str(numbered_file), start_line=999, max_lines=5)
+
+        assert page.text == "line 999\nline 1000\n"
+        assert page.marker().endswith("end of file reached]")
+
+    def test_whole_small_file_not_truncated(self, tmp_path):
+        """Should return small files whole with no marker"""
+        f = tmp_path / "small.txt"
+        f.write_text("a\nb")
+
+        page = read_file_range(str(f))
+
+        assert page.text == "a\nb"
+        assert page.marker() == ""
+
+    def test_index_cached_until_file_changes(self, numbered_file):
+        """Should reuse the line index until size or mtime changes"""
+        first = get_line_index(str(numbered_file))
+        assert get_line_index(str(numbered_file)) is first
+
+        with open(numbered_file, "a") as f:
+            f.write("line 1001\n")
+
+        assert get_line_index(str(numbered_file)).total_lines == 1001
+
+
+class TestAtomicEdits:
+    """Tests for atomic writes and edit transactions"""
+
+    def test_atomic_write_replaces_and_keeps_mode(self, tmp_path):
+        """Should replace contents without leaving temp files behind"""
+        f = tmp_path / "script.sh"
+        f.write_text("old")
+        f.chmod(0o755)
+
+        atomic_write(str(f), "new")
+
+        assert f.read_text() == "new"
+        assert f.stat().st_mode & 0o777 == 0o755
+        assert [p.name for p in tmp_path.iterdir()] == ["script.sh"]
+
+    def test_edits_batched_until_commit(self, tmp_path):
+        """Should apply several edits to one file with a single write on commit"""
+        f = tmp_path / "app.py"
+        f.write_text("a = 1\nb = 2\n")
+
+        txn = EditTransaction()
+        txn.stage(str(f), txn.read(str(f)).replace("a = 1", "a = 10"))
+        txn.stage(str(f), txn.read(str(f)).replace("b = 2", "b = 20"))
+
+        assert f.read_text() == "a = 1\nb = 2\n"  # nothing written yet
+        txn.commit()
+        assert f.read_text() == "a = 10\nb = 20\n"
+
+    def test_rollback_restores_and_removes_created(self, tmp_path):
+        """Should restore edited files and delete files the transaction created"""
+        existing = tmp_path / "keep.py"
+        existing.write_text("original")
+        created = tmp_path / "new.py"
+
+        txn = EditTransaction()
+        txn.stage(str(existing), "changed")
+        txn.stage(str(created), "brand new")
+        txn.commit()
+        assert created.exists()
+
+        restored = txn.rollback()
+
+        assert existing.read_text() == "original"
+        assert not created.exists()
+        assert len(restored) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
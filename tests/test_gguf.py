@@ -0,0 +1,160 @@
+"""
+Unit tests for the GGUF header reader
+
+Run with: pytest tests/test_gguf.py -v
+"""
+
+import struct
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.gguf import GGUFError, format_parameters, read_gguf, try_read_gguf
+from models.manifest import ModelManifest
+
+
+def gguf_string(text: str) -> bytes:
+    data = text.encode()
+    return struct.pack("<Q", len(data)) + data
+
+
+def gguf_value(value) -> bytes:
+    """Type id + payload for the value kinds used in real headers"""
+    if isinstance(value, bool):
+        return struct.pack("<I?", 7, value)
+    if isinstance(value, int):
+        return struct.pack("<II", 4, value)
+    if isinstance(value, float):
+        return struct.pack("<If", 6, value)
+    if isinstance(value, str):
+        return struct.pack("<I", 8) + gguf_string(value)
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return struct.pack("<IIQ", 9, 8, len(value)) + b"".join(gguf_string(v) for v in value)
+    if isinstance(value, list):
+        return struct.pack("<IIQ", 9, 5, len(value)) + struct.pack(f"<{len(value)}i", *value)
+    raise TypeError(value)
+
+
+def write_gguf(path: Path, metadata: dict, tensors: dict, version: int = 3, weights: bytes = b"\0" * 64) -> Path:
+    """A GGUF file with the given metadata and tensor shapes (tensor data is filler)"""
+    out = b"GGUF" + struct.pack("<IQQ", version, len(tensors), len(metadata))
+    for key, value in metadata.items():
+        out += gguf_string(key) + gguf_value(value)
+    for name, shape in tensors.items():
+        out += gguf_string(name) + struct.pack("<I", len(shape)) + struct.pack(f"<{len(shape)}Q", *shape)
+        out += struct.pack("<IQ", 12, 0)
+    path.write_bytes(out + weights)
+    return path
+
+
+LLAMA_METADATA = {
+    "general.architecture": "llama",
+    "general.name": "codellama_7b",
+    "general.file_type": 15,
+    "llama.context_length": 16384,
+    "llama.embedding_length": 4096,
+    "llama.rope.freq_base": 1000000.0,
+    "tokenizer.ggml.tokens": [f"tok{i}" for i in range(1000)],
+    "tokenizer.ggml.token_type": [1] * 100,
+    "tokenizer.ggml.add_bos_token": True,
+}
+LLAMA_TENSORS = {"token_embd.weight": (4096, 32016), "blk.0.attn_q.weight": (4096, 4096), "output_norm.weight": (4096,)}
+
+
+class TestReadGGUF:
+    """Tests for parsing headers"""
+
+    def test_reads_metadata_and_parameters(self, tmp_path):
+        info = read_gguf(str(write_gguf(tmp_path / "m.gguf", LLAMA_METADATA, LLAMA_TENSORS)))
+        assert info.version == 3
+        assert info.architecture == "llama"
+        assert info.name == "codellama_7b"
+        assert info.context_length == 16384
+        assert info.quantization == "Q4_K_M"
+        assert info.metadata["llama.rope.freq_base"] == 1000000.0
+        assert info.metadata["tokenizer.ggml.add_bos_token"] is True
+        assert info.tensor_count == 3
+        assert info.parameters == 4096 * 32016 + 4096 * 4096 + 4096
+
+    def test_long_arrays_skipped(self, tmp_path):
+        """Vocabularies are stepped over but not kept; later keys still parse"""
+        info = read_gguf(str(write_gguf(tmp_path / "m.gguf", LLAMA_METADATA, LLAMA_TENSORS)))
+        assert info.metadata["tokenizer.ggml.tokens"] == {"type": 8, "length": 1000}
+        assert info.metadata["tokenizer.ggml.token_type"] == {"type": 5, "length": 100}
+
+    def test_missing_keys(self, tmp_path):
+        info = read_gguf(str(write_gguf(tmp_path / "m.gguf", {"general.architecture": "phi2"}, {})))
+        assert info.context_length is None
+        assert info.quantization is None
+        assert info.parameters == 0
+
+    def test_not_gguf(self, tmp_path):
+        path = tmp_path / "m.gguf"
+        path.write_bytes(b"GGML" + b"\0" * 100)
+        with pytest.raises(GGUFError, match="not a GGUF"):
+            read_gguf(str(path))
+        assert try_read_gguf(str(path)) is None
+
+    def test_truncated_header(self, tmp_path):
+        path = write_gguf(tmp_path / "m.gguf", LLAMA_METADATA, LLAMA_TENSORS, weights=b"")
+        path.write_bytes(path.read_bytes()[:200])
+        with pytest.raises(GGUFError, match="Truncated"):
+            read_gguf(str(path))
+
+    def test_corrupt_counts_rejected(self, tmp_path):
+        """Counts a corrupt header claims should fail cleanly, not exhaust memory"""
+        path = write_gguf(tmp_path / "m.gguf", LLAMA_METADATA, LLAMA_TENSORS)
+        data = bytearray(path.read_bytes())
+        data[8:16] = struct.pack("<Q", 2**60)  # tensor_count
+        path.write_bytes(bytes(data))
+        with pytest.raises(GGUFError, match="more than the file holds"):
+            read_gguf(str(path))
+
+        dims = write_gguf(tmp_path / "dims.gguf", {}, {"t": (2, 2)})
+        data = bytearray(dims.read_bytes())
+        offset = 4 + 4 + 8 + 8 + 8 + 1  # header, name length, name "t"
+        data[offset:offset + 4] = struct.pack("<I", 2**31)
+        dims.write_bytes(bytes(data))
+        with pytest.raises(GGUFError, match="dimensions"):
+            read_gguf(str(dims))
+        assert try_read_gguf(str(dims)) is None
+
+    def test_empty_and_v1_rejected(self, tmp_path):
+        empty = tmp_path / "empty.gguf"
+        empty.write_bytes(b"")
+        assert try_read_gguf(str(empty)) is None
+        with pytest.raises(GGUFError, match="version 1"):
+            read_gguf(str(write_gguf(tmp_path / "v1.gguf", {}, {}, version=1)))
+
+    @pytest.mark.parametrize("count,label", [(0, "-"), (2_779_683_840, "2.8B"), (1_100_048_384, "1.1B"),
+                                             (124_000_000, "124.0M")])
+    def test_format_parameters(self, count, label):
+        assert format_parameters(count) == label
+
+
+class TestManifestMetadata:
+    """Tests for GGUF fields in the cached-model manifest"""
+
+    def test_entries_carry_header_fields(self, tmp_path):
+        cache = tmp_path / "models"
+        cache.mkdir()
+        write_gguf(cache / "codellama-7b.Q5_K_M.gguf", LLAMA_METADATA, LLAMA_TENSORS)
+        model = ModelManifest(cache).models()[0]
+        assert model["architecture"] == "llama"
+        assert model["context_length"] == 16384
+        assert model["quant"] == "Q4_K_M"  # header wins over the file name
+        assert model["parameters"] == 4096 * 32016 + 4096 * 4096 + 4096
+
+    def test_unreadable_file_falls_back_to_name(self, tmp_path):
+        cache = tmp_path / "models"
+        cache.mkdir()
+        (cache / "broken.Q8_0.gguf").write_bytes(b"junk")
+        model = ModelManifest(cache).models()[0]
+        assert model["quant"] == "Q8_0"
+        assert model["context_length"] is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,121 @@
+"""
+Unit tests for the built-in decoding grammars
+
+The regular grammars are translated to Python regexes here, so what they
+accept can be checked without llama.cpp.
+
+Run with: pytest tests/test_grammars.py -v
+"""
+
+import re
+import codecs
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cli
+from models.grammars import BUILTIN_GRAMMARS, grammar_text, line_not_starting_with
+from patching import apply_patch
+
+_TOKEN = re.compile(r'\s*("(?:\\.|[^"\\])*"|\[(?:\\.|[^\]\\])*\]|[A-Za-z_][\w-]*|[()|?*+])')
+
+
+def rules_of(grammar):
+    rules = {}
+    for line in grammar.strip().splitlines():
+        name, _, body = line.partition("::=")
+        rules[name.strip()] = body.strip()
+    return rules
+
+
+def to_regex(grammar):
+    """Translate a non-recursive GBNF grammar into an equivalent regex"""
+    rules = rules_of(grammar)
+
+    def expand(body):
+        out = []
+        for token in _TOKEN.findall(body):
+            if token.startswith('"'):
+                out.append(re.escape(codecs.decode(token[1:-1], "unicode_escape")))
+            elif token.startswith("["):
+                out.append(token)
+            elif token == "(":
+                out.append("(?:")
+            elif token in ")|?*+":
+                out.append(token)
+            else:
+                out.append(f"(?:{expand(rules[token])})")
+        return "".join(out)
+
+    return re.compile(expand(rules["root"]), re.DOTALL)
+
+
+def accepts(name, text):
+    return to_regex(BUILTIN_GRAMMARS[name]).fullmatch(text) is not None
+
+
+class TestGrammars:
+    """Tests for what each built-in grammar accepts"""
+
+    def test_every_rule_is_defined(self):
+        for name, grammar in BUILTIN_GRAMMARS.items():
+            rules = rules_of(grammar)
+            for body in rules.values():
+                for token in _TOKEN.findall(body):
+                    if re.fullmatch(r"[A-Za-z_][\w-]*", token):
+                        assert token in rules, f"{name}: undefined rule {token}"
+
+    def test_code_is_one_block_without_prose(self):
+        assert accepts("code", "```python\nx = 1\nprint(`x`)\n\n```")
+        assert accepts("code", "```\n``\n```\n")
+        assert not accepts("code", "Here is the fix:\n```python\nx = 1\n```")
+        assert not accepts("code", "```python\nx = 1\n```\nHope this helps!")
+
+    def test_search_replace_applies(self):
+        patch = "<<<<<<< SEARCH\nx = 1\n=======\nx = 2\n>>>>>>> REPLACE\n"
+        assert accepts("search_replace", patch)
+        assert accepts("search_replace", "NO_CHANGES")
+        assert apply_patch("x = 1\n", patch) == "x = 2\n"
+        assert not accepts("search_replace", "Sure! " + patch)
+        assert not accepts("search_replace", "<<<<<<< SEARCH\nx = 1\n>>>>>>> REPLACE\n")
+
+    def test_diff_applies(self):
+        diff = "@@ -1,2 +1,2 @@\n a = 0\n-x = 1\n+x = 2\n"
+        assert accepts("diff", diff)
+        assert apply_patch("a = 0\nx = 1\n", diff) == "a = 0\nx = 2\n"
+        assert not accepts("diff", "The diff is:\n" + diff)
+
+    def test_line_not_starting_with(self):
+        line = re.compile("(?:" + to_regex(f"root ::= {line_not_starting_with('==')}").pattern + ")")
+        assert line.fullmatch("=x\n") and line.fullmatch("=\n") and line.fullmatch("\n")
+        assert not line.fullmatch("==\n") and not line.fullmatch("===x\n")
+
+    def test_raw_gbnf_passes_through(self):
+        assert grammar_text("code") == BUILTIN_GRAMMARS["code"]
+        assert grammar_text('root ::= "yes"') == 'root ::= "yes"'
+
+
+class TestAskModelGrammar:
+    """_ask_model forwards grammars only to adapters that support them"""
+
+    class Adapter:
+        def __init__(self, supports):
+            self.supports_grammar = supports
+            self.kwargs = None
+
+        def chat(self, prompt, **kwargs):
+            self.kwargs = kwargs
+            return "```\nx\n```"
+
+    @pytest.mark.parametrize("supports,expected", [(True, {"grammar": "code"}), (False, {})])
+    def test_forwarding(self, monkeypatch, supports, expected):
+        adapter = self.Adapter(supports)
+        monkeypatch.setattr(cli, "bot", adapter, raising=False)
+        cli._ask_model("fix", grammar="code")
+        assert adapter.kwargs == expected
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,96 @@
+"""
+Unit tests for the append-only chat history store
+
+Run with: pytest tests/test_history.py -v
+"""
+
+import json
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import history
+from history import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(tmp_path / "history.jsonl")
+
+
+class TestHistoryStore:
+    """Tests for appends, tail loading and compaction"""
+
+    def test_append_persists_each_turn(self, store):
+        """Turns should be on disk immediately, one line each"""
+        store.append("You", "hi")
+        store.append("Blonde", "hello\nthere")
+
+        assert len(store.path.read_text().splitlines()) == 2
+        assert HistoryStore(store.path).tail(10) == [("You", "hi"), ("Blonde", "hello\nthere")]
+
+    def test_tail_reads_only_the_end(self, store, monkeypatch):
+        """tail() should return the newest turns across block boundaries"""
+        monkeypatch.setattr(history, "_TAIL_BLOCK", 64)
+        for i in range(500):
+            store.append("You", f"message {i}")
+
+        assert store.tail(3) == [("You", "message 497"), ("You", "message 498"), ("You", "message 499")]
+        assert len(store.tail(1000)) == 500
+
+    def test_torn_line_skipped(self, store):
+        """A partially written last line (crash) should be ignored"""
+        store.append("You", "kept")
+        with open(store.path, "ab") as f:
+            f.write(b'{"sender": "Blonde", "mess')
+
+        assert store.tail(5) == [("You", "kept")]
+        assert list(store.iter_turns()) == [("You", "kept")]
+
+    def test_compact_archives_older_turns(self, store):
+        """compact() should keep the newest turns and move the rest, timestamps intact, to the archive"""
+        for i in range(100):
+            store.append("You", f"m{i}")
+        before = store.size()
+        stamps = [json.loads(line)["ts"] for line in store.path.read_text().splitlines()]
+
+        assert store.compact(keep=10) == 90
+        assert store.size() < before
+        assert [m for _, m in store.tail(1000)] == [f"m{i}" for i in range(90, 100)]
+        assert [m for _, m in store.iter_turns()] == [f"m{i}" for i in range(100)]
+        lines = store.archive_path.read_text().splitlines() + store.path.read_text().splitlines()
+        assert [json.loads(line)["ts"] for line in lines] == stamps
+
+    def test_maybe_compact_only_past_limit(self, store):
+        for i in range(20):
+            store.append("You", f"m{i}")
+
+        assert store.maybe_compact(max_bytes=10**6, keep=5) == 0
+        assert store.maybe_compact(max_bytes=100, keep=5) == 15
+        store.clear()
+        assert list(store.iter_turns()) == [] and not store.archive_path.exists()
+
+    def test_pages_and_export(self, store, tmp_path):
+        """Should page lazily and export Markdown"""
+        for i in range(25):
+            store.append("You", f"m{i}")
+
+        assert [len(p) for p in store.pages(10)] == [10, 10, 5]
+        out = tmp_path / "chat.md"
+        assert store.export_markdown(str(out)) == 25
+        assert "**You:** m24" in out.read_text()
+
+    def test_legacy_json_migrated(self, tmp_path):
+        """Old single-array histories should be converted once"""
+        legacy = tmp_path / "history.json"
+        legacy.write_text(json.dumps([["You", "old"], ["Blonde", "reply"]]))
+        store = HistoryStore(tmp_path / "history.jsonl", legacy_path=legacy)
+
+        assert store.tail(10) == [("You", "old"), ("Blonde", "reply")]
+        assert not legacy.exists()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
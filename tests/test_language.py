@@ -0,0 +1,65 @@
+"""
+Unit tests for cached language detection
+
+Run with: pytest tests/test_language.py -v
+"""
+
+import os
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import language
+from language import detect_language, language_from_shebang
+
+
+class TestDetectLanguage:
+    """Tests for the name/shebang/content cascade"""
+
+    def test_extension_needs_no_disk_access(self):
+        """Known extensions should resolve even for missing files"""
+        assert detect_language("does/not/exist.tsx") == "typescript"
+        assert detect_language("Dockerfile") == "docker"
+
+    @pytest.mark.parametrize("line,expected", [
+        (b"#!/usr/bin/env python3\n", "python"),
+        (b"#!/usr/bin/env -S node --no-warnings\n", "javascript"),
+        (b"#!/bin/bash -e\n", "bash"),
+        (b"#!/usr/bin/weird\n", None),
+    ])
+    def test_shebang(self, line, expected):
+        """Should read the interpreter from #! lines"""
+        assert language_from_shebang(line) == expected
+
+    def test_content_heuristics(self, tmp_path):
+        """Extensionless files should be classified from their contents"""
+        script = tmp_path / "tool"
+        script.write_text("import os\n\ndef main():\n    pass\n")
+        header = tmp_path / "vec"
+        header.write_text("#include <vector>\ntemplate <typename T> T id(T x) { return x; }\n")
+
+        assert detect_language(str(script)) == "python"
+        assert detect_language(str(header)) == "cpp"
+
+    def test_memoized_until_file_changes(self, tmp_path, monkeypatch):
+        """Should sniff once per mtime/size and re-sniff after edits"""
+        path = tmp_path / "run"
+        path.write_text("#!/bin/sh\necho hi\n")
+        calls = []
+        original = language.language_from_shebang
+        monkeypatch.setattr(language, "language_from_shebang", lambda head: calls.append(1) or original(head))
+
+        assert detect_language(str(path)) == "bash"
+        assert detect_language(str(path)) == "bash"
+        assert len(calls) == 1
+
+        path.write_text("#!/usr/bin/env ruby\nputs 1\n")
+        os.utime(path, ns=(0, 10**9))
+        assert detect_language(str(path)) == "ruby"
+        assert len(calls) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,95 @@
+"""
+Unit tests for LocalAdapter's constrained generation, against a fake llama_cpp
+
+Run with: pytest tests/test_local_adapter.py -v
+"""
+
+import sys
+import types
+import importlib
+import threading
+import pytest
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class FakeLlama:
+    """Returns canned completions and records the arguments of each call"""
+
+    def __init__(self, finish_reason="stop"):
+        self.finish_reason = finish_reason
+        self.calls = []
+
+    def tokenize(self, data: bytes):
+        return data.split()
+
+    def __call__(self, prompt, **kwargs):
+        self.calls.append(kwargs)
+        return {"choices": [{"text": "```python\nx = 1\n```", "finish_reason": self.finish_reason}]}
+
+
+class FakeGrammar:
+    @classmethod
+    def from_string(cls, text, verbose=False):
+        return cls()
+
+    from_json_schema = from_string
+
+
+class FakePool:
+    def __init__(self, llm):
+        self.llm = llm
+
+    @contextmanager
+    def lease(self):
+        yield self.llm
+
+
+@pytest.fixture
+def local(monkeypatch):
+    """models.local imported against a llama_cpp stand-in"""
+    llama_cpp = types.ModuleType("llama_cpp")
+    llama_cpp.Llama, llama_cpp.LlamaGrammar = FakeLlama, FakeGrammar
+    monkeypatch.setitem(sys.modules, "llama_cpp", llama_cpp)
+    monkeypatch.delitem(sys.modules, "models.local", raising=False)
+    module = importlib.import_module("models.local")
+    yield module
+    sys.modules.pop("models.local", None)
+
+
+def adapter(local, llm, n_ctx=100):
+    """A LocalAdapter around llm, without downloading or loading a model"""
+    instance = local.LocalAdapter.__new__(local.LocalAdapter)
+    instance.debug, instance.n_ctx, instance.pool = False, n_ctx, FakePool(llm)
+    instance._grammars, instance._grammar_lock = {}, threading.Lock()
+    return instance
+
+
+class TestConstrainedChat:
+    """Tests for grammar-constrained generation limits"""
+
+    def test_output_bounded_by_remaining_context(self, local):
+        llm = FakeLlama()
+        reply = adapter(local, llm, n_ctx=100).chat("fix this file please", grammar="code")
+
+        assert reply.startswith("```python")
+        assert llm.calls[0]["max_tokens"] == 100 - 4
+        assert llm.calls[0]["temperature"] == 0
+
+    def test_cut_off_output_not_retried(self, local):
+        llm = FakeLlama(finish_reason="length")
+        with pytest.raises(ValueError, match="cut off"):
+            adapter(local, llm).chat("fix", grammar="code")
+        assert len(llm.calls) == 1
+
+    def test_prompt_filling_context_rejected(self, local):
+        llm = FakeLlama()
+        with pytest.raises(ValueError, match="whole context"):
+            adapter(local, llm, n_ctx=3).chat("one two three four", json_schema={"type": "object"})
+        assert llm.calls == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,145 @@
+"""
+Unit tests for the cached-model manifest
+
+Run with: pytest tests/test_manifest.py -v
+"""
+
+import os
+import hashlib
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import manifest as manifest_module
+from models.manifest import ModelManifest, quantization, repo_from_path
+
+
+def add_hf_model(cache: Path, repo: str, filename: str, content: bytes = b"GGUF") -> Path:
+    """Lay out a model the way huggingface_hub caches it: snapshot link -> sha256-named blob"""
+    repo_dir = cache / ("models--" + repo.replace("/", "--"))
+    sha = hashlib.sha256(content).hexdigest()
+    (repo_dir / "blobs").mkdir(parents=True, exist_ok=True)
+    (repo_dir / "blobs" / sha).write_bytes(content)
+    snapshot = repo_dir / "snapshots" / "abc123"
+    snapshot.mkdir(parents=True, exist_ok=True)
+    link = snapshot / filename
+    link.symlink_to(Path("..") / ".." / "blobs" / sha)
+    return link
+
+
+@pytest.fixture
+def cache(tmp_path):
+    path = tmp_path / "models"
+    path.mkdir()
+    return path
+
+
+class TestParsing:
+    """Tests for names derived from cache paths"""
+
+    @pytest.mark.parametrize("filename,quant", [
+        ("codellama-7b.Q4_K_M.gguf", "Q4_K_M"),
+        ("phi-2.Q8_0.gguf", "Q8_0"),
+        ("model-f16.gguf", "F16"),
+        ("tinyllama.IQ3_XS.gguf", "IQ3_XS"),
+        ("custom.gguf", None),
+    ])
+    def test_quantization(self, filename, quant):
+        assert quantization(filename) == quant
+
+    def test_repo_from_path(self, cache):
+        path = cache / "models--TheBloke--phi-2-GGUF" / "snapshots" / "x" / "phi-2.Q4_K_M.gguf"
+        assert repo_from_path(path) == "TheBloke/phi-2-GGUF"
+        assert repo_from_path(cache / "loose.gguf") == "Unknown"
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+class TestModelManifest:
+    """Tests for listing cached models through the manifest"""
+
+    def test_lists_models_with_blob_sha(self, cache):
+        add_hf_model(cache, "TheBloke/phi-2-GGUF", "phi-2.Q4_K_M.gguf", b"weights")
+        models = ModelManifest(cache).models()
+        assert len(models) == 1
+        model = models[0]
+        assert model["repo"] == "TheBloke/phi-2-GGUF"
+        assert model["quant"] == "Q4_K_M"
+        assert model["size_bytes"] == len(b"weights")
+        assert model["sha256"] == hashlib.sha256(b"weights").hexdigest()
+
+    def test_unchanged_cache_is_not_walked(self, cache, monkeypatch):
+        add_hf_model(cache, "TheBloke/phi-2-GGUF", "phi-2.Q4_K_M.gguf")
+        ModelManifest(cache).models()
+
+        def fail(*args):
+            raise AssertionError("cache walked again")
+
+        monkeypatch.setattr(manifest_module, "_walk", fail)
+        reopened = ModelManifest(cache)
+        assert [m["file"] for m in reopened.models()] == ["phi-2.Q4_K_M.gguf"]
+        assert reopened.rescans == 0
+
+    def test_new_model_triggers_rescan(self, cache):
+        add_hf_model(cache, "TheBloke/phi-2-GGUF", "phi-2.Q4_K_M.gguf")
+        ModelManifest(cache).models()
+        add_hf_model(cache, "TheBloke/phi-2-GGUF", "phi-2.Q8_0.gguf", b"other")
+        add_hf_model(cache, "TheBloke/Mistral-7B-GGUF", "mistral.Q4_K_M.gguf", b"third")
+
+        manifest = ModelManifest(cache)
+        assert {m["file"] for m in manifest.models()} == {"phi-2.Q4_K_M.gguf", "phi-2.Q8_0.gguf", "mistral.Q4_K_M.gguf"}
+        assert manifest.rescans == 1
+
+    def test_removed_model_dropped(self, cache):
+        link = add_hf_model(cache, "TheBloke/phi-2-GGUF", "phi-2.Q4_K_M.gguf")
+        ModelManifest(cache).models()
+        link.unlink()
+        assert ModelManifest(cache).models() == []
+
+    def test_blobs_not_listed(self, cache):
+        """Blob files are never walked, only snapshot entries"""
+        add_hf_model(cache, "TheBloke/phi-2-GGUF", "phi-2.Q4_K_M.gguf")
+        manifest = ModelManifest(cache)
+        manifest.models()
+        assert not any(Path(path).name == "blobs" for path in manifest._data["dirs"])
+
+    def test_record_keeps_given_sha_and_repo(self, cache):
+        loose = cache / "my-model.Q5_K_M.gguf"
+        loose.write_bytes(b"local")
+        manifest = ModelManifest(cache)
+        entry = manifest.record(str(loose), repo="me/my-model", sha256="f" * 64)
+        assert entry["sha256"] == "f" * 64
+
+        model = ModelManifest(cache).models()[0]
+        assert (model["repo"], model["sha256"], model["quant"]) == ("me/my-model", "f" * 64, "Q5_K_M")
+
+    def test_record_hashes_plain_files_once(self, cache, monkeypatch):
+        loose = cache / "plain.gguf"
+        loose.write_bytes(b"plain")
+        manifest = ModelManifest(cache)
+        assert manifest.record(str(loose))["sha256"] == hashlib.sha256(b"plain").hexdigest()
+
+        monkeypatch.setattr(manifest_module, "file_sha256", lambda path: pytest.fail("hashed again"))
+        assert manifest.record(str(loose))["sha256"] == hashlib.sha256(b"plain").hexdigest()
+
+    def test_corrupt_manifest_rebuilt(self, cache):
+        add_hf_model(cache, "TheBloke/phi-2-GGUF", "phi-2.Q4_K_M.gguf")
+        manifest = ModelManifest(cache)
+        manifest.path.write_text("{not json")
+        assert len(ModelManifest(cache).models()) == 1
+
+    def test_find_cached_models_uses_manifest(self, cache, monkeypatch):
+        import model_selector
+
+        add_hf_model(cache, "TheBloke/phi-2-GGUF", "phi-2.Q4_K_M.gguf")
+        monkeypatch.setattr(model_selector, "get_cache_dir", lambda: cache)
+        found = model_selector.find_cached_models()
+        assert found[0]["file"] == "phi-2.Q4_K_M.gguf"
+        assert found[0]["path"].endswith("phi-2.Q4_K_M.gguf")
+        assert found[0]["size"].endswith("MB")
+        assert (cache.parent / "models.manifest.json").exists()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
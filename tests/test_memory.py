@@ -4,6 +4,7 @@ Unit tests for Memory Management System
 Run with: pytest tests/test_memory.py -v
 """
 
+import threading
 import pytest
 import json
 from pathlib import Path
@@ -12,7 +13,7 @@ import sys
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from memory import MemoryManager
+from memory import MemoryManager, ConversationBuffer
 
 
 class TestMemoryManager:
@@ -182,5 +183,169 @@ def temp_memory_manager(tmp_path, monkeypatch):
     return MemoryManager(user_id="test", enable_vector_store=False)
 
 
+class TestSessionPersistence:
+    """Tests for debounced, atomic session writes"""
+
+    def test_bulk_changes_coalesced(self, tmp_path, monkeypatch):
+        """Many mutations should produce one write after flush"""
+        monkeypatch.setattr(Path, "home", lambda: tmp_path)
+        import memory
+        writes = []
+        real_write = memory.atomic_write
+        monkeypatch.setattr(memory, "atomic_write", lambda path, data: writes.append(path) or real_write(path, data))
+        monkeypatch.setattr(memory, "SESSION_SAVE_DELAY", 60)
+
+        mem = MemoryManager(user_id="bulk", enable_vector_store=False)
+        for i in range(50):
+            mem.add_task(f"task {i}")
+            mem.set_context_variable(f"k{i}", "v")
+        assert writes == []
+
+        mem.flush()
+        assert len(writes) == 1
+        reloaded = MemoryManager(user_id="bulk", enable_vector_store=False)
+        assert len(reloaded.session["goals"]) == 50
+
+    def test_debounce_timer_writes(self, tmp_path, monkeypatch):
+        """Pending changes should be written by the timer without an explicit flush"""
+        monkeypatch.setattr(Path, "home", lambda: tmp_path)
+        import memory
+        monkeypatch.setattr(memory, "SESSION_SAVE_DELAY", 0.05)
+
+        mem = MemoryManager(user_id="timer", enable_vector_store=False)
+        mem.set_context_variable("lang", "python")
+        timer = mem._save_timer
+        if timer is not None:
+            timer.join(timeout=5)
+
+        assert json.loads(mem.session_file.read_text())["context_variables"] == {"lang": "python"}
+
+    def test_exit_flush_does_not_keep_managers_alive(self, tmp_path, monkeypatch):
+        """One exit hook flushes live managers; dropped managers can be collected"""
+        monkeypatch.setattr(Path, "home", lambda: tmp_path)
+        import gc
+        import weakref
+        import memory
+        monkeypatch.setattr(memory, "SESSION_SAVE_DELAY", 60)
+
+        mem = MemoryManager(user_id="exit", enable_vector_store=False)
+        mem.set_context_variable("lang", "python")
+        memory._flush_all()
+        assert json.loads(mem.session_file.read_text())["context_variables"] == {"lang": "python"}
+
+        ref = weakref.ref(mem)
+        del mem
+        gc.collect()
+        assert ref() is None
+
+
+class TestConversationBuffer:
+    """Tests for the rolling conversation buffer"""
+
+    def make(self, tmp_path=None, **kwargs):
+        calls = []
+
+        def summarize(prompt):
+            calls.append(prompt)
+            return f"summary #{len(calls)}"
+
+        buf = ConversationBuffer(summarize, max_recent_chars=100, background=False,
+                                 state_file=(tmp_path / "s.json") if tmp_path else None, **kwargs)
+        return buf, calls
+
+    def test_recent_turns_verbatim(self):
+        """Short conversations should be sent as-is without summarizing"""
+        buf, calls = self.make()
+        buf.add("You", "hello")
+        buf.add("Blonde", "hi there")
+
+        prompt = buf.build_prompt("next?")
+        assert "You: hello\nBlonde: hi there" in prompt
+        assert prompt.endswith("Current query: next?")
+        assert calls == []
+
+    def test_old_turns_folded_into_summary(self):
+        """Evicted turns should be summarized and the prompt stays bounded"""
+        buf, calls = self.make()
+        for i in range(50):
+            buf.add("You", f"message number {i:02d} " + "x" * 20)
+
+        prompt = buf.build_prompt("q")
+        assert "Summary of earlier conversation:" in prompt
+        assert "message number 00" not in prompt
+        assert "message number 49" in prompt
+        assert len(prompt) < 100 + 1500 + 200
+
+    def test_state_resumed_across_sessions(self, tmp_path):
+        """A new session continues from the saved summary without summarizing old turns again"""
+        first, first_calls = self.make(tmp_path)
+        for i in range(20):
+            first.add("You", f"turn {i} " + "y" * 30)
+
+        second, second_calls = self.make(tmp_path)
+        assert second.restore()
+        assert second_calls == []
+        assert second.summary == first.summary
+        assert second.build_prompt("q") == first.build_prompt("q")
+
+        second.add("You", "turn 20 " + "y" * 30)
+        assert len(second_calls) == 1  # only the newly evicted turn is folded
+        assert "turn 20" not in second_calls[0]
+
+    def test_restore_without_state(self, tmp_path):
+        buf, _ = self.make(tmp_path)
+        assert not buf.restore()
+        (tmp_path / "s.json").write_text("{not json")
+        assert not buf.restore()
+
+    def test_clear_discards_inflight_fold(self, tmp_path):
+        """A fold running during clear() must not write its summary back"""
+        started, release = threading.Event(), threading.Event()
+
+        def summarize(prompt):
+            started.set()
+            release.wait(5)
+            return "stale summary"
+
+        buf = ConversationBuffer(summarize, max_recent_chars=30, background=True, state_file=tmp_path / "s.json")
+        buf.add("You", "a" * 20)
+        buf.add("You", "b" * 20)
+        assert started.wait(5)
+        buf.clear()
+        release.set()
+        buf.wait(timeout=5)
+
+        assert buf.summary == ""
+        assert buf.build_prompt("q") == "q"
+        reloaded = ConversationBuffer(summarize, state_file=tmp_path / "s.json")
+        assert reloaded.restore() and reloaded.summary == ""
+        buf.close()
+
+    def test_failed_summary_keeps_turns(self):
+        """Error replies should not replace the summary or drop turns"""
+        replies = ["ERR"]
+        prompts = []
+        buf = ConversationBuffer(lambda p: prompts.append(p) or replies.pop(0), max_recent_chars=30,
+                                 background=False, is_error=lambda r: r == "ERR")
+        buf.add("You", "a" * 20)
+        buf.add("You", "b" * 20)
+        assert buf.summary == ""
+
+        replies.extend(["ok", "ok"])
+        buf.add("You", "c" * 20)  # next eviction retries the failed batch first
+        assert "a" * 20 in prompts[1]
+        assert buf.summary == "ok"
+
+    def test_background_folding(self):
+        """Should summarize on a worker thread when allowed"""
+        buf = ConversationBuffer(lambda p: "bg summary", max_recent_chars=30, background=True)
+        for i in range(5):
+            buf.add("You", f"{i}" * 20)
+        buf.wait(timeout=5)
+
+        assert buf.summary == "bg summary"
+        buf.close()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
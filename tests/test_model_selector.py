@@ -0,0 +1,125 @@
+"""
+Unit tests for model warm-up and background adapter loading
+
+Run with: pytest tests/test_model_selector.py -v
+"""
+
+import threading
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import model_selector
+from model_selector import BackgroundAdapter, WarmUp, start_warmup, warmup_mode
+
+
+class TestWarmUp:
+    """Tests for prefetching model files into the page cache"""
+
+    def test_scan_reads_whole_file(self, tmp_path):
+        path = tmp_path / "model.gguf"
+        path.write_bytes(b"x" * 100_000)
+        warmup = WarmUp(str(path), "scan").start()
+        assert warmup.wait(5)
+        assert warmup.error is None
+        assert warmup.bytes_read == 100_000
+        assert "prefetched" in warmup.summary()
+
+    def test_advise_does_not_read(self, tmp_path):
+        path = tmp_path / "model.gguf"
+        path.write_bytes(b"x" * 1000)
+        warmup = WarmUp(str(path), "advise").start()
+        assert warmup.wait(5)
+        assert warmup.bytes_read == 0
+        assert warmup.error is None
+
+    def test_scan_downgraded_when_file_exceeds_memory(self, tmp_path, monkeypatch):
+        path = tmp_path / "model.gguf"
+        path.write_bytes(b"x" * 1000)
+        monkeypatch.setattr(model_selector, "_available_memory", lambda: 10)
+        warmup = WarmUp(str(path), "scan").start()
+        warmup.wait(5)
+        assert warmup.mode == "advise"
+        assert warmup.bytes_read == 0
+
+    def test_missing_file_reports_error(self, tmp_path):
+        warmup = WarmUp(str(tmp_path / "missing.gguf")).start()
+        warmup.wait(5)
+        assert isinstance(warmup.error, OSError)
+        assert warmup.summary().startswith("warm-up failed")
+
+    def test_skipped_per_model(self, tmp_path, monkeypatch):
+        """A model configured with warmup "off" is not prefetched; BLONDE_WARMUP overrides"""
+        path = tmp_path / "model.gguf"
+        path.write_bytes(b"x")
+        monkeypatch.setitem(model_selector.AVAILABLE_MODELS, "99",
+                            {"name": "Test", "repo": "r", "file": "model.gguf", "warmup": "off"})
+        monkeypatch.delenv("BLONDE_WARMUP", raising=False)
+        assert warmup_mode("model.gguf") == "off"
+        assert start_warmup("model.gguf", str(path)) is None
+
+        monkeypatch.setenv("BLONDE_WARMUP", "advise")
+        warmup = start_warmup("model.gguf", str(path))
+        assert warmup is not None and warmup.mode == "advise"
+        warmup.wait(5)
+
+    def test_unknown_model_defaults_to_scan(self, monkeypatch):
+        monkeypatch.delenv("BLONDE_WARMUP", raising=False)
+        assert warmup_mode("unknown.gguf") == "scan"
+
+
+class FakeAdapter:
+    supports_grammar = True
+
+    def chat(self, prompt):
+        return f"echo {prompt}"
+
+
+class TestBackgroundAdapter:
+    """Tests for loading an adapter off the main thread"""
+
+    def test_attribute_access_waits_for_load(self):
+        release = threading.Event()
+
+        def factory():
+            release.wait(5)
+            return FakeAdapter()
+
+        bot = BackgroundAdapter(factory)
+        assert not bot.ready
+        assert bot.status() == "Model loading..."
+        release.set()
+        assert bot.chat("hi") == "echo hi"
+        assert bot.ready
+        assert bot.status().startswith("Model ready in")
+
+    def test_load_error_reraised(self):
+        def factory():
+            raise RuntimeError("no weights")
+
+        bot = BackgroundAdapter(factory)
+        with pytest.raises(RuntimeError, match="no weights"):
+            bot.wait()
+        with pytest.raises(RuntimeError):
+            bot.chat("hi")
+
+    def test_capability_checks_see_real_adapter(self):
+        bot = BackgroundAdapter(FakeAdapter)
+        assert getattr(bot, "supports_grammar", False) is True
+        assert not callable(getattr(bot, "chat_tools", None))
+        assert isinstance(bot.wait(), FakeAdapter)
+
+    def test_status_includes_warmup(self, tmp_path):
+        path = tmp_path / "model.gguf"
+        path.write_bytes(b"x" * 10)
+        warmup = WarmUp(str(path)).start()
+        warmup.wait(5)
+        bot = BackgroundAdapter(FakeAdapter, warmup=warmup)
+        bot.wait()
+        assert "prefetched" in bot.status()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
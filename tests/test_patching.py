@@ -0,0 +1,106 @@
+"""
+Unit tests for patch parsing and fuzzy hunk application
+
+Run with: pytest tests/test_patching.py -v
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from patching import apply_patch, parse_unified_diff, PatchError, NO_CHANGES
+
+
+ORIGINAL = """import os
+
+def divide(a, b):
+    return a / b
+
+def greet(name):
+    print("hi " + name)
+"""
+
+
+class TestSearchReplace:
+    """Tests for SEARCH/REPLACE blocks"""
+
+    def test_apply_single_block(self):
+        """Should replace only the matched region"""
+        response = """Here is the fix:
+<<<<<<< SEARCH
+def divide(a, b):
+    return a / b
+=======
+def divide(a, b):
+    if b == 0:
+        raise ValueError("b must be non-zero")
+    return a / b
+>>>>>>> REPLACE
+"""
+        result = apply_patch(ORIGINAL, response)
+
+        assert 'raise ValueError("b must be non-zero")' in result
+        assert result.endswith('print("hi " + name)\n')
+
+    def test_whitespace_tolerant_match(self):
+        """Should match when the model mangles indentation"""
+        response = """<<<<<<< SEARCH
+def greet(name):
+  print("hi " + name)
+=======
+def greet(name):
+    print(f"hi {name}")
+>>>>>>> REPLACE"""
+        result = apply_patch(ORIGINAL, response)
+
+        assert 'print(f"hi {name}")' in result
+
+    def test_unmatched_block_raises(self):
+        """Should refuse hunks that match nowhere"""
+        response = """<<<<<<< SEARCH
+def something_else():
+    pass
+=======
+def something_else():
+    return 1
+>>>>>>> REPLACE"""
+        with pytest.raises(PatchError):
+            apply_patch(ORIGINAL, response)
+
+    def test_no_changes(self):
+        """Should return the original when the model reports no changes"""
+        assert apply_patch(ORIGINAL, NO_CHANGES) == ORIGINAL
+
+
+class TestUnifiedDiff:
+    """Tests for unified diff hunks"""
+
+    def test_apply_hunk_with_stale_line_numbers(self):
+        """Should locate hunks by content even if line numbers are off"""
+        response = """```diff
+--- a/calc.py
++++ b/calc.py
+@@ -40,2 +40,3 @@
+ def greet(name):
+-    print("hi " + name)
++    if name:
++        print("hi " + name)
+```"""
+        result = apply_patch(ORIGINAL, response)
+
+        assert "    if name:\n        print(\"hi \" + name)" in result
+        assert "return a / b" in result
+
+    def test_pure_insertion(self):
+        """Should insert after the given line for -N,0 hunks"""
+        hunks = parse_unified_diff("@@ -1,0 +2,1 @@\n+import sys\n")
+
+        assert hunks[0].old == []
+        result = apply_patch(ORIGINAL, "@@ -1,0 +2,1 @@\n+import sys\n")
+        assert result.splitlines()[:2] == ["import os", "import sys"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
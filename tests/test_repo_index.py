@@ -0,0 +1,115 @@
+"""
+Unit tests for repository indexing and context selection
+
+Run with: pytest tests/test_repo_index.py -v
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cli import scan_repo
+from repo_index import RepoContextSelector, SymbolTable, select_repo_context, module_name
+
+
+@pytest.fixture
+def sample_repo(tmp_path):
+    """Small package where service.py imports db.py and calls its functions"""
+    pkg = tmp_path / "app"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("")
+    (pkg / "db.py").write_text("def connect():\n    pass\n\ndef query(sql):\n    pass\n")
+    (pkg / "service.py").write_text(
+        "from .db import connect, query\n\n"
+        "class Users:\n    def all(self):\n        return self.load()\n\n    def load(self):\n        return get_users()\n\n"
+        "def get_users():\n    connect()\n    return query('x')\n"
+    )
+    (pkg / "unrelated.py").write_text("def paint():\n    pass\n")
+    (tmp_path / "README.md").write_text("# readme\n")
+    return tmp_path
+
+
+class TestRepoContextSelector:
+    """Tests for relevance ranking"""
+
+    def test_module_name(self):
+        """Should convert paths to dotted module names"""
+        assert module_name("app/db.py") == "app.db"
+        assert module_name("app/__init__.py") == "app"
+
+    def test_relative_imports_resolved(self, sample_repo):
+        """scan_repo should record resolved module names for relative imports"""
+        repo_map = scan_repo(str(sample_repo))
+        modules = repo_map[str(Path("app/service.py"))]["modules"]
+
+        assert "app.db.connect" in modules
+
+    def test_imported_and_called_file_ranks_first(self, sample_repo):
+        """Files linked by imports and calls should outrank unrelated ones"""
+        repo_map = scan_repo(str(sample_repo))
+        ranking = RepoContextSelector(repo_map).rank(str(sample_repo / "app" / "service.py"))
+        paths = [p for p, _ in ranking]
+
+        assert paths[0] == str(Path("app/db.py"))
+        assert str(Path("app/unrelated.py")) not in paths[:1]
+
+    def test_context_respects_budget(self, sample_repo):
+        """Should never exceed the character budget derived from max_tokens"""
+        repo_map = scan_repo(str(sample_repo))
+        context = select_repo_context(repo_map, str(sample_repo / "app" / "service.py"), max_tokens=20)
+
+        assert len(context) <= 20 * 4 + 100  # target line is always included
+        assert context.startswith(f"- {Path('app/service.py')}")
+
+    def test_selector_built_once_per_scan(self, sample_repo):
+        """Should reuse the selector for the same repo map object"""
+        repo_map = scan_repo(str(sample_repo))
+
+        assert RepoContextSelector.for_repo_map(repo_map) is RepoContextSelector.for_repo_map(repo_map)
+
+    def test_empty_map(self):
+        """Should return empty context without a repo map"""
+        assert select_repo_context(None, "x.py") == ""
+
+
+
+class TestSymbolTable:
+    """Tests for the resolved cross-file call graph"""
+
+    def test_definitions_have_line_spans(self, sample_repo):
+        """Should record qualified names, kinds and spans"""
+        table = SymbolTable(scan_repo(str(sample_repo)))
+        symbol = table.symbol("app.service.Users.all")
+
+        assert symbol.kind == "method"
+        assert symbol.path == str(Path("app/service.py"))
+        assert (symbol.start_line, symbol.end_line) == (4, 5)
+        assert table.symbol_at(str(Path("app/service.py")), 5).qualname == "app.service.Users.all"
+
+    def test_imported_calls_resolved_both_ways(self, sample_repo):
+        """Calls through relative imports should resolve, with reverse edges"""
+        table = SymbolTable(scan_repo(str(sample_repo)))
+
+        assert set(table.callees("app.service.get_users")) == {"app.db.connect", "app.db.query"}
+        assert table.callers("app.db.query") == ["app.service.get_users"]
+
+    def test_self_and_forward_references(self, sample_repo):
+        """self.method() and calls to later definitions should resolve"""
+        table = SymbolTable(scan_repo(str(sample_repo)))
+
+        assert table.callees("app.service.Users.all") == ["app.service.Users.load"]
+        assert table.callees("app.service.Users.load") == ["app.service.get_users"]
+
+    def test_unresolved_calls_kept_external(self, sample_repo):
+        """Calls outside the repo should not create edges"""
+        (sample_repo / "app" / "util.py").write_text("import os\n\ndef here():\n    return os.getcwd()\n")
+        table = SymbolTable(scan_repo(str(sample_repo)))
+
+        assert table.callees("app.util.here") == []
+        assert "os.getcwd" in table.external["app.util.here"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
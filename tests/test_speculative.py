@@ -0,0 +1,185 @@
+"""
+Unit tests for speculative decoding configuration and benchmarking
+
+Run with: pytest tests/test_speculative.py -v
+"""
+
+import types
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from model_selector import AVAILABLE_MODELS
+from models.speculative import (
+    CountingDraft,
+    DraftLlama,
+    SpeculativeConfig,
+    SpeculativeStats,
+    benchmark,
+    build_draft_model,
+    speculative_config,
+    speculative_enabled,
+)
+
+
+class FakeLlama:
+    """Emits 20 tokens; with a drafter, asks it for drafts of 4 and accepts 3 of each"""
+
+    def __init__(self):
+        self.draft_model = None
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+    def __call__(self, prompt, max_tokens, temperature):
+        tokens = 0
+        while tokens < 20:
+            if self.draft_model is not None:
+                self.draft_model([1, 2, 3])
+                tokens += 4  # 3 accepted drafts + 1 sampled
+            else:
+                tokens += 1
+        return {"usage": {"completion_tokens": tokens}}
+
+
+class TestSpeculativeConfig:
+    """Tests for per-model speculative settings"""
+
+    def test_models_with_drafts_are_configured(self):
+        deepseek = next(m for m in AVAILABLE_MODELS.values() if m["name"].startswith("DeepSeek"))
+        config = speculative_config(deepseek["repo"], deepseek["file"])
+        assert config.mode == "draft"
+        assert config.draft_file.endswith(".gguf")
+
+    def test_lookup_by_file_for_cached_models(self):
+        """Cached models may only know their file name"""
+        codellama = AVAILABLE_MODELS["1"]
+        assert speculative_config("Unknown", codellama["file"]).mode == "prompt_lookup"
+
+    def test_unconfigured_or_unknown_model(self):
+        phi = next(m for m in AVAILABLE_MODELS.values() if m["name"] == "Phi-2")
+        assert speculative_config(phi["repo"], phi["file"]) is None
+        assert speculative_config("someone/model", "model.gguf") is None
+
+    def test_from_dict_defaults(self):
+        config = SpeculativeConfig.from_dict({})
+        assert config.mode == "prompt_lookup" and config.num_pred_tokens > 0
+
+
+class TestSpeculativeStats:
+    """Tests for acceptance accounting"""
+
+    def test_counting_draft(self):
+        counter = CountingDraft(lambda ids: [7, 8, 9])
+        counter([1])
+        counter([1, 2])
+        assert (counter.calls, counter.proposed) == (2, 6)
+        counter.reset()
+        assert (counter.calls, counter.proposed) == (0, 0)
+
+    def test_acceptance_rate(self):
+        # 5 rounds of 4 proposals emitted 20 tokens: 15 were accepted drafts
+        stats = SpeculativeStats(tokens=20, seconds=2.0, draft_calls=5, proposed=20)
+        assert stats.accepted == 15
+        assert stats.acceptance_rate == 0.75
+        assert stats.tokens_per_sec == 10.0
+        assert SpeculativeStats(tokens=5, seconds=1.0).acceptance_rate == 0.0
+
+    def test_benchmark_restores_drafter(self):
+        llm = FakeLlama()
+        original = object()
+        llm.draft_model = original
+        results = benchmark(llm, lambda ids: [0, 0, 0, 0], ["a", "b"], max_tokens=20)
+        assert results["acceptance_rate"] == pytest.approx(0.75)
+        assert llm.draft_model is original
+        assert llm.resets == 4  # every timed run starts from a cold KV cache
+
+
+class FakePromptLookup:
+    def __init__(self, num_pred_tokens):
+        self.num_pred_tokens = num_pred_tokens
+
+
+class FakeDraftLlama:
+    """Stands in for llama_cpp.Llama as a draft model"""
+    vocab = 32000
+    fail = False
+
+    def __init__(self, model_path, **kwargs):
+        if FakeDraftLlama.fail:
+            raise RuntimeError("out of memory")
+        self.model_path = model_path
+
+    def n_vocab(self):
+        return FakeDraftLlama.vocab
+
+    def generate(self, tokens, top_k, temp):
+        yield from range(100, 200)
+
+
+class FakeTarget:
+    def n_ctx(self):
+        return 4096
+
+    def n_vocab(self):
+        return 32000
+
+
+@pytest.fixture
+def fake_llama_cpp(monkeypatch):
+    """llama_cpp with just the pieces build_draft_model touches"""
+    llama_cpp = types.ModuleType("llama_cpp")
+    llama_cpp.Llama = FakeDraftLlama
+    speculative = types.ModuleType("llama_cpp.llama_speculative")
+    speculative.LlamaPromptLookupDecoding = FakePromptLookup
+    monkeypatch.setitem(sys.modules, "llama_cpp", llama_cpp)
+    monkeypatch.setitem(sys.modules, "llama_cpp.llama_speculative", speculative)
+    monkeypatch.setattr(FakeDraftLlama, "vocab", 32000)
+    monkeypatch.setattr(FakeDraftLlama, "fail", False)
+    downloads = []
+    return lambda repo, file: downloads.append((repo, file)) or f"/cache/{file}"
+
+
+DRAFT = SpeculativeConfig(mode="draft", num_pred_tokens=5, draft_repo="r/draft", draft_file="draft.gguf")
+
+
+class TestBuildDraftModel:
+    """Tests for choosing and validating the drafter"""
+
+    def test_prompt_lookup(self, fake_llama_cpp):
+        drafter = build_draft_model(SpeculativeConfig(num_pred_tokens=7), FakeTarget(), fake_llama_cpp)
+        assert isinstance(drafter, FakePromptLookup) and drafter.num_pred_tokens == 7
+
+    def test_draft_model_loaded(self, fake_llama_cpp):
+        drafter = build_draft_model(DRAFT, FakeTarget(), fake_llama_cpp)
+        assert isinstance(drafter, DraftLlama)
+        assert drafter.llm.model_path == "/cache/draft.gguf"
+
+    def test_vocab_mismatch_falls_back(self, fake_llama_cpp, monkeypatch):
+        monkeypatch.setattr(FakeDraftLlama, "vocab", 51200)
+        assert isinstance(build_draft_model(DRAFT, FakeTarget(), fake_llama_cpp), FakePromptLookup)
+
+    def test_load_failure_falls_back(self, fake_llama_cpp, monkeypatch):
+        monkeypatch.setattr(FakeDraftLlama, "fail", True)
+        assert isinstance(build_draft_model(DRAFT, FakeTarget(), fake_llama_cpp), FakePromptLookup)
+
+    def test_draft_llama_proposes_greedy_tokens(self):
+        pytest.importorskip("numpy")
+        drafter = DraftLlama(FakeDraftLlama("/x"), num_pred_tokens=4)
+        assert list(drafter([1, 2, 3])) == [100, 101, 102, 103]
+
+    @pytest.mark.parametrize("value,enabled", [(None, False), ("", False), ("0", False), ("1", True),
+                                               ("true", True), ("ON", True)])
+    def test_opt_in(self, monkeypatch, value, enabled):
+        if value is None:
+            monkeypatch.delenv("BLONDE_SPECULATIVE", raising=False)
+        else:
+            monkeypatch.setenv("BLONDE_SPECULATIVE", value)
+        assert speculative_enabled() is enabled
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
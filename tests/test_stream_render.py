@@ -0,0 +1,80 @@
+"""
+Unit tests for incremental streamed Markdown rendering
+
+Run with: pytest tests/test_stream_render.py -v
+"""
+
+import io
+import time
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rich.console import Console
+
+import stream_render
+from stream_render import StreamRenderer
+
+
+def make_console() -> Console:
+    return Console(file=io.StringIO(), width=100, height=30, force_terminal=False, color_system=None)
+
+
+def stream(text: str, chunk_size: int = 3, **kwargs):
+    console = make_console()
+    with StreamRenderer(console, **kwargs) as renderer:
+        for i in range(0, len(text), chunk_size):
+            renderer.feed(text[i:i + chunk_size])
+    return renderer, console.file.getvalue()
+
+
+class TestStreamRenderer:
+    """Tests for block finalization and output"""
+
+    def test_blocks_rendered_once(self):
+        """Paragraphs and code fences should each be finalized once"""
+        text = "Intro paragraph.\n\n```python\ndef f():\n    return 1\n```\nClosing words."
+        renderer, output = stream(text)
+
+        assert renderer.blocks_rendered == 3
+        assert renderer.buffer == text
+        assert output.count("def f():") == 1
+        assert "Closing words." in output
+
+    def test_fence_without_blank_line(self):
+        """Text directly before a fence should become its own block"""
+        renderer, output = stream("Here:\n```\nx = 1\n```\n")
+
+        assert renderer.blocks_rendered == 2
+        assert "```" not in output
+
+    def test_unclosed_fence_flushed_on_close(self):
+        """An unterminated code block should still be printed"""
+        renderer, output = stream("```js\nconsole.log(1)\n")
+
+        assert "console.log(1)" in output
+
+    def test_frames_throttled(self, monkeypatch):
+        """Live updates should not exceed one per frame interval"""
+        frames = []
+        monkeypatch.setattr(stream_render.time, "monotonic", lambda: 100.0)
+        monkeypatch.setattr(StreamRenderer, "_renderable",
+                            lambda self, lines, in_code, cursor=False: frames.append(cursor) or "x")
+        stream("word " * 300)
+
+        assert frames.count(True) == 1
+
+    def test_long_answer_scales_linearly(self):
+        """A 10k-line code block should stream quickly"""
+        text = "```python\n" + "".join(f"x_{i} = {i}\n" for i in range(10_000)) + "```\n"
+        start = time.perf_counter()
+        renderer, _ = stream(text, chunk_size=64, max_fps=1000)
+
+        assert renderer.blocks_rendered == 1
+        assert time.perf_counter() - start < 10
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,113 @@
+"""
+Unit tests for structured tool calling
+
+Run with: pytest tests/test_tool_calling.py -v
+"""
+
+import json
+import pytest
+import requests
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.tool_calling import (
+    NoToolCallError,
+    ToolCall,
+    function_tool,
+    is_unsupported_error,
+    parse_tool_call_json,
+    parse_tool_calls,
+    tool_call_schema,
+    tool_choice,
+)
+
+READ = function_tool("read_file", "Read a file", {
+    "type": "object", "properties": {"path": {"type": "string"}}, "required": ["path"],
+})
+LIST = function_tool("list_dir", "List a directory", {"type": "object", "properties": {}})
+
+
+class TestToolCalling:
+    """Tests for tool definitions and parsing model replies"""
+
+    def test_parse_openai_message(self):
+        message = {"role": "assistant", "content": None, "tool_calls": [
+            {"id": "call_1", "type": "function",
+             "function": {"name": "read_file", "arguments": '{"path": "a.py"}'}},
+        ]}
+        assert parse_tool_calls(message) == [ToolCall("read_file", {"path": "a.py"}, "call_1")]
+
+    def test_parse_rejects_text_reply(self):
+        with pytest.raises(NoToolCallError, match="did not call"):
+            parse_tool_calls({"role": "assistant", "content": "I would read a.py"})
+
+    def test_parse_rejects_bad_arguments(self):
+        message = {"tool_calls": [{"function": {"name": "read_file", "arguments": "{path: a.py"}}]}
+        with pytest.raises(ValueError, match="Invalid arguments"):
+            parse_tool_calls(message)
+
+    def test_single_tool_is_forced(self):
+        assert tool_choice([READ]) == {"type": "function", "function": {"name": "read_file"}}
+        assert tool_choice([READ, LIST]) == "auto"
+
+    def test_call_schema(self):
+        single = tool_call_schema([READ])
+        assert single["properties"]["name"] == {"const": "read_file"}
+        assert single["properties"]["arguments"]["required"] == ["path"]
+        assert len(tool_call_schema([READ, LIST])["anyOf"]) == 2
+
+    @pytest.mark.parametrize("status,unsupported", [(400, True), (404, True), (429, False), (500, False)])
+    def test_unsupported_error_by_status(self, status, unsupported):
+        error = requests.HTTPError(response=requests.Response())
+        error.response.status_code = status
+        assert is_unsupported_error(error) is unsupported
+
+    def test_unsupported_error_kinds(self):
+        assert is_unsupported_error(NotImplementedError())
+        assert is_unsupported_error(NoToolCallError("Model did not call a tool"))
+        assert not is_unsupported_error(requests.ConnectionError())
+        assert not is_unsupported_error(ValueError("Invalid arguments"))
+        assert not is_unsupported_error(TypeError("bug in an adapter"))
+
+    def test_parse_constrained_json(self):
+        call = parse_tool_call_json(json.dumps({"name": "list_dir", "arguments": {}}))
+        assert call == ToolCall("list_dir", {})
+        with pytest.raises(ValueError):
+            parse_tool_call_json('{"arguments": {}}')
+
+
+class TestOpenRouterTools:
+    """OpenRouterAdapter.chat_tools against a canned HTTP reply"""
+
+    def test_sends_tools_and_parses_calls(self, monkeypatch):
+        requests = pytest.importorskip("requests")
+        monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+        from models.openrouter import OpenRouterAdapter
+        sent = {}
+
+        class Reply:
+            status_code = 200
+            headers = {"Content-Type": "application/json"}
+
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                return {"choices": [{"message": {"tool_calls": [
+                    {"id": "c1", "function": {"name": "read_file", "arguments": '{"path": "x.py"}'}}]}}]}
+
+        def fake_post(url, headers=None, data=None):
+            sent.update(json.loads(data))
+            return Reply()
+
+        monkeypatch.setattr(requests, "post", fake_post)
+        calls = OpenRouterAdapter().chat_tools("read x.py", [READ])
+        assert sent["tools"] == [READ]
+        assert sent["tool_choice"]["function"]["name"] == "read_file"
+        assert calls[0].arguments == {"path": "x.py"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
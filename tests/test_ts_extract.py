@@ -0,0 +1,70 @@
+"""
+Unit tests for tree-sitter extraction of non-Python files
+
+Run with: pytest tests/test_ts_extract.py -v
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("tree_sitter_languages")
+
+from cli import scan_repo
+from ts_extract import extract_tree_sitter
+from repo_index import SymbolTable
+
+
+class TestTreeSitterExtraction:
+    """Tests for the JS/TS/Java/C/C++ extractors"""
+
+    def test_javascript_schema(self):
+        """Should find classes, methods, arrow functions, imports and calls"""
+        source = (b"import {query} from './db';\nconst fs = require('fs');\n"
+                  b"class Repo { load() { return this.parse(query()); } parse(x) { return x; } }\n"
+                  b"const helper = () => 1;\n")
+        info = extract_tree_sitter(source, "app/repo.js")
+
+        assert info["classes"] == ["Repo"]
+        assert set(info["functions"]) == {"load", "parse", "helper"}
+        assert info["modules"] == ["app.db", "fs"]
+        assert "query" in info["calls"]
+        assert ["app.repo.Repo.load", "app.repo.Repo.parse"] in info["edges"]
+
+    def test_java_schema(self):
+        """Should record methods inside classes and dotted imports"""
+        source = b"import java.util.List;\npublic class Foo {\n  void bar() { baz(); }\n  void baz() {}\n}\n"
+        info = extract_tree_sitter(source, "Foo.java")
+
+        assert info["imports"] == ["java.util.List"]
+        assert ["Foo.Foo.bar", "method", 3, 3] in info["symbols"]
+
+    def test_c_declarators_and_includes(self):
+        """Should unwrap pointer declarators and resolve quoted includes"""
+        source = b'#include <stdio.h>\n#include "db.h"\nstruct P *p;\nstatic int *find(int a) { return lookup(a); }\n'
+        info = extract_tree_sitter(source, "src/main.c")
+
+        assert info["functions"] == ["find"]
+        assert info["classes"] == []
+        assert info["modules"] == ["stdio.h", "src.db"]
+        assert info["calls"] == ["lookup"]
+
+    def test_unsupported_extension(self):
+        """Should return None for formats without a grammar here"""
+        assert extract_tree_sitter(b"{}", "config.json") is None
+
+    def test_scan_repo_links_js_files(self, tmp_path):
+        """scan_repo should parse JS files and resolve calls defined in them"""
+        (tmp_path / "util.js").write_text("function add(a, b) { return a + b; }\nfunction twice(a) { return add(a, a); }\n")
+        (tmp_path / "main.js").write_text("import {twice} from './util';\ntwice(2);\n")
+        repo_map = scan_repo(str(tmp_path))
+        table = SymbolTable(repo_map)
+
+        assert repo_map["main.js"]["modules"] == ["util"]
+        assert table.callers("util.add") == ["util.twice"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
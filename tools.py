@@ -26,6 +26,15 @@ from rich.console import Console
 from rich.prompt import Confirm
 from rich.table import Table
 
+from fileio import (
+    count_file_lines,
+    count_lines_parallel,
+    iter_code_files,
+    summarize_by_language,
+    format_language_summary,
+    read_file_range,
+)
+
 console = Console()
 logger = logging.getLogger("blonde")
 
@@ -59,8 +68,14 @@ class ToolRegistry:
         self.register_tool(
             name="read_file",
             func=self.read_file,
-            description="Read contents of a file",
-            params={"path": "str - Path to file"},
+            description="Read contents of a file (large files are returned one page at a time)",
+            params={
+                "path": "str - Path to file",
+                "start_line": "int - Optional 1-based first line to read",
+                "max_lines": "int - Optional maximum number of lines",
+                "offset": "int - Optional byte offset to start at (instead of start_line)",
+                "max_bytes": "int - Optional maximum bytes to return",
+            },
             safe=True
         )
         
@@ -217,20 +232,30 @@ class ToolRegistry:
     
     # ==================== Tool Implementations ====================
     
-    def read_file(self, path: str) -> str:
-        """Read a file safely"""
+    def read_file(self, path: str, start_line: int = None, max_lines: int = None,
+                  offset: int = None, max_bytes: int = None) -> str:
+        """Read a file safely, paging through large files by line or byte range"""
         try:
             file_path = Path(path).expanduser()
             if not file_path.exists():
                 return f"ERROR: File not found: {path}"
             
-            if file_path.stat().st_size > 1_000_000:  # 1MB limit
-                return f"ERROR: File too large (>1MB): {path}"
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            ranged = any(arg is not None for arg in (start_line, max_lines, offset, max_bytes))
+            if not ranged and file_path.stat().st_size <= 1_000_000:  # 1MB inline limit
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                return f"SUCCESS: Read {len(content)} characters from {path}\n\n{content}"
             
-            return f"SUCCESS: Read {len(content)} characters from {path}\n\n{content}"
+            # Large file or explicit range: return one page plus a continuation marker
+            page = read_file_range(
+                str(file_path),
+                start_line=int(start_line) if start_line is not None else None,
+                max_lines=int(max_lines) if max_lines is not None else None,
+                offset=int(offset) if offset is not None else None,
+                max_bytes=int(max_bytes) if max_bytes is not None else None,
+            )
+            return (f"SUCCESS: Read {len(page.text)} characters from {path}\n\n"
+                    f"{page.text}{page.marker()}")
         except UnicodeDecodeError:
             return f"ERROR: File is not text (binary): {path}"
         except Exception as e:
@@ -334,34 +359,31 @@ class ToolRegistry:
             return f"ERROR: Command execution failed: {e}"
     
     def count_lines(self, path: str) -> str:
-        """Count lines of code in file or directory"""
+        """Count lines of code in file or directory (streaming, constant memory)"""
         try:
             file_path = Path(path).expanduser()
             
             if not file_path.exists():
                 return f"ERROR: Path not found: {path}"
             
-            total_lines = 0
-            file_count = 0
-            
             if file_path.is_file():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    lines = len(f.readlines())
-                return f"SUCCESS: {lines} lines in {path}"
+                stats = count_file_lines(str(file_path))
+                if stats.error:
+                    return f"ERROR: Line counting failed: {stats.error}"
+                return (f"SUCCESS: {stats.lines} lines in {path} "
+                        f"(code {stats.code}, comment {stats.comment}, blank {stats.blank})")
             
-            # Directory: count all code files
+            # Directory: count all code files in parallel
             code_extensions = {'.py', '.js', '.ts', '.java', '.cpp', '.c', '.go', '.rs', '.rb'}
             
-            for item in file_path.rglob('*'):
-                if item.is_file() and item.suffix in code_extensions:
-                    try:
-                        with open(item, 'r', encoding='utf-8') as f:
-                            total_lines += len(f.readlines())
-                        file_count += 1
-                    except:
-                        pass  # Skip unreadable files
+            results = [r for r in count_lines_parallel(iter_code_files(str(file_path), code_extensions))
+                       if not r.error]  # Skip unreadable files
+            total_lines = sum(r.lines for r in results)
+            file_count = len(results)
             
-            return f"SUCCESS: {total_lines} lines across {file_count} files in {path}"
+            summary = f"SUCCESS: {total_lines} lines across {file_count} files in {path}"
+            breakdown = format_language_summary(summarize_by_language(results))
+            return f"{summary}\n{breakdown}" if breakdown else summary
         except Exception as e:
             return f"ERROR: Line counting failed: {e}"
     
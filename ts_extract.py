@@ -0,0 +1,238 @@
+"""
+Tree-sitter symbol extraction for non-Python files in BlondE-CLI
+
+Produces the same per-file schema as repo_index.extract_python (functions,
+classes, imports, calls, modules, symbols, edges) for JavaScript,
+TypeScript, Java, C and C++, so those files contribute to repo context.
+
+Parsers are created once per language per thread and reused across files
+(tree-sitter parsers are not safe to share between threads). Requires the
+optional tree-sitter-languages package; without it, extract_tree_sitter
+returns None and callers fall back to the old "unparsed" entry.
+
+Usage:
+    if supports_extension("ts"):
+        info = extract_tree_sitter(source_bytes, "src/app.ts")
+"""
+
+import os
+import posixpath
+import logging
+import threading
+import warnings
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional
+
+from language import LANGUAGE_BY_EXT
+from repo_index import module_name
+
+logger = logging.getLogger("blonde")
+
+try:
+    from tree_sitter_languages import get_parser
+    TREE_SITTER_AVAILABLE = True
+except ImportError:
+    TREE_SITTER_AVAILABLE = False
+    logger.debug("tree-sitter-languages not installed. Non-Python files will not be parsed.")
+
+
+@dataclass(frozen=True)
+class LanguageSpec:
+    """Node types that carry definitions, imports and calls in one grammar"""
+    functions: FrozenSet[str]
+    classes: FrozenSet[str]
+    imports: FrozenSet[str]
+    calls: Dict[str, str]  # call node type -> field holding the callee
+
+
+_JS_SPEC = LanguageSpec(
+    functions=frozenset({"function_declaration", "generator_function_declaration", "method_definition"}),
+    classes=frozenset({"class_declaration", "abstract_class_declaration", "interface_declaration"}),
+    imports=frozenset({"import_statement"}),
+    calls={"call_expression": "function", "new_expression": "constructor"},
+)
+_C_SPEC = LanguageSpec(
+    functions=frozenset({"function_definition"}),
+    classes=frozenset({"struct_specifier"}),
+    imports=frozenset({"preproc_include"}),
+    calls={"call_expression": "function"},
+)
+
+SPECS: Dict[str, LanguageSpec] = {
+    "javascript": _JS_SPEC,
+    "typescript": _JS_SPEC,
+    "java": LanguageSpec(
+        functions=frozenset({"method_declaration", "constructor_declaration"}),
+        classes=frozenset({"class_declaration", "interface_declaration", "enum_declaration", "record_declaration"}),
+        imports=frozenset({"import_declaration"}),
+        calls={"method_invocation": "name", "object_creation_expression": "type"},
+    ),
+    "c": _C_SPEC,
+    "cpp": LanguageSpec(
+        functions=_C_SPEC.functions,
+        classes=frozenset({"struct_specifier", "class_specifier"}),
+        imports=_C_SPEC.imports,
+        calls=_C_SPEC.calls,
+    ),
+}
+
+# Anonymous functions bound to a name (const f = () => ...) count as functions
+_JS_FUNCTION_VALUES = frozenset({"arrow_function", "function", "function_expression", "generator_function"})
+
+_local = threading.local()
+
+
+def supports_extension(ext: str) -> bool:
+    """True if files with this extension can be parsed here"""
+    return TREE_SITTER_AVAILABLE and LANGUAGE_BY_EXT.get(ext) in SPECS
+
+
+def _parser(language: str):
+    """Per-thread cached parser for a language"""
+    parsers = getattr(_local, "parsers", None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    if language not in parsers:
+        with warnings.catch_warnings():
+            # tree-sitter-languages still uses the deprecated Language(path, name) form
+            warnings.simplefilter("ignore", FutureWarning)
+            parsers[language] = get_parser(language)
+    return parsers[language]
+
+
+class _Extractor:
+    """One depth-first walk over a tree, filling the scan_repo schema"""
+
+    def __init__(self, source: bytes, relative_path: str, language: str):
+        self.source = source
+        self.relative_path = relative_path.replace(os.sep, "/")
+        self.module = module_name(relative_path)
+        self.language = language
+        self.spec = SPECS[language]
+        self.info = {"functions": [], "classes": [], "imports": [], "calls": [],
+                     "modules": [], "symbols": [], "edges": []}
+
+    def text(self, node) -> str:
+        return self.source[node.start_byte:node.end_byte].decode("utf-8", errors="replace")
+
+    def _def_name(self, node) -> Optional[str]:
+        name = node.child_by_field_name("name")
+        if name is not None:
+            return self.text(name)
+        # C/C++: int *f(int a) nests the name inside declarators
+        declarator = node.child_by_field_name("declarator")
+        while declarator is not None:
+            inner = declarator.child_by_field_name("declarator")
+            if inner is None:
+                return self.text(declarator).replace("::", ".")
+            declarator = inner
+        return None
+
+    def _callee(self, node) -> Optional[str]:
+        callee = node.child_by_field_name(self.spec.calls[node.type])
+        while callee is not None:
+            inner = (callee.child_by_field_name("property") or callee.child_by_field_name("field")
+                     or callee.child_by_field_name("name"))
+            if inner is None:
+                return self.text(callee)
+            callee = inner
+        return None
+
+    def _add_import(self, spec: str, relative: bool) -> None:
+        self.info["imports"].append(spec)
+        if relative:
+            base = posixpath.dirname(self.relative_path)
+            spec = posixpath.normpath(posixpath.join(base, spec))
+            # Paths escaping the scanned root cannot match a repo module
+            self.info["modules"].append(spec if spec.startswith("..") else module_name(spec))
+        else:
+            self.info["modules"].append(spec.replace("/", "."))
+
+    def _import(self, node) -> None:
+        if self.language in ("c", "cpp"):
+            path = node.child_by_field_name("path")
+            if path is not None:
+                self._add_import(self.text(path).strip('<>"'), path.type == "string_literal")
+        elif self.language == "java":
+            dotted = self.text(node)[len("import"):].strip().rstrip(";").strip()
+            self._add_import(dotted[len("static"):].strip() if dotted.startswith("static ") else dotted, False)
+        else:
+            source = node.child_by_field_name("source")
+            if source is not None:
+                spec = self.text(source).strip("'\"`")
+                self._add_import(spec, spec.startswith("."))
+
+    def walk(self, root) -> dict:
+        # (node, enclosing qualified scope, kind of that scope)
+        stack = [(root, self.module, None)]
+        while stack:
+            node, scope, scope_kind = stack.pop()
+            child_scope, child_kind = scope, scope_kind
+            kind = None
+            if node.type in self.spec.classes:
+                kind = "class"
+            elif node.type in self.spec.functions:
+                kind = "method" if scope_kind == "class" else "function"
+            elif node.type == "variable_declarator" and self.spec is _JS_SPEC:
+                value = node.child_by_field_name("value")
+                if value is not None and value.type in _JS_FUNCTION_VALUES:
+                    kind = "function"
+
+            name = self._def_name(node) if kind else None
+            if kind == "class" and node.child_by_field_name("body") is None and self.language in ("c", "cpp"):
+                name = None  # "struct P *p;" is a use, not a definition
+            if name:
+                qualname = f"{scope}.{name}" if scope else name
+                self.info["classes" if kind == "class" else "functions"].append(name.rsplit(".", 1)[-1])
+                self.info["symbols"].append([qualname, kind, node.start_point[0] + 1, node.end_point[0] + 1])
+                child_scope, child_kind = qualname, kind
+            elif node.type in self.spec.imports:
+                self._import(node)
+            elif node.type in self.spec.calls:
+                callee = self._callee(node)
+                if callee:
+                    if callee == "require" and self.spec is _JS_SPEC:
+                        args = node.child_by_field_name("arguments")
+                        first = args.named_children[0] if args is not None and args.named_children else None
+                        if first is not None and first.type == "string":
+                            spec = self.text(first).strip("'\"`")
+                            self._add_import(spec, spec.startswith("."))
+                    self.info["calls"].append(callee)
+                    self.info["edges"].append([scope, callee])
+
+            for child in reversed(node.children):
+                if child.is_named:
+                    stack.append((child, child_scope, child_kind))
+        self._resolve_edges()
+        return self.info
+
+    def _resolve_edges(self) -> None:
+        """Qualify bare callees defined in this file, innermost enclosing scope first"""
+        defined = {qualname for qualname, _, _, _ in self.info["symbols"]}
+        for edge in self.info["edges"]:
+            scope, callee = edge
+            while scope:
+                if f"{scope}.{callee}" in defined:
+                    edge[1] = f"{scope}.{callee}"
+                    break
+                scope = scope.rpartition(".")[0]
+
+
+def extract_tree_sitter(source: bytes, relative_path: str) -> Optional[dict]:
+    """
+    Parse a JS/TS/Java/C/C++ file and return its scan_repo metadata.
+
+    Callees defined in the same file are qualified (so sibling methods and
+    local functions resolve in SymbolTable); everything else keeps its bare
+    name and ends up in SymbolTable.external.
+
+    Returns:
+        The metadata dict, or None if the extension is unsupported or
+        tree-sitter is not installed
+    """
+    ext = relative_path.rsplit(".", 1)[-1].lower()
+    if not supports_extension(ext):
+        return None
+    language = LANGUAGE_BY_EXT[ext]
+    tree = _parser(language).parse(source)
+    return _Extractor(source, relative_path, language).walk(tree.root_node)
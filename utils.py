@@ -71,3 +71,22 @@ def load_api_key(key_name: str) -> str:
 
 
 
+
+
+def env_int(name: str, default: int) -> int:
+    """Read a positive integer setting from the environment.
+
+    Args:
+        name: Environment variable name
+        default: Value used when the variable is unset or not a positive integer
+
+    Returns:
+        The parsed value or default
+    """
+    value = os.getenv(name)
+    try:
+        parsed = int(value) if value is not None else default
+    except ValueError:
+        logging.getLogger("blonde").warning(f"Ignoring {name}={value!r}: not an integer")
+        return default
+    return parsed if parsed > 0 else default